@@ -1,43 +1,261 @@
 import sys
 import os
-from fastapi import FastAPI
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel
-import joblib
-from src.predict_yield import predict_yield
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
+from predict_yield import MODEL_PATH, artifact_path, predict_yield, model_available
+from drift_monitor import get_drift_monitor
+import warmup
+from resilience import NoDataError, UpstreamError, breaker_states
+from job_queue import JobQueue, WorkerPool
+import profiling
+import imagery
+import yield_map
+import scenarios
+from gee.get_satellite_image import DEFAULT_START, DEFAULT_END
 
-app = FastAPI()
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', '1') == '1'
+IMAGERY_MAX_AGE_S = int(os.getenv('IMAGERY_MAX_AGE_S', str(24 * 3600)))
+# İşler ayrı worker dağıtımında (python src/job_queue.py) çalışır; yalnızca tek süreçli
+# geliştirme ortamında API'nin kendi worker'larını başlatması için > 0 yapılır
+API_JOB_WORKERS = int(os.getenv('API_JOB_WORKERS', '0'))
+
+
+job_queue = JobQueue()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ON_STARTUP:
+        warmup.start_background_warmup()
+    else:
+        warmup.state.finish('disabled')
+
+    workers = WorkerPool(API_JOB_WORKERS) if API_JOB_WORKERS > 0 else None
+    if workers is not None:
+        workers.start()
+    yield
+    if workers is not None:
+        workers.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 class PredictionRequest(BaseModel):
     lat: float
     lon: float
     hectare: float
 
+class JobRequest(BaseModel):
+    points: List[PredictionRequest]
+
+class Scenario(BaseModel):
+    name: Optional[str] = None
+    # Özellik adı ya da kalıbı -> değişim: '-30%' göreli, 2 / '+2' mutlak (ör. {"Rain_May": "-30%"})
+    changes: Dict[str, Union[float, str]]
+
+class ScenarioRequest(BaseModel):
+    lat: float
+    lon: float
+    hectare: float
+    scenarios: List[Scenario]
+
 @app.post("/predict")
-def predict(request: PredictionRequest):
-    
-    yieldPrediction = predict_yield(request.lat, request.lon, request.hectare)    
+def predict(request: PredictionRequest, explain: bool = False, profile: bool = False,
+            x_profile: Optional[str] = Header(default=None)):
+
+    # ?profile=true veya "X-Profile: 1" ile isteğe özel örnekleme profili alınır
+    profiler = None
+    if profile or x_profile == '1':
+        with profiling.profile_request('predict') as profiler:
+            yieldPrediction = predict_yield(request.lat, request.lon, request.hectare, explain=explain)
+    else:
+        yieldPrediction = predict_yield(request.lat, request.lon, request.hectare, explain=explain)
 
     if "error" in yieldPrediction:
         return {
-            "status": "error", 
+            "status": "error",
             "message": yieldPrediction["error"],
             "debug": "Check container logs for more details"
         }
-    
+
+    data = {
+        "lat": request.lat,
+        "lon": request.lon,
+        "yield_per_hektar": yieldPrediction['results']['yield_per_hektar'],
+        "total_yield_ton": yieldPrediction['results']['total_yield_ton'],
+        "interval": yieldPrediction['results']['interval'],
+        "soil_included": yieldPrediction['factors']['soil_included'],
+        "degraded": yieldPrediction['degraded'],
+        "cached": yieldPrediction['cached']
+    }
+    if explain:
+        data["explanation"] = yieldPrediction['explanation']
+    if profiler is not None:
+        data["profile"] = {
+            "id": profiler.id,
+            "duration_ms": round(profiler.duration_ms, 1),
+            "stages_ms": profiler.stage_summary()
+        }
+
     return {
         "status": "success",
-        "data": {
-            "lat": request.lat,
-            "lon": request.lon,
-            "yield_per_hektar": yieldPrediction['results']['yield_per_hektar'],
-            "total_yield_ton": yieldPrediction['results']['total_yield_ton'],
-            "soil_included": yieldPrediction['factors']['soil_included']
-        }
+        "data": data
     }
 
+@app.get("/predict/map")
+def predict_map(lat_min: float, lon_min: float, lat_max: float, lon_max: float, width: int = 256,
+                height: Optional[int] = None, encoding: str = 'color',
+                vmin: Optional[float] = None, vmax: Optional[float] = None):
+    # encoding=color: RGBA renk skalası; encoding=value: 16 bit gri, piksel = kg/ha (0 = veri yok)
+    if not model_available():
+        raise HTTPException(status_code=503, detail=f"Model dosyası bulunamadı: {MODEL_PATH}")
+    bounds = (lat_min, lon_min, lat_max, lon_max)
+    try:
+        content, summary = yield_map.yield_map(bounds, width, height, encoding, vmin, vmax)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    headers = {
+        "X-Map-Bounds": ",".join(str(v) for v in bounds),
+        "X-Map-Points": str(summary['points']),
+        "X-Map-Failed-Points": str(summary['failed_points']),
+        "X-Map-Truncated": "1" if summary['truncated'] else "0",
+        "X-Map-Range": ",".join(str(v) for v in summary['range']),
+        "X-Map-Mean": str(summary['mean'])
+    }
+    return Response(content=content, media_type="image/png", headers=headers)
+
+@app.post("/predict/scenarios")
+def predict_scenarios(request: ScenarioRequest):
+    # Temel özellikler bir kez alınır; tüm senaryolar tek vektörel tahminle skorlanır
+    if not model_available():
+        raise HTTPException(status_code=503, detail=f"Model dosyası bulunamadı: {MODEL_PATH}")
+    try:
+        data = scenarios.run_scenarios(request.lat, request.lon, request.hectare,
+                                       [scenario.model_dump() for scenario in request.scenarios])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {"status": "success", "data": data}
+
+@app.post("/jobs")
+def submit_job(request: JobRequest):
+    points = [point.model_dump() for point in request.points]
+    job_id, deduplicated = job_queue.submit('predict_batch', {'points': points}, total=len(points))
+    return {"status": "success", "job_id": job_id, "deduplicated": deduplicated}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = job_queue.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return {"status": "success", "job": job}
+
+@app.get("/jobs/{job_id}/results")
+def job_results(job_id: str):
+    status, results = job_queue.result(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    if status != 'done':
+        return JSONResponse(status_code=409, content={"status": status, "message": "İş henüz tamamlanmadı"})
+    return {"status": "success", "results": results}
+
+def imagery_response(fetch, if_none_match):
+    try:
+        digest, path, hit = fetch()
+    except UpstreamError as e:
+        raise HTTPException(status_code=503, detail=f"GEE kullanılamıyor: {e}")
+    except NoDataError:
+        raise HTTPException(status_code=404, detail="Bu tarih aralığında parsel için Sentinel-2 görüntüsü yok")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Görüntü alınamadı: {e}")
+
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={IMAGERY_MAX_AGE_S}",
+        "X-Cache": "hit" if hit else "miss"
+    }
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix('W/') for t in if_none_match.split(',')]
+        if etag in tags or '*' in tags:
+            return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/png", headers=headers)
+
+def check_imagery_params(kind, radius, start, end):
+    # İstemci kaynaklı hatalar GEE'ye gitmeden reddedilir; aksi halde ortak devre kesiciyi açarlar
+    if kind not in imagery.KINDS:
+        raise HTTPException(status_code=400, detail=f"Geçersiz görüntü türü: {kind} ({', '.join(imagery.KINDS)})")
+    if not 50 <= radius <= 5000:
+        raise HTTPException(status_code=400, detail="radius 50-5000 m aralığında olmalı")
+    try:
+        date_start, date_end = (datetime.strptime(d, "%Y-%m-%d") for d in (start, end))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start ve end YYYY-AA-GG biçiminde olmalı")
+    if date_start >= date_end:
+        raise HTTPException(status_code=400, detail="start, end tarihinden önce olmalı")
+
+@app.get("/imagery/thumbnail")
+def imagery_thumbnail(lat: float, lon: float, kind: str = 'rgb', radius: int = 500,
+                      start: str = DEFAULT_START, end: str = DEFAULT_END, size: int = 512,
+                      if_none_match: Optional[str] = Header(default=None)):
+    check_imagery_params(kind, radius, start, end)
+    if not 64 <= size <= 2048:
+        raise HTTPException(status_code=400, detail="size 64-2048 piksel aralığında olmalı")
+    return imagery_response(
+        lambda: imagery.thumbnail(kind, lon, lat, radius, start, end, size), if_none_match
+    )
+
+@app.get("/imagery/tiles/{kind}/{z}/{x}/{y}.png")
+def imagery_tile(kind: str, z: int, x: int, y: int, lat: float, lon: float, radius: int = 500,
+                 start: str = DEFAULT_START, end: str = DEFAULT_END,
+                 if_none_match: Optional[str] = Header(default=None)):
+    check_imagery_params(kind, radius, start, end)
+    if not (0 <= z <= 20 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Geçersiz karo koordinatı")
+    return imagery_response(
+        lambda: imagery.tile(kind, lon, lat, radius, start, end, z, x, y), if_none_match
+    )
+
+@app.get("/profiles/hotspots")
+def profile_hotspots(top: int = 20):
+    return {"status": "success", "hotspots": profiling.hotspots(top)}
+
+@app.get("/profiles/{profile_id}")
+def profile_file(profile_id: str):
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+@app.get("/monitoring/drift")
+def drift_report():
+    monitor = get_drift_monitor(os.path.dirname(artifact_path(MODEL_PATH)))
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="Dağılım referansı bulunamadı (modeli yeniden eğitin)")
+    return {"status": "success", "drift": monitor.report()}
+
 @app.get("/")
 def root():
     return {"message": "AI service is running"}
+
+@app.get("/ready")
+def ready():
+    available = model_available()
+    body = {
+        "ready": warmup.state.ready and available,
+        "model_available": available,
+        "warmup": warmup.state.to_dict(),
+        "upstreams": breaker_states()
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
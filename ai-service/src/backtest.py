@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from predict_yield import (
+    MODEL_PATH, PREDICT_RADIUS, artifact_path, feature_matrix, load_model, load_quantile_model, model_available
+)
+from feature_providers import QUALITY_KEY, FeatureExecutor, assemble, build_providers
+from scenarios import score_matrix
+from regions import DEFAULT_PROVINCE, get_region_catalog, slugify
+from training_data import TRAINING_YEARS
+from tuik.clean_tuik_data import clean_tuik_data, verim_path
+from gee.collect_point_data import ndvi_source_for_year
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BACKTEST_OUTPUT_DIR = Path(os.getenv('BACKTEST_OUTPUT_DIR', PROJECT_ROOT / 'data' / 'processed' / 'backtest'))
+BACKTEST_PROVINCE = os.getenv('BACKTEST_PROVINCE', DEFAULT_PROVINCE)
+BACKTEST_YEAR_START = int(os.getenv('BACKTEST_YEAR_START', '2006'))
+BACKTEST_YEAR_END = int(os.getenv('BACKTEST_YEAR_END', '2024'))
+# Her süreç kendi model kopyası ve sağlayıcı havuzuyla bir grup (ilçe, yıl) satırını skorlar
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', str(os.cpu_count() or 1)))
+BACKTEST_BATCH_SIZE = int(os.getenv('BACKTEST_BATCH_SIZE', '256'))
+# 1: yalnızca önbellekteki (ısıtılmış ya da daha önce oynatılmış) upstream verisi kullanılır
+BACKTEST_OFFLINE = os.getenv('BACKTEST_OFFLINE', '0') == '1'
+
+
+_executor = None
+
+
+def worker_executor(offline):
+    # Süreç başına bir sağlayıcı havuzu; /predict ile aynı sağlayıcılar ve devre kesiciler
+    global _executor
+    if _executor is None:
+        _executor = FeatureExecutor(build_providers(), offline=offline)
+    return _executor
+
+
+def load_actuals(province):
+    if not verim_path(province).exists():
+        try:
+            clean_tuik_data(province)
+        except SystemExit:
+            # clean_tuik_data komut satırı betiğidir; ham TÜİK dosyası yoksa süreci sonlandırır
+            raise LookupError(f"TÜİK verim verisi hazırlanamadı: {province}; ayrıntı yukarıda")
+    actuals = pd.read_csv(verim_path(province))
+    return actuals.rename(columns={'Ilce': 'ilce', 'Yil': 'yil', 'Verim_Ton_Hektar': 'gercek'})[['ilce', 'yil', 'gercek']]
+
+
+def replay_tasks(province, years):
+    """Katalogdaki her ilçe x yıl; ilçe sırasıyla, böylece bir gruptaki yıllar sabit özellikleri paylaşır."""
+    districts = get_region_catalog().districts(province)
+    if not districts:
+        raise ValueError(f"Katalogda il bulunamadı: {province}")
+    return [(ilce, year, coords['enlem'], coords['boylam'])
+            for ilce, coords in sorted(districts.items()) for year in range(years[0], years[1] + 1)]
+
+
+def score_batch(tasks, offline=BACKTEST_OFFLINE):
+    """Bir grup (ilçe, yıl) servis yolundan geçirilir: sağlayıcılar, assemble (0 doldurma), tek tahmin.
+
+    Uydu verisi alınamayan satırlar /predict'te olduğu gibi tahmin edilmez (tahmin NaN).
+    """
+    model = load_model()
+    features = list(model.feature_names_in_)
+    try:
+        quantile_model = load_quantile_model()
+    except Exception:
+        quantile_model = None
+
+    rows = worker_executor(offline).collect([(lat, lon, year) for _, year, lat, lon in tasks], PREDICT_RADIUS)
+    result = pd.DataFrame(tasks, columns=['ilce', 'yil', 'enlem', 'boylam'])
+    result['ndvi_kaynagi'] = [
+        (row.get(QUALITY_KEY) or {}).get('ndvi_source') if row is not None else None for row in rows
+    ]
+    result['tahmin'] = np.nan
+    result['sifir_doldurulan'] = np.nan
+
+    ok = [i for i, row in enumerate(rows) if row is not None]
+    if not ok:
+        return result
+    frame, filled = assemble([rows[i] for i in ok], features)
+    predictions, labels, intervals = score_matrix(model, quantile_model, feature_matrix(frame, features), features)
+    result.loc[ok, 'tahmin'] = predictions
+    result.loc[ok, 'sifir_doldurulan'] = filled[features].sum(axis=1).to_numpy()
+    if labels is not None:
+        # En dış quantile'lar (ör. P10-P90) aralık kapsaması için saklanır
+        result.loc[ok, 'alt'] = intervals[:, 0]
+        result.loc[ok, 'ust'] = intervals[:, -1]
+    return result
+
+
+def run_batches(batches, workers=BACKTEST_WORKERS, offline=BACKTEST_OFFLINE):
+    if workers <= 1 or len(batches) == 1:
+        return [score_batch(batch, offline) for batch in batches]
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        futures = [executor.submit(score_batch, batch, offline) for batch in batches]
+        for n, future in enumerate(as_completed(futures), start=1):
+            results.append(future.result())
+            print(f"   {n}/{len(batches)} grup tamamlandı")
+    return results
+
+
+def error_table(scored, by):
+    """Gruba göre n, MAE, RMSE, sapma (tahmin - gerçek), MAPE ve varsa aralık kapsaması."""
+    error = scored['tahmin'] - scored['gercek']
+    frame = scored.assign(
+        hata=error,
+        mutlak=error.abs(),
+        kare=error ** 2,
+        yuzde=error.abs() / scored['gercek'].where(scored['gercek'] > 0) * 100
+    )
+    aggregations = {
+        'n': ('hata', 'size'),
+        'mae': ('mutlak', 'mean'),
+        'rmse': ('kare', lambda s: float(np.sqrt(s.mean()))),
+        'sapma': ('hata', 'mean'),
+        'mape': ('yuzde', 'mean'),
+        'ort_sifir_doldurulan': ('sifir_doldurulan', 'mean'),
+    }
+    if 'alt' in frame.columns:
+        frame['kapsandi'] = (frame['alt'] <= frame['gercek']) & (frame['gercek'] <= frame['ust'])
+        aggregations['kapsama'] = ('kapsandi', 'mean')
+    return frame.groupby(by).agg(**aggregations).round(3)
+
+
+def sample_label(in_sample):
+    return f"örneklem içi ({TRAINING_YEARS[0]}-{TRAINING_YEARS[1]})" if in_sample else "örneklem dışı"
+
+
+def summary(scored):
+    error = scored['tahmin'] - scored['gercek']
+    actual = scored['gercek']
+    r2 = 1 - float((error ** 2).sum()) / float(((actual - actual.mean()) ** 2).sum()) if len(scored) > 1 else float('nan')
+    return {
+        'n': len(scored),
+        'mae': round(float(error.abs().mean()), 3),
+        'rmse': round(float(np.sqrt((error ** 2).mean())), 3),
+        'sapma': round(float(error.mean()), 3),
+        'r2': round(r2, 3)
+    }
+
+
+def backtest(province=BACKTEST_PROVINCE, years=(BACKTEST_YEAR_START, BACKTEST_YEAR_END),
+             workers=BACKTEST_WORKERS, batch_size=BACKTEST_BATCH_SIZE, offline=BACKTEST_OFFLINE):
+    """Geçmiş sezonları servis yolundan oynatır; (satırlar, yıl tablosu, ilçe tablosu) döndürür.
+
+    Eğitim yıllarındaki satırlar `orneklem_ici` ile işaretlenir; ilçe tablosu örneklem
+    içi/dışı ayrı gruplanır, çünkü modelin gördüğü sezonların hatası iyimserdir.
+    """
+    # TÜİK verisi skorlamadan önce okunur; eksikse saatlerce süren oynatma boşa gitmez
+    actuals = load_actuals(province)
+    tasks = replay_tasks(province, years)
+    batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    mode = "yalnızca önbellek" if offline else "önbellek + upstream"
+    print(f"🔁 {province} {years[0]}-{years[1]}: {len(tasks)} ilçe/yıl, {len(batches)} grup, "
+          f"{min(workers, len(batches))} süreç ({mode}, {PREDICT_RADIUS} m)")
+
+    rows = pd.concat(run_batches(batches, workers, offline), ignore_index=True)
+    rows = rows.merge(actuals, on=['ilce', 'yil'], how='left')
+    rows['orneklem_ici'] = rows['yil'].between(*TRAINING_YEARS)
+    # NDVI kaynağı bilinmiyorsa (ör. eski önbellek kaydı) yılın birincil kaynağı yazılır
+    rows['ndvi_kaynagi'] = rows['ndvi_kaynagi'].fillna(rows['yil'].map(lambda y: ndvi_source_for_year(y)[0]))
+    rows = rows.sort_values(['ilce', 'yil']).reset_index(drop=True)
+
+    scored = rows.dropna(subset=['tahmin', 'gercek'])
+    if scored.empty:
+        raise LookupError("Karşılaştırılacak satır yok (özellikler alınamadı ya da TÜİK verisi eşleşmedi)")
+    by_year = error_table(scored, 'yil')
+    by_year.insert(0, 'orneklem_ici', by_year.index.to_series().between(*TRAINING_YEARS))
+    return rows, by_year, error_table(scored, ['orneklem_ici', 'ilce'])
+
+
+def main():
+    province = sys.argv[1] if len(sys.argv) > 1 else BACKTEST_PROVINCE
+    years = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (BACKTEST_YEAR_START, BACKTEST_YEAR_END)
+    if not model_available():
+        print(f"❌ Model dosyası bulunamadı: {MODEL_PATH}")
+        return 1
+    print(f"🧠 Model: {artifact_path(MODEL_PATH)}")
+
+    started = time.perf_counter()
+    try:
+        rows, by_year, by_district = backtest(province, years)
+    except (ValueError, LookupError) as e:
+        print(f"❌ {e}")
+        return 1
+    elapsed = time.perf_counter() - started
+
+    scored = rows.dropna(subset=['tahmin', 'gercek'])
+    skipped = int(rows['tahmin'].isna().sum())
+    no_actual = int((rows['tahmin'].notna() & rows['gercek'].isna()).sum())
+    print(f"\n✅ {len(rows)} ilçe/yıl {elapsed:.1f} s içinde oynatıldı: {len(scored)} karşılaştırıldı, "
+          f"{skipped} özelliksiz atlandı, {no_actual} TÜİK verisi yok")
+    for in_sample, group in scored.groupby('orneklem_ici'):
+        print(f"📊 Genel, {sample_label(in_sample)}: {summary(group)}")
+    print("\n--- Yıla Göre Hata (ton/ha) ---")
+    print(by_year.to_string())
+    print("\n--- NDVI Kaynağına Göre Hata ---")
+    print(error_table(scored, ['orneklem_ici', 'ndvi_kaynagi']).to_string())
+    for in_sample, table in by_district.groupby(level='orneklem_ici'):
+        print(f"\n--- İlçeye Göre Hata, {sample_label(in_sample)} (en yüksek MAE) ---")
+        print(table.droplevel('orneklem_ici').sort_values('mae', ascending=False).head(15).to_string())
+
+    os.makedirs(BACKTEST_OUTPUT_DIR, exist_ok=True)
+    prefix = BACKTEST_OUTPUT_DIR / f"{slugify(province)}_{years[0]}_{years[1]}"
+    rows.to_csv(f"{prefix}_satirlar.csv", index=False, encoding='utf-8-sig')
+    by_year.to_csv(f"{prefix}_yil.csv", encoding='utf-8-sig')
+    by_district.to_csv(f"{prefix}_ilce.csv", encoding='utf-8-sig')
+    print(f"\n💾 Sonuçlar: {prefix}_*.csv")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_yield import MODEL_PATH, load_model
+from explain import BACKGROUND_FILENAME, predict_with_contributions
+
+BATCH_SIZES = [1, 10, 100, 1000]
+REPEATS = 50
+# Açıklamalı tahminin düz tahmine göre kabul edilen en fazla süre oranı. TreeSHAP
+# maliyeti satır sayısıyla doğrusal büyür; sınır /predict boyutundaki gruplara uygulanır.
+MAX_OVERHEAD_RATIO = float(os.getenv('EXPLAIN_MAX_OVERHEAD_RATIO', '5'))
+CHECKED_MAX_BATCH = 100
+
+
+def sample_inputs(model, n, seed=0):
+    features = list(model.feature_names_in_)
+    background_path = os.path.join(os.path.dirname(MODEL_PATH), BACKGROUND_FILENAME)
+    if os.path.exists(background_path):
+        base = pd.read_csv(background_path)
+        for col in features:
+            if col not in base.columns:
+                base[col] = 0
+        base = base[features]
+    else:
+        base = pd.DataFrame(np.random.default_rng(seed).random((100, len(features))), columns=features)
+    return base.sample(n=n, replace=True, random_state=seed).reset_index(drop=True).astype(np.float32)
+
+
+def time_call(fn, repeats=REPEATS):
+    fn()
+    durations = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - t)
+    return float(np.median(durations)) * 1000
+
+
+def main():
+    model = load_model()
+    print(f"Model: {MODEL_PATH}")
+    print(f"{'batch':>6} | {'predict (ms)':>12} | {'explain (ms)':>12} | {'oran':>6}")
+
+    worst = 0.0
+    for n in BATCH_SIZES:
+        X = sample_inputs(model, n)
+        plain = time_call(lambda: model.predict(X))
+        explained = time_call(lambda: predict_with_contributions(model, X))
+        ratio = explained / plain
+        if n <= CHECKED_MAX_BATCH:
+            worst = max(worst, ratio)
+        print(f"{n:>6} | {plain:>12.3f} | {explained:>12.3f} | {ratio:>5.1f}x")
+
+        predictions, _, _ = predict_with_contributions(model, X)
+        if not np.allclose(predictions, model.predict(X), atol=1e-4):
+            print("❌ Katkı toplamı tahminle uyuşmuyor!")
+            return 1
+
+    if worst > MAX_OVERHEAD_RATIO:
+        print(f"❌ Açıklama ek yükü {worst:.1f}x > {MAX_OVERHEAD_RATIO:.1f}x")
+        return 1
+    print(f"✅ En kötü ek yük {worst:.1f}x (sınır {MAX_OVERHEAD_RATIO:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
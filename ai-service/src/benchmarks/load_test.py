@@ -0,0 +1,222 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import contextlib
+import subprocess
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("❌ Yük testi için httpx gerekli: pip install httpx")
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(SERVICE_ROOT, 'src'))
+
+from regions import get_region_catalog
+
+# 'uvicorn': her worker sayısı için ayrı sunucu süreci; 'inprocess': ASGI uygulaması doğrudan
+LOADTEST_MODE = os.getenv('LOADTEST_MODE', 'uvicorn')
+LOADTEST_WORKERS = [int(w) for w in os.getenv('LOADTEST_WORKERS', '1,2,4').split(',')]
+LOADTEST_RPS = [float(r) for r in os.getenv('LOADTEST_RPS', '2,4,8,16,32').split(',')]
+LOADTEST_DURATION_S = float(os.getenv('LOADTEST_DURATION_S', '20'))
+LOADTEST_TIMEOUT_S = float(os.getenv('LOADTEST_TIMEOUT_S', '30'))
+LOADTEST_PORT = int(os.getenv('LOADTEST_PORT', '8765'))
+# Noktalar ilçe merkezlerinin çevresine bu standart sapmayla (km) dağıtılır
+LOADTEST_JITTER_KM = float(os.getenv('LOADTEST_JITTER_KM', '5'))
+LOADTEST_SEED = int(os.getenv('LOADTEST_SEED', '42'))
+
+# Doygunluk ölçütü: açık döngüde sunucu yetişemezse kuyruk büyür ve p99 sınırı aşılır
+SATURATION_MAX_P99_S = float(os.getenv('LOADTEST_MAX_P99_S', '5'))
+SATURATION_MAX_ERROR_RATE = 0.01
+
+KM_PER_DEG_LAT = 111.32
+# in-process modda tahmin çıktıları susturulur; rapor her zaman asıl stdout'a yazılır
+REPORT_STREAM = sys.stdout
+
+
+def report(*args):
+    print(*args, file=REPORT_STREAM, flush=True)
+
+
+def sample_points(n, rng):
+    # İlçe merkezleri eşit olasılıkla seçilir, tarla konumu merkez çevresinde normal dağılır
+    catalog = get_region_catalog()
+    picks = rng.integers(0, len(catalog.table), size=n)
+    lat0 = catalog.lats[picks]
+    lon0 = catalog.lons[picks]
+    lat = lat0 + rng.normal(0, LOADTEST_JITTER_KM, n) / KM_PER_DEG_LAT
+    lon = lon0 + rng.normal(0, LOADTEST_JITTER_KM, n) / (KM_PER_DEG_LAT * np.cos(np.radians(lat0)))
+    hectare = np.round(rng.lognormal(np.log(20), 0.8, n), 1)
+    return [{'lat': float(a), 'lon': float(o), 'hectare': float(h)} for a, o, h in zip(lat, lon, hectare)]
+
+
+async def send(client, point, scheduled_at):
+    # Gecikme planlanan varış anından ölçülür (coordinated omission'a karşı)
+    try:
+        response = await client.post('/predict', json=point)
+        ok = response.status_code == 200 and response.json().get('status') == 'success'
+    except Exception:
+        ok = False
+    return time.perf_counter() - scheduled_at, ok
+
+
+async def run_level(client, rps, duration_s, seed):
+    # Açık döngü: varışlar Poisson sürecine göre planlanır, yanıt beklenmez
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(1.0 / rps, size=int(rps * duration_s * 2) + 10)
+    arrivals = np.cumsum(gaps)
+    arrivals = arrivals[arrivals < duration_s]
+    points = sample_points(len(arrivals), rng)
+
+    start = time.perf_counter()
+    tasks = []
+    for offset, point in zip(arrivals, points):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, point, start + offset)))
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, ok in results if ok])
+    errors = sum(1 for _, ok in results if not ok)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        'target_rps': rps,
+        'sent': len(results),
+        'throughput': len(latencies) / elapsed,
+        'p50': p50, 'p90': p90, 'p99': p99,
+        'error_rate': errors / len(results) if results else 0.0
+    }
+
+
+def saturated(level):
+    return not level['p99'] <= SATURATION_MAX_P99_S or level['error_rate'] > SATURATION_MAX_ERROR_RATE
+
+
+async def sweep(client_factory, label):
+    report(f"\n=== {label} ===")
+    report(f"{'hedef rps':>9} | {'gönderilen':>10} | {'başarılı rps':>12} | {'p50 (s)':>7} | {'p90 (s)':>7} | {'p99 (s)':>7} | {'hata':>6}")
+    # Model yüklemesi ve ilk bağlantılar ölçüme karışmasın
+    async with client_factory() as client:
+        await send(client, sample_points(1, np.random.default_rng(LOADTEST_SEED))[0], time.perf_counter())
+
+    levels = []
+    for i, rps in enumerate(LOADTEST_RPS):
+        async with client_factory() as client:
+            level = await run_level(client, rps, LOADTEST_DURATION_S, LOADTEST_SEED + i)
+        levels.append(level)
+        report(f"{rps:>9.1f} | {level['sent']:>10} | {level['throughput']:>12.2f} | {level['p50']:>7.2f} | "
+              f"{level['p90']:>7.2f} | {level['p99']:>7.2f} | {level['error_rate']:>6.1%}")
+        if saturated(level):
+            break
+
+    sustained = [lv['target_rps'] for lv in levels if not saturated(lv)]
+    saturation = max(sustained) if sustained else None
+    report(f"📈 Doygunluk noktası: {saturation if saturation is not None else '< ' + str(LOADTEST_RPS[0])} rps")
+    return saturation
+
+
+def isolated_env(tmp_dir):
+    # Her koşu boş önbellek ve iş kuyruğuyla başlar
+    return {
+        'FEATURE_CACHE_PATH': os.path.join(tmp_dir, 'features.sqlite'),
+        'RESULT_CACHE_PATH': os.path.join(tmp_dir, 'results.sqlite'),
+        'JOB_DB_PATH': os.path.join(tmp_dir, 'jobs.sqlite'),
+        'WARMUP_ON_STARTUP': '0',
+        'API_JOB_WORKERS': '0',
+    }
+
+
+def wait_until_up(base_url, process, timeout_s=60):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn süreci başlatılamadı")
+        try:
+            if httpx.get(base_url + '/', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("uvicorn zamanında yanıt vermedi")
+
+
+def run_uvicorn(workers):
+    base_url = f"http://127.0.0.1:{LOADTEST_PORT}"
+    with tempfile.TemporaryDirectory(prefix='loadtest-') as tmp_dir:
+        env = {
+            **os.environ, **isolated_env(tmp_dir),
+            'PYTHONPATH': os.pathsep.join([os.path.join(SERVICE_ROOT, 'src'), SERVICE_ROOT])
+        }
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'benchmarks.load_test_app:app',
+             '--host', '127.0.0.1', '--port', str(LOADTEST_PORT),
+             '--workers', str(workers), '--log-level', 'warning'],
+            cwd=os.path.dirname(SERVICE_ROOT), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(base_url, process)
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            return asyncio.run(sweep(
+                lambda: httpx.AsyncClient(base_url=base_url, timeout=LOADTEST_TIMEOUT_S, limits=limits),
+                f"uvicorn, {workers} worker"
+            ))
+        finally:
+            process.terminate()
+            process.wait(10)
+
+
+def run_inprocess():
+    # Göreli MODEL_PATH (ai-service/data/processed/...) depo kökünden çözülür; uvicorn modundaki gibi
+    previous_cwd = os.getcwd()
+    os.chdir(os.path.dirname(SERVICE_ROOT))
+    try:
+        return run_app_inprocess()
+    finally:
+        os.chdir(previous_cwd)
+
+
+def run_app_inprocess():
+    with tempfile.TemporaryDirectory(prefix='loadtest-') as tmp_dir:
+        os.environ.update(isolated_env(tmp_dir))
+        from benchmarks.load_test_app import SERVER_THREADS, app
+
+        async def main():
+            import anyio.to_thread
+            anyio.to_thread.current_default_thread_limiter().total_tokens = SERVER_THREADS
+            transport = httpx.ASGITransport(app=app)
+            return await sweep(
+                lambda: httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=LOADTEST_TIMEOUT_S),
+                f"in-process, {SERVER_THREADS} iş parçacığı"
+            )
+
+        # Tahmin akışının ayrıntılı çıktısı rapora karışmasın
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            saturation = asyncio.run(main())
+        return saturation
+
+
+def main():
+    print(f"🚦 Yük testi: mod={LOADTEST_MODE}, rps={LOADTEST_RPS}, süre={LOADTEST_DURATION_S:.0f} s, "
+          f"{len(get_region_catalog().table)} ilçe ± {LOADTEST_JITTER_KM} km")
+
+    if LOADTEST_MODE == 'inprocess':
+        saturation = run_inprocess()
+        print(f"\nÖzet: in-process doygunluk {saturation} rps")
+        return 0
+
+    summary = {workers: run_uvicorn(workers) for workers in LOADTEST_WORKERS}
+    print("\nÖzet (worker -> doygunluk rps):")
+    for workers, saturation in summary.items():
+        print(f"  {workers:>2} worker: {saturation if saturation is not None else '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
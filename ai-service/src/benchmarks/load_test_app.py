@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import hashlib
+from contextlib import asynccontextmanager
+
+import pandas as pd
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(SERVICE_ROOT)
+sys.path.append(os.path.join(SERVICE_ROOT, 'src'))
+
+os.environ.setdefault('WARMUP_ON_STARTUP', '0')
+os.environ.setdefault('API_JOB_WORKERS', '0')
+
+from gee import gee_backend
+import solidgrids.get_soil_properties_for_point as soilgrids
+
+# Sahte upstream gecikmeleri (ms); her çağrı latency ± jitter kadar bekler
+GEE_LATENCY_MS = float(os.getenv('LOADTEST_GEE_LATENCY_MS', '50'))
+GEE_JITTER_MS = float(os.getenv('LOADTEST_GEE_JITTER_MS', '20'))
+SOIL_LATENCY_MS = float(os.getenv('LOADTEST_SOIL_LATENCY_MS', '300'))
+SOIL_JITTER_MS = float(os.getenv('LOADTEST_SOIL_JITTER_MS', '100'))
+# anyio iş parçacığı havuzu boyutu (senkron uç noktalar bu havuzda çalışır)
+SERVER_THREADS = int(os.getenv('LOADTEST_THREADS', '40'))
+
+BAND_RANGES = {
+    'NDVI': (0.1, 0.8),
+    'precipitation': (0.0, 80.0),
+    'temp_C': (0.0, 30.0),
+}
+SOIL_PROPERTIES = ["clay", "sand", "silt", "phh2o", "cec", "soc"]
+SOIL_DEPTHS = ["0-5cm", "5-15cm", "15-30cm"]
+
+
+def _sleep(latency_ms, jitter_ms):
+    time.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+
+def _unit(key):
+    # Aynı sorgu her zaman aynı değeri döndürür
+    return int(gee_backend.request_digest(key)[:8], 16) / 0xFFFFFFFF
+
+
+class SyntheticBackend:
+    """Kimlik bilgisi ve ağ gerektirmeyen, gecikmesi ayarlanabilir sahte GEE backend'i."""
+
+    name = 'synthetic'
+
+    def init(self):
+        pass
+
+    def fetch(self, key, request):
+        _sleep(GEE_LATENCY_MS, GEE_JITTER_MS)
+        u = _unit(key)
+        if key['op'] == 'elevation':
+            return {'elevation': 900 + 600 * u}
+        if key['op'] == 'thumb_url':
+            return 'http://localhost/thumb.png'
+        low, high = BAND_RANGES.get(key.get('band'), (0.0, 1.0))
+        return {key['band']: low + (high - low) * u}
+
+
+def synthetic_soil_properties(lon, lat, timeout=30):
+    _sleep(SOIL_LATENCY_MS, SOIL_JITTER_MS)
+    seed = int(hashlib.sha1(f"{lat:.4f},{lon:.4f}".encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    return pd.DataFrame([
+        {'property': p, 'depth': d, 'value': rng.uniform(5, 60), 'unit': ''}
+        for p in SOIL_PROPERTIES for d in SOIL_DEPTHS
+    ])
+
+
+def install_fakes():
+    gee_backend.set_backend(SyntheticBackend())
+    soilgrids.get_soil_properties_for_point = synthetic_soil_properties
+
+
+install_fakes()
+
+from api import app
+
+_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan(app_):
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = SERVER_THREADS
+    async with _lifespan(app_) as state:
+        yield state
+
+
+app.router.lifespan_context = lifespan
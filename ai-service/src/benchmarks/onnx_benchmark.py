@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_yield import MODEL_PATH, QUANTILE_MODEL_PATH, load_model, load_quantile_model, predict_matrix
+from onnx_model import export_onnx, load_onnx, onnx_model_path, verify_onnx
+from benchmarks.explain_benchmark import REPEATS, sample_inputs, time_call
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Çok iş parçacıklı ONNX oturumu için iş parçacığı sayısı (tek iş parçacıklı oturum her zaman ölçülür)
+THREADS = int(os.getenv('ONNX_BENCH_THREADS', str(os.cpu_count() or 1)))
+PARITY_TOLERANCE = float(os.getenv('ONNX_PARITY_TOLERANCE', '1e-4'))
+
+
+def onnx_source(model, path, tmp_dir):
+    # Diskte .onnx yoksa geçici dizine dönüştürülür (model klasörü değiştirilmez)
+    if os.path.exists(onnx_model_path(path)):
+        return path
+    target = os.path.join(tmp_dir, os.path.basename(path))
+    export_onnx(model, target)
+    return target
+
+
+def main():
+    model = load_model(backend='xgboost')
+    quantile_model = load_quantile_model()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        return run(model, quantile_model, tmp_dir)
+
+
+def run(model, quantile_model, tmp_dir):
+    point_path = onnx_source(model, MODEL_PATH, tmp_dir)
+    sessions = {'onnx 1t': load_onnx(point_path, intra_op_threads=1)}
+    if THREADS > 1:
+        sessions[f"onnx {THREADS}t"] = load_onnx(point_path, intra_op_threads=THREADS)
+
+    # Eşlik: nokta ve (varsa) quantile modeli, eksik değerli satırlar dahil
+    parity = sample_inputs(model, 5000)
+    parity = parity.mask(np.random.default_rng(1).random(parity.shape) < 0.05)
+    try:
+        checks = {'nokta': verify_onnx(model, sessions['onnx 1t'], parity, PARITY_TOLERANCE)}
+        if quantile_model is not None:
+            quantile_path = onnx_source(quantile_model, QUANTILE_MODEL_PATH, tmp_dir)
+            checks['quantile'] = verify_onnx(quantile_model, load_onnx(quantile_path, intra_op_threads=1),
+                                             parity, PARITY_TOLERANCE)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print("✅ Eşlik: " + ", ".join(f"{name} en büyük fark {diff:.1e}" for name, diff in checks.items()))
+
+    names = ['xgboost'] + list(sessions)
+    print(f"{'batch':>6} | " + " | ".join(f"{name + ' (ms)':>14} | {'satır/s':>10}" for name in names))
+    for n in BATCH_SIZES:
+        X = np.ascontiguousarray(sample_inputs(model, n).to_numpy(dtype=np.float32))
+        repeats = REPEATS if n <= 1000 else 5
+        timings = [time_call(lambda: predict_matrix(model, X), repeats)]
+        timings += [time_call(lambda s=s: s.predict_matrix(X), repeats) for s in sessions.values()]
+        print(f"{n:>6} | " + " | ".join(f"{ms:>14.3f} | {n / (ms / 1000):>10.0f}" for ms in timings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+import sys
+import asyncio
+import tempfile
+import contextlib
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import SERVICE_ROOT, isolated_env
+
+# Profilli bir /predict'te (soğuk önbellek) örneklenmesi gereken upstream aşamaları
+EXPECTED_STAGES = ['gee_monthly_means', 'gee_elevation', 'soil_fetch']
+CHECK_LAT = float(os.getenv('PROFILE_CHECK_LAT', '37.87'))
+CHECK_LON = float(os.getenv('PROFILE_CHECK_LON', '32.48'))
+
+
+def profiled_predict():
+    """Sahte upstream (gecikmeli) ve boş önbellekle tek bir ?profile=true /predict çağrısı."""
+    with tempfile.TemporaryDirectory(prefix='profilecheck-') as tmp_dir:
+        os.environ.update(isolated_env(tmp_dir))
+        os.environ['PROFILE_DIR'] = os.path.join(tmp_dir, 'profiles')
+        # Örnekleme aralığından (5 ms) uzun sahte gecikmeler; upstream iş parçacıkları örneklensin
+        os.environ.setdefault('LOADTEST_GEE_LATENCY_MS', '30')
+        os.environ.setdefault('LOADTEST_GEE_JITTER_MS', '0')
+        os.environ.setdefault('LOADTEST_SOIL_LATENCY_MS', '100')
+        os.environ.setdefault('LOADTEST_SOIL_JITTER_MS', '0')
+        from benchmarks.load_test_app import app
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://profilecheck', timeout=120) as client:
+                response = await client.post('/predict', params={'profile': 'true'},
+                                              json={'lat': CHECK_LAT, 'lon': CHECK_LON, 'hectare': 1})
+                return response.json()
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return asyncio.run(main())
+
+
+def main():
+    # Göreli MODEL_PATH depo kökünden çözülür
+    os.chdir(os.path.dirname(SERVICE_ROOT))
+    body = profiled_predict()
+    if body.get('status') != 'success':
+        print(f"❌ /predict başarısız: {body.get('message')}")
+        return 1
+
+    stages = body['data']['profile']['stages_ms']
+    print(f"⏱️ {body['data']['profile']['duration_ms']} ms")
+    for stage, ms in sorted(stages.items(), key=lambda item: -item[1]):
+        print(f"{ms:>10.1f} ms | {stage}")
+
+    missing = [stage for stage in EXPECTED_STAGES if not stages.get(stage)]
+    if missing:
+        print(f"❌ Upstream aşamaları profilde yok: {', '.join(missing)}")
+        return 1
+    print("✅ Upstream aşamaları (GEE, SoilGrids) profilde görünüyor.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
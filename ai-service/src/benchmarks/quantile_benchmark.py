@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_yield import QUANTILE_MODEL_PATH, load_model, load_quantile_model, predict_matrix, predict_quantiles
+from benchmarks.explain_benchmark import REPEATS, sample_inputs, time_call
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Yeni yolun (paylaşılan float32 matris üzerinde nokta + aralık) eski yola
+# (DataFrame üzerinde model.predict) göre kabul edilen en fazla süre oranı
+MAX_OVERHEAD_RATIO = float(os.getenv('QUANTILE_MAX_OVERHEAD_RATIO', '3'))
+
+
+def main():
+    model = load_model()
+    quantile_model = load_quantile_model()
+    if quantile_model is None:
+        print(f"❌ Quantile modeli bulunamadı: {QUANTILE_MODEL_PATH} (train_model.py'yi çalıştırın)")
+        return 1
+
+    print(f"{'batch':>6} | {'eski (ms)':>9} | {'nokta (ms)':>10} | {'nokta+aralık (ms)':>17} | {'oran':>6} | {'kapsama':>7}")
+
+    worst = 0.0
+    for n in BATCH_SIZES:
+        frame = sample_inputs(model, n)
+        X = np.ascontiguousarray(frame.to_numpy(dtype=np.float32))
+        repeats = REPEATS if n <= 1000 else 5
+
+        def point_and_interval():
+            predict_matrix(model, X)
+            predict_quantiles(quantile_model, X)
+
+        previous = time_call(lambda: model.predict(frame), repeats)
+        plain = time_call(lambda: predict_matrix(model, X), repeats)
+        both = time_call(point_and_interval, repeats)
+        ratio = both / previous
+        worst = max(worst, ratio)
+
+        # P10 <= nokta tahmini <= P90 olan satırların oranı (tutarlılık göstergesi)
+        _, values = predict_quantiles(quantile_model, X)
+        point = predict_matrix(model, X)
+        coverage = np.mean((values[:, 0] <= point) & (point <= values[:, -1]))
+        if not np.allclose(point, model.predict(frame), atol=1e-4):
+            print("❌ inplace_predict sonucu model.predict ile uyuşmuyor!")
+            return 1
+        print(f"{n:>6} | {previous:>9.3f} | {plain:>10.3f} | {both:>17.3f} | {ratio:>5.1f}x | {coverage:>7.0%}")
+
+    if worst > MAX_OVERHEAD_RATIO:
+        print(f"❌ Aralık ek yükü {worst:.1f}x > {MAX_OVERHEAD_RATIO:.1f}x")
+        return 1
+    print(f"✅ En kötü ek yük {worst:.1f}x (sınır {MAX_OVERHEAD_RATIO:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_yield import feature_matrix, load_model, load_quantile_model, predict_matrix, predict_quantiles
+from scenarios import resolve_scenarios, scenario_matrix, score_matrix
+from benchmarks.explain_benchmark import sample_inputs, time_call
+
+SCENARIO_COUNTS = [1, 10, 100, 500]
+# Yağış -%50..+%50 ve sıcaklık -3..+3 °C kombinasyonlarından senaryo listesi
+RAIN_STEPS = [f"{p}%" for p in range(-50, 51, 5)]
+TEMP_STEPS = [t / 2 for t in range(-6, 7)]
+
+
+def scenario_list(n):
+    combos = [{'changes': {'Rain_*': rain, 'temp_C_*': temp}} for rain in RAIN_STEPS for temp in TEMP_STEPS]
+    return (combos * (n // len(combos) + 1))[:n]
+
+
+def main():
+    model = load_model()
+    quantile_model = load_quantile_model()
+    features = list(model.feature_names_in_)
+    base_row = feature_matrix(sample_inputs(model, 1), features)[0]
+
+    print(f"{'senaryo':>7} | {'tek matris (ms)':>15} | {'satır satır (ms)':>16} | {'hızlanma':>8}")
+    for n in SCENARIO_COUNTS:
+        resolved = resolve_scenarios(scenario_list(n), features)
+
+        def vectorized():
+            score_matrix(model, quantile_model, scenario_matrix(base_row, resolved, features), features)
+
+        def row_by_row():
+            # Her senaryo ayrı bir /predict gibi: tek satırlık matris, ayrı nokta + quantile çağrısı
+            matrix = scenario_matrix(base_row, resolved, features)
+            for row in matrix:
+                single = row[np.newaxis, :]
+                predict_matrix(model, single)
+                if quantile_model is not None:
+                    predict_quantiles(quantile_model, single)
+
+        repeats = 20 if n <= 100 else 5
+        fast = time_call(vectorized, repeats)
+        slow = time_call(row_by_row, repeats)
+        print(f"{n:>7} | {fast:>15.3f} | {slow:>16.3f} | {slow / fast:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
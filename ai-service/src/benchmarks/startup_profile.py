@@ -0,0 +1,87 @@
+import os
+import re
+import sys
+import json
+import subprocess
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TOP_N = int(os.getenv('STARTUP_PROFILE_TOP', '25'))
+# Servisin açılışında yüklenmemesi gereken (tembel yüklenen) ağır modüller
+DEFERRED_MODULES = ['ee', 'sklearn', 'joblib', 'scipy', 'xgboost']
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+# Alt süreçte çalışır: api içe aktarılır, ardından ilk model yüklemesi ölçülür
+CHILD = """
+import sys, json, time
+t = time.perf_counter()
+import api
+import_s = time.perf_counter() - t
+def loaded():
+    # LazyLoader ile kaydedilen ama henüz çalıştırılmamış modüller sayılmaz
+    return sorted(m for m in %(deferred)r if m in sys.modules and type(sys.modules[m]).__name__ != '_LazyModule')
+loaded_after_import = loaded()
+from predict_yield import load_model, model_available
+t = time.perf_counter()
+if model_available():
+    load_model()
+load_s = time.perf_counter() - t
+print('STARTUP_PROFILE ' + json.dumps({
+    'import_s': import_s, 'model_load_s': load_s,
+    'loaded_after_import': loaded_after_import,
+    'loaded_after_model': loaded()
+}))
+"""
+
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': len(indent) // 2
+            })
+    return modules
+
+
+def profile_startup():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD % {'deferred': DEFERRED_MODULES}],
+        cwd=os.path.dirname(SERVICE_ROOT), capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': SERVICE_ROOT, 'WARMUP_ON_STARTUP': '0', 'API_JOB_WORKERS': '0'}
+    )
+    summary = None
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_PROFILE '):
+            summary = json.loads(line[len('STARTUP_PROFILE '):])
+    if summary is None:
+        raise RuntimeError(f"Profil alınamadı:\n{result.stderr[-2000:]}")
+    return summary, parse_importtime(result.stderr)
+
+
+def main():
+    summary, modules = profile_startup()
+
+    print(f"⏱️ import api: {summary['import_s'] * 1000:.0f} ms | ilk model yüklemesi: {summary['model_load_s'] * 1000:.0f} ms")
+    print(f"\n{'kümülatif (ms)':>14} | {'kendi (ms)':>10} | modül")
+    top_level = [m for m in modules if m['depth'] <= 2]
+    for m in sorted(top_level, key=lambda m: -m['cumulative_ms'])[:TOP_N]:
+        print(f"{m['cumulative_ms']:>14.1f} | {m['self_ms']:>10.1f} | {'  ' * m['depth']}{m['module']}")
+
+    print(f"\nAçılışta yüklenen ağır modüller: {', '.join(summary['loaded_after_import']) or '-'}")
+    print(f"Model yüklendikten sonra: {', '.join(summary['loaded_after_model']) or '-'}")
+
+    if 'ee' in summary['loaded_after_import'] or 'sklearn' in summary['loaded_after_import']:
+        print("❌ ee/sklearn açılışta yükleniyor; servis yolu tembel olmalı.")
+        return 1
+    print("✅ ee ve sklearn açılışta yüklenmiyor.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+from training_data import TRAINING_DATA_PATH, load_training_data, quantile_dmatrix
+
+# train_model.py'deki nihai parametreler; tarama bunların etrafında yapılır
+BASE_PARAMS = {
+    'eta': 0.03,
+    'max_depth': 5,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'seed': 42,
+    'objective': 'reg:squarederror'
+}
+NUM_ROUNDS = int(os.getenv('TRAINING_BENCH_ROUNDS', '300'))
+GRID = [{'max_depth': d, 'eta': eta} for d in (3, 5, 7) for eta in (0.03, 0.1)]
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else TRAINING_DATA_PATH
+    if not os.path.exists(path):
+        print(f"❌ Eğitim verisi bulunamadı: {path}")
+        return 1
+
+    # 1. Veri: CSV okuma + temizlik ile önbellekten yükleme
+    _, cold = timed(lambda: load_training_data(path, refresh=True))
+    (X, y, _), warm = timed(lambda: load_training_data(path))
+    print(f"\n📂 Veri ({len(X)} satır, {X.shape[1]} özellik): CSV + temizlik {cold:.2f} s | önbellek {warm:.3f} s")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
+
+    # 2. Ağaç yöntemi: eski varsayılan (float64, exact) ile hist (float32)
+    print(f"\n🌲 {NUM_ROUNDS} ağaç:")
+    for label, frame, method in (('exact / float64', X_train.astype(np.float64), 'exact'),
+                                 ('hist / float32', X_train, 'hist')):
+        model = xgb.XGBRegressor(n_estimators=NUM_ROUNDS, learning_rate=0.03, max_depth=5, subsample=0.8,
+                                 colsample_bytree=0.8, tree_method=method, random_state=42, n_jobs=-1)
+        _, seconds = timed(lambda: model.fit(frame, y_train))
+        rmse = float(np.sqrt(np.mean((model.predict(X_test) - y_test.to_numpy()) ** 2)))
+        print(f"   {label:<16} {seconds:>7.2f} s | RMSE {rmse:.4f}")
+
+    # 3. Hiperparametre taraması: kovalanmış matris bir kez kurulur, her denemede paylaşılır
+    t = time.perf_counter()
+    dtrain = quantile_dmatrix(X_train, y_train)
+    dtest = quantile_dmatrix(X_test, y_test, ref=dtrain)
+    build = time.perf_counter() - t
+    print(f"\n🔎 Tarama (QuantileDMatrix bir kez: {build * 1000:.0f} ms):")
+    total = 0.0
+    for grid_params in GRID:
+        params = {**BASE_PARAMS, **grid_params, 'tree_method': 'hist'}
+        booster, seconds = timed(lambda: xgb.train(params, dtrain, NUM_ROUNDS))
+        total += seconds
+        rmse = float(np.sqrt(np.mean((booster.predict(dtest) - y_test.to_numpy()) ** 2)))
+        print(f"   max_depth={params['max_depth']} eta={params['eta']:<5} {seconds:>6.2f} s | RMSE {rmse:.4f}")
+    print(f"   Toplam: {total:.2f} s ({len(GRID)} deneme)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,141 +1,127 @@
 import pandas as pd
 import os
-from tqdm import tqdm
-import time
-import requests
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from tuik.clean_tuik_data import clean_tuik_data
-from gee.collect_point_data import collect_point_data
-
-ILCE_KOORDINATLARI = {
-    'Ahırlı': {'enlem': 37.4688, 'boylam': 32.1755},
-    'Akören': {'enlem': 37.6650, 'boylam': 32.5180},
-    'Akşehir': {'enlem': 38.396900, 'boylam': 31.395134},
-    'Altınekin': {'enlem': 38.4010, 'boylam': 33.0400},
-    'Beyşehir': {'enlem': 37.648755, 'boylam': 31.739495},
-    'Bozkır': {'enlem': 37.1950, 'boylam': 32.2280},
-    'Çeltik': {'enlem': 39.0080, 'boylam': 31.7950},
-    'Cihanbeyli': {'enlem': 38.6800, 'boylam': 32.8600},
-    'Çumra': {'enlem': 37.578325, 'boylam': 32.824190},
-    'Derbent': {'enlem': 38.0790, 'boylam': 32.0500},
-    'Derebucak': {'enlem': 37.4250, 'boylam': 31.6700},
-    'Doğanhisar': {'enlem': 38.1410, 'boylam': 31.6900},
-    'Emirgazi': {'enlem': 38.0410, 'boylam': 33.8250},
-    'Ereğli': {'enlem': 37.4800, 'boylam': 34.0500},
-    'Güneysınır': {'enlem': 37.2850, 'boylam': 32.7000},
-    'Hadim': {'enlem': 36.9890, 'boylam': 32.4350},
-    'Halkapınar': {'enlem': 37.3820, 'boylam': 34.1950},
-    'Hüyük': {'enlem': 37.9420, 'boylam': 31.6200},
-    'Ilgın': {'enlem': 38.300719, 'boylam': 31.872345},
-    'Kadınhanı': {'enlem': 38.3000, 'boylam': 32.2800},
-    'Karapınar': {'enlem': 37.7300, 'boylam': 33.5200},
-    'Karatay': {'enlem': 37.9500, 'boylam': 32.6500},
-    'Kulu': {'enlem': 39.1000, 'boylam': 33.0400},
-    'Meram': {'enlem': 37.8200, 'boylam': 32.3800},
-    'Sarayönü': {'enlem': 38.2800, 'boylam': 32.4100},
-    'Selçuklu': {'enlem': 38.0000, 'boylam': 32.5000},
-    'Seydişehir': {'enlem': 37.4350, 'boylam': 31.8700},
-    'Taşkent': {'enlem': 36.9400, 'boylam': 32.4850},
-    'Tuzlukçu': {'enlem': 38.4750, 'boylam': 31.6700},
-    'Yalıhüyük': {'enlem': 37.3100, 'boylam': 32.0900},
-    'Yunak': {'enlem': 38.8000, 'boylam': 31.7600},
-}
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tuik.clean_tuik_data import clean_tuik_data, verim_path
+from gee import batch_export, district_sampling
+from feature_providers import FeatureExecutor, SatelliteProvider, SoilGridsProvider, TerrainProvider, assemble
+from regions import district_id, get_region_catalog, slugify
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 PROCESSED_DATA_DIR = PROJECT_ROOT / 'data' / 'processed'
-VERIM_FILE_PATH = PROCESSED_DATA_DIR / 'konya_bugday_verim.csv'
 FINAL_TRAINING_DATA_PATH = PROCESSED_DATA_DIR / 'final_training_data.csv'
 FINAL_TRAINING_DATA_WITH_SOIL_PATH = PROCESSED_DATA_DIR / 'final_training_data_with_soil.csv'
-
-def get_soil_properties_for_point(lon, lat):
-    BASE_URL = "https://rest.isric.org/soilgrids/v2.0/properties/query"
-    params = {
-        'lon': lon,
-        'lat': lat,
-        'property': ["clay", "sand", "silt", "phh2o", "cec", "soc"],
-        'depth': ["0-5cm", "5-15cm", "15-30cm"],
-        'value': ["mean"]
-    }
-
-    try:
-        response = requests.get(BASE_URL, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-    except Exception:
-        print(f"Toprak verisi alınamadı: lon={lon}, lat={lat}")
+TRAINING_RADIUS = 5000
+# 'interactive': ilçe/yıl başına getInfo çağrıları; 'batch': Earth Engine Export.table görevleri;
+# 'sampled': ilçe başına DISTRICT_SAMPLE_POINTS nokta, toplu reduceRegions ve ağırlıklı ilçe özeti
+HARVEST_MODE = os.getenv('HARVEST_MODE', 'interactive')
+# Virgülle ayrılmış il listesi; boşsa katalogdaki tüm iller işlenir
+TRAINING_PROVINCES = [p.strip() for p in os.getenv('TRAINING_PROVINCES', '').split(',') if p.strip()]
+# İller ayrı süreçlerde paralel işlenir (her biri kendi GEE iş parçacığı havuzunu açar)
+PROVINCE_WORKERS = int(os.getenv('PROVINCE_WORKERS', '2'))
+MAX_WORKERS = 12
+# SoilGrids hız sınırı: çağrılar arasında en az bu kadar saniye (önbellekteki konumlar beklemez)
+TRAINING_SOIL_INTERVAL_S = float(os.getenv('TRAINING_SOIL_INTERVAL_S', '13'))
+
+def province_features_path(province):
+    return PROCESSED_DATA_DIR / f"{slugify(province)}_gee_features.csv"
+
+def harvest_interactive(verim_df, districts, max_workers):
+    # /predict ile aynı sağlayıcılar: uydu (ilçe, yıl) başına, yükseklik ilçe başına bir kez
+    verim_df = verim_df[verim_df['Ilce'].isin(districts)]
+    print(f"\n--- GEE Verileri İndiriliyor (Toplam {len(verim_df)} Satır) ---")
+
+    executor = FeatureExecutor([SatelliteProvider(), TerrainProvider()], max_workers=max_workers, resilient=False)
+    points = [(districts[ilce]['enlem'], districts[ilce]['boylam'], int(yil))
+              for ilce, yil in zip(verim_df['Ilce'], verim_df['Yil'])]
+    rows = executor.collect(points, TRAINING_RADIUS, desc="GEE İndirme")
+    kept = [i for i, row in enumerate(rows) if row is not None]
+    if not kept:
         return None
 
-    processed_data = []
-    properties = data.get('properties', {})
-    layers = properties.get('layers', [])
-
-    for layer in layers:
-        prop_name = layer.get('name', 'N/A')
-        for depth_info in layer.get('depths', []):
-            depth_label = depth_info.get('label', 'N/A')
-            values_dict = depth_info.get('values', {})
-            value = values_dict.get('mean')
-            if value is None:
-                continue
-
-            if prop_name in ["clay", "sand", "silt"]:
-                value /= 10
-            elif prop_name == "phh2o":
-                value /= 10
-            elif prop_name == "soc":
-                value /= 10
-
-            feature_name = f"soil_{prop_name}_{depth_label.replace('-', '_')}"
-            processed_data.append({'feature_name': feature_name, 'value': round(value, 2)})
-
-    if not processed_data:
+    # Eğitim tablosu boşlukları korur; ilçe/yıl komşuluğuyla train_model'de doldurulur
+    final_df, _ = assemble([rows[i] for i in kept], executor.columns, fill_value=None)
+    final_df.insert(0, 'nnokta_id', verim_df['Ilce'].to_numpy()[kept])
+    final_df['verim_ton_hektar'] = verim_df['Verim_Ton_Hektar'].to_numpy()[kept]
+    return final_df
+
+def harvest_batch(verim_df, districts, province):
+    # Tüm ilçe/yıl tabloları batch görevleriyle üretilir; etkileşimli kotaya bağlı değildir
+    districts = {ilce: districts[ilce] for ilce in verim_df['Ilce'].unique() if ilce in districts}
+    years = sorted(int(y) for y in verim_df['Yil'].unique())
+    # Her il kendi görev adları ve dışa aktarma dizini ile çalışır
+    slug = slugify(province)
+    store = batch_export.ExportStore(batch_export.EXPORT_DIR / slug)
+    features_df = batch_export.harvest(districts, years, TRAINING_RADIUS, store=store, prefix=f"{slug}_")
+    if features_df.empty:
         return None
 
-    df = pd.DataFrame(processed_data)
-    wide_df = df.set_index('feature_name').transpose()
-    wide_df.reset_index(drop=True, inplace=True)
-    return wide_df
+    yields = verim_df.rename(columns={'Ilce': 'nnokta_id', 'Yil': 'yil', 'Verim_Ton_Hektar': 'verim_ton_hektar'})
+    yields = yields[['nnokta_id', 'yil', 'verim_ton_hektar']]
+    return pd.merge(features_df, yields, on=['nnokta_id', 'yil'], how='inner')
 
-def process_row(row):
-    ilce = row['Ilce']
-    yil = row['Yil']
-    
-    if ilce not in ILCE_KOORDINATLARI:
-        return None
-        
-    coords = ILCE_KOORDINATLARI[ilce]
-    lat, lon = coords['enlem'], coords['boylam']
-    
-    date_start = f"{yil}-03-01"
-    date_end = f"{yil}-08-31" 
-    
+def harvest_sampled(verim_df, districts):
+    # Merkez yerine ilçe içine yayılmış noktalar; servis ile aynı tampon yarıçapı kullanılır
+    districts = {ilce: districts[ilce] for ilce in verim_df['Ilce'].unique() if ilce in districts}
+    years = sorted(int(y) for y in verim_df['Yil'].unique())
     try:
-        gee_df = collect_point_data(
-            lon=lon,
-            lat=lat,
-            date_start=date_start,
-            date_end=date_end,
-            region_radius=5000
-        )
-    except Exception:
+        features_df = district_sampling.collect_district_features(districts, years)
+    except Exception as e:
+        print(f"Alt örnekleme başarısız: {e}")
+        return None
+    if features_df.empty:
         return None
 
-    if gee_df is None or gee_df.empty:
+    yields = verim_df.rename(columns={'Ilce': 'nnokta_id', 'Yil': 'yil', 'Verim_Ton_Hektar': 'verim_ton_hektar'})
+    yields = yields[['nnokta_id', 'yil', 'verim_ton_hektar']]
+    return pd.merge(features_df, yields, on=['nnokta_id', 'yil'], how='inner')
+
+def build_province(province):
+    """Bir ilin TÜİK verisini temizler ve GEE özelliklerini toplar; sonuç il bazında diske yazılır."""
+    output_path = province_features_path(province)
+    if output_path.exists():
+        print(f"{province}: GEE verisi zaten var, okunuyor: {output_path}")
+        return output_path
+
+    if not verim_path(province).exists():
+        clean_tuik_data(province)
+    verim_df = pd.read_csv(verim_path(province))
+    districts = get_region_catalog().districts(province)
+    missing = sorted(set(verim_df['Ilce']) - set(districts))
+    if missing:
+        print(f"⚠️ {province}: katalogda koordinatı olmayan ilçeler atlanıyor: {', '.join(map(str, missing))}")
+
+    if HARVEST_MODE == 'batch':
+        final_df = harvest_batch(verim_df, districts, province)
+    elif HARVEST_MODE == 'sampled':
+        final_df = harvest_sampled(verim_df, districts)
+    else:
+        final_df = harvest_interactive(verim_df, districts, MAX_WORKERS)
+
+    if final_df is None:
+        print(f"Hata: {province} için GEE verisi oluşturulamadı.")
         return None
-        
-    gee_features = gee_df.iloc[0].to_dict()
-    
-    final_row = {
-        'nnokta_id': ilce,
-        'yil': yil,
-        'enlem': lat,
-        'boylam': lon,
-        **gee_features,
-        'verim_ton_hektar': row['Verim_Ton_Hektar']
-    }
-    return final_row
+
+    # İlçe adları iller arasında tekrarlanabilir; kimlik 'İl/İlçe' olarak tutulur
+    final_df['nnokta_id'] = [district_id(province, ilce) for ilce in final_df['nnokta_id']]
+    final_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    return output_path
+
+def build_provinces(provinces, workers=PROVINCE_WORKERS):
+    paths = []
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(provinces)))) as executor:
+        futures = {executor.submit(build_province, province): province for province in provinces}
+        for future in as_completed(futures):
+            province = futures[future]
+            try:
+                path = future.result()
+            except (Exception, SystemExit) as e:
+                print(f"⚠️ {province} işlenemedi: {e}")
+                continue
+            if path is not None:
+                paths.append(path)
+    return sorted(paths)
 
 def main():
     os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
@@ -143,41 +129,19 @@ def main():
     
     if not os.path.exists(FINAL_TRAINING_DATA_PATH):
         print(f"'{FINAL_TRAINING_DATA_PATH}' oluşturuluyor...")
-        
-        if not os.path.exists(VERIM_FILE_PATH):
-            try:
-                clean_tuik_data()
-            except Exception as e:
-                print(f"TUIK verisi hazırlanırken hata: {e}")
-                return
-    
-        try:
-            verim_df = pd.read_csv(VERIM_FILE_PATH)
-        except Exception as e:
-            print(f"Verim dosyası okunamadı: {e}")
-            return
-       
-        all_rows = []
-        MAX_WORKERS = 12
 
-        print(f"\n--- GEE Verileri İndiriliyor (Toplam {len(verim_df)} Satır) ---")
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [executor.submit(process_row, row) for _, row in verim_df.iterrows()]
-            
-            for future in tqdm(as_completed(futures), total=len(futures), unit="işlem", desc="GEE İndirme"):
-                result = future.result()
-                if result: 
-                    all_rows.append(result)
-
-        if not all_rows:
+        provinces = TRAINING_PROVINCES or get_region_catalog().provinces()
+        print(f"🗺️ {len(provinces)} il işlenecek ({PROVINCE_WORKERS} süreç): {', '.join(provinces)}")
+        paths = build_provinces(provinces)
+
+        if not paths:
             print("Hata: GEE verisi oluşturulamadı.")
             return
 
-        final_df = pd.DataFrame(all_rows)
+        final_df = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True, sort=False)
         final_df = final_df.dropna(axis=1, how='all')
         
-        cols = ['nnokta_id', 'yil', 'enlem', 'boylam']
+        cols = ['nnokta_id', 'yil', 'enlem', 'boylam', 'Latitude', 'Longitude', 'elevation']
         remaining_cols = [c for c in final_df.columns if c not in cols and c != 'verim_ton_hektar']
         final_order = cols + remaining_cols + ['verim_ton_hektar']
         final_order = [c for c in final_order if c in final_df.columns]
@@ -196,28 +160,16 @@ def main():
 
     print("\n--- SoilGrids Veri Ekleme Aşaması ---")
     
-    unique_locations = training_df[['nnokta_id', 'enlem', 'boylam']].drop_duplicates().reset_index(drop=True)
-    all_soil_data = []
-
-    for index, loc_row in tqdm(unique_locations.iterrows(), total=unique_locations.shape[0], desc="Toprak Verisi", unit="ilçe"):
-        ilce = loc_row['nnokta_id']
-        lat = loc_row['enlem']
-        lon = loc_row['boylam']
-        
-        try:
-            soil_data_wide = get_soil_properties_for_point(lon, lat)
-            if soil_data_wide is not None:
-                soil_data_wide['nnokta_id'] = ilce
-                all_soil_data.append(soil_data_wide)
-        except Exception:
-            pass 
-        
-        if index < len(unique_locations) - 1:
-            time.sleep(13)
-
-    if all_soil_data:
-        final_soil_df = pd.concat(all_soil_data, ignore_index=True, sort=False)
-        final_df_with_soil = pd.merge(training_df, final_soil_df, on='nnokta_id', how='left')
+    unique_locations = training_df[['nnokta_id', 'enlem', 'boylam']].drop_duplicates('nnokta_id').reset_index(drop=True)
+    executor = FeatureExecutor([SoilGridsProvider(min_interval_s=TRAINING_SOIL_INTERVAL_S)], max_workers=1, resilient=False)
+    points = [(lat, lon, None) for lat, lon in zip(unique_locations['enlem'], unique_locations['boylam'])]
+    rows = executor.collect(points, TRAINING_RADIUS, desc="Toprak Verisi")
+    soil_df, _ = assemble(rows, executor.provider('soil').columns, fill_value=None)
+    soil_df = soil_df.dropna(how='all')
+
+    if not soil_df.empty:
+        soil_df.insert(0, 'nnokta_id', unique_locations['nnokta_id'].loc[soil_df.index])
+        final_df_with_soil = pd.merge(training_df, soil_df, on='nnokta_id', how='left')
     else:
         final_df_with_soil = training_df.copy()
     
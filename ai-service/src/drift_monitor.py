@@ -0,0 +1,206 @@
+import os
+import json
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from explain import BACKGROUND_FILENAME
+
+DRIFT_REFERENCE_FILENAME = 'konya_bugday_dagilim_referans.json'
+DRIFT_BINS = int(os.getenv('DRIFT_BINS', '10'))
+# PSI eşikleri: < 0.1 kararlı, 0.1-0.25 izlenmeli, > 0.25 kayma
+DRIFT_PSI_WARN = float(os.getenv('DRIFT_PSI_WARN', '0.1'))
+DRIFT_PSI_ALERT = float(os.getenv('DRIFT_PSI_ALERT', '0.25'))
+# Bu kadar gözlemden önce PSI hesaplanmaz (küçük örneklemde gürültülüdür)
+DRIFT_MIN_SAMPLES = int(os.getenv('DRIFT_MIN_SAMPLES', '30'))
+PSI_EPSILON = 1e-4
+# Serviste yıl her zaman REFERENCE_YEAR'dır; eğitim yıllarıyla karşılaştırmak yapısal bir farktır
+DRIFT_IGNORED_FEATURES = ('yil',)
+
+
+def build_reference(X, bins=DRIFT_BINS):
+    """Eğitim matrisinden özellik başına quantile kenarları ve kova oranları.
+
+    Kenarlar eğitim dağılımının quantile'larıdır; böylece eğitimde her kova yaklaşık
+    eşit doludur ve servis tarafındaki sayaçlar aynı kovalarla karşılaştırılır.
+    """
+    features = {}
+    for col in X.columns:
+        if col in DRIFT_IGNORED_FEATURES:
+            continue
+        values = pd.to_numeric(X[col], errors='coerce').to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        features[str(col)] = {
+            'edges': edges.tolist(),
+            'fractions': (counts / counts.sum()).tolist(),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'count': int(len(values))
+        }
+    return {'bins': bins, 'features': features}
+
+
+def save_reference(X, output_dir, bins=DRIFT_BINS):
+    path = os.path.join(output_dir, DRIFT_REFERENCE_FILENAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(build_reference(X, bins), f)
+    return path
+
+
+def load_reference(model_dir):
+    # Eğitimde yazılan referans yoksa açıklama arka plan örnekleminden üretilir
+    path = os.path.join(model_dir, DRIFT_REFERENCE_FILENAME)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f), path
+    background = os.path.join(model_dir, BACKGROUND_FILENAME)
+    if os.path.exists(background):
+        return build_reference(pd.read_csv(background)), background
+    return None, None
+
+
+def psi(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype=np.float64), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftMonitor:
+    """Servis edilen özellik vektörlerinin sabit bellekli akış özeti.
+
+    Her özellik için eğitim kenarlarıyla sabit bir histogram, Welford ortalama/varyans,
+    min/max ve boş değer sayacı tutulur; 0 ile doldurulan değerler yalnızca ayrı sayılır.
+    Bellek (özellik x kova) boyutundadır ve trafikten bağımsızdır. Güncelleme tüm özellikler için tek bir vektörel adımdır.
+    Yalnızca hesaplanan tahminler gözlenir (sonuç önbelleğinden dönen yanıtlar vektör taşımaz).
+    """
+
+    def __init__(self, reference, source=None):
+        self._lock = threading.Lock()
+        self.source = source
+        self.reference = {k: v for k, v in reference['features'].items() if k not in DRIFT_IGNORED_FEATURES}
+        self.names = list(self.reference)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        width = max((len(r['edges']) for r in self.reference.values()), default=0)
+        # Eksik kenarlar +inf ile doldurulur; bu kovalara hiçbir değer düşmez
+        self.edges = np.full((len(self.names), width), np.inf)
+        for i, name in enumerate(self.names):
+            edges = self.reference[name]['edges']
+            self.edges[i, :len(edges)] = edges
+        self.reset()
+
+    def reset(self):
+        n = len(self.names)
+        with self._lock:
+            self.counts = np.zeros((n, self.edges.shape[1] + 1), dtype=np.int64)
+            self.n = np.zeros(n, dtype=np.int64)
+            self.nan = np.zeros(n, dtype=np.int64)
+            self.mean = np.zeros(n)
+            self.m2 = np.zeros(n)
+            self.min = np.full(n, np.inf)
+            self.max = np.full(n, -np.inf)
+            self.zero_filled = np.zeros(n, dtype=np.int64)
+            self.observations = 0
+            self.quality = Counter()
+
+    def observe(self, features, zero_filled=(), flags=()):
+        """Tek bir servis vektörünü ekler.
+
+        `features`: özellik adı -> değer; `zero_filled`: upstream'de olmayıp 0 verilen
+        özellikler; `flags`: 'modis_fallback', 'soil_missing', 'degraded:gee' gibi olaylar.
+        """
+        x = np.array([features.get(name, np.nan) for name in self.names], dtype=np.float64)
+        filled = np.zeros(len(self.names), dtype=bool)
+        for name in zero_filled:
+            i = self._index.get(name)
+            if i is not None:
+                filled[i] = True
+        # 0 ile doldurulan değerler ölçüm değildir; dağılıma girmez, yalnızca zero_filled sayılır
+        missing = np.isnan(x)
+        valid = ~missing & ~filled
+        bins = (x[:, None] >= self.edges).sum(axis=1)
+
+        with self._lock:
+            self.observations += 1
+            self.quality.update(flags)
+            self.zero_filled += filled
+            self.nan += missing
+            rows = np.flatnonzero(valid)
+            self.counts[rows, bins[rows]] += 1
+            self.n[rows] += 1
+            delta = x[rows] - self.mean[rows]
+            self.mean[rows] += delta / self.n[rows]
+            self.m2[rows] += delta * (x[rows] - self.mean[rows])
+            self.min[rows] = np.minimum(self.min[rows], x[rows])
+            self.max[rows] = np.maximum(self.max[rows], x[rows])
+
+    def _feature_report(self, i, counts, n, mean, m2, lo, hi, nan, zero_filled):
+        name = self.names[i]
+        ref = self.reference[name]
+        width = len(ref['edges']) + 1
+        entry = {
+            'count': int(n),
+            'missing': int(nan),
+            'zero_filled': int(zero_filled),
+            'mean': round(float(mean), 4) if n else None,
+            'std': round(float(np.sqrt(m2 / n)), 4) if n else None,
+            'min': round(float(lo), 4) if n else None,
+            'max': round(float(hi), 4) if n else None,
+            'train_mean': round(ref['mean'], 4),
+            'train_std': round(ref['std'], 4),
+            'psi': None,
+            'status': 'insufficient_data'
+        }
+        if n >= DRIFT_MIN_SAMPLES:
+            value = psi(ref['fractions'], counts[:width] / n)
+            entry['psi'] = round(value, 4)
+            entry['mean_shift_std'] = round(float((mean - ref['mean']) / ref['std']), 3) if ref['std'] > 0 else None
+            entry['status'] = 'drift' if value > DRIFT_PSI_ALERT else 'warn' if value > DRIFT_PSI_WARN else 'ok'
+        return name, entry
+
+    def report(self):
+        with self._lock:
+            snapshot = (self.counts.copy(), self.n.copy(), self.mean.copy(), self.m2.copy(),
+                        self.min.copy(), self.max.copy(), self.nan.copy(), self.zero_filled.copy())
+            observations = self.observations
+            quality = dict(self.quality)
+
+        features = dict(self._feature_report(i, *(arr[i] for arr in snapshot)) for i in range(len(self.names)))
+        statuses = Counter(entry['status'] for entry in features.values())
+        ranked = sorted((e['psi'], name) for name, e in features.items() if e['psi'] is not None)
+        rate = (lambda c: round(c / observations, 4)) if observations else (lambda c: None)
+        return {
+            'reference': self.source,
+            'observations': observations,
+            'summary': dict(statuses),
+            'top_drift': [{'feature': name, 'psi': value} for value, name in reversed(ranked[-10:])],
+            'quality': {
+                'events': quality,
+                'event_rates': {event: rate(count) for event, count in quality.items()},
+                'zero_filled_features': {
+                    name: e['zero_filled'] for name, e in features.items() if e['zero_filled']
+                }
+            },
+            'features': features
+        }
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_drift_monitor(model_dir=None):
+    # Referans yoksa None döner; izleme sessizce devre dışı kalır
+    global _monitor
+    if _monitor is None and model_dir is not None:
+        with _monitor_lock:
+            if _monitor is None:
+                reference, source = load_reference(model_dir)
+                if reference is not None:
+                    _monitor = DriftMonitor(reference, source)
+    return _monitor
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+BACKGROUND_SIZE = 200
+BACKGROUND_FILENAME = 'konya_bugday_arkaplan_ornek.csv'
+
+_importances = {}
+_importances_lock = threading.Lock()
+
+
+def save_background(X, output_dir, size=BACKGROUND_SIZE, random_state=42):
+    # Küresel önem dereceleri için eğitim verisinden sabit bir örneklem saklanır
+    sample = X.sample(n=min(size, len(X)), random_state=random_state)
+    path = os.path.join(output_dir, BACKGROUND_FILENAME)
+    sample.to_csv(path, index=False)
+    return path
+
+
+def predict_with_contributions(model, input_vector):
+    # pred_contribs katkıları ve sapmayı (son sütun) döndürür; satır toplamı
+    # modelin çıktısına eşittir, yani tahmin ile açıklama tek çağrıda üretilir.
+    import xgboost as xgb
+
+    booster = model.get_booster()
+    matrix = xgb.DMatrix(input_vector, feature_names=list(input_vector.columns))
+    contribs = booster.predict(matrix, pred_contribs=True)
+    predictions = contribs.sum(axis=1)
+    return predictions, contribs[:, :-1], contribs[:, -1]
+
+
+def explain_row(feature_names, values, contributions, bias):
+    order = np.argsort(-np.abs(contributions))
+    return {
+        "base_value": round(float(bias), 4),
+        "contributions": [
+            {
+                "feature": str(feature_names[i]),
+                "value": round(float(values[i]), 4),
+                "contribution": round(float(contributions[i]), 4)
+            }
+            for i in order
+        ]
+    }
+
+
+def global_importances(model, model_path):
+    # Arka plan örnekleminde ortalama |katkı|; model dosyası değişene kadar önbellekte tutulur
+    background_path = os.path.join(os.path.dirname(model_path), BACKGROUND_FILENAME)
+    if not os.path.exists(background_path):
+        return None
+
+    cache_key = (model_path, os.path.getmtime(model_path), os.path.getmtime(background_path))
+    with _importances_lock:
+        if cache_key in _importances:
+            return _importances[cache_key]
+
+    features = list(model.feature_names_in_)
+    background = pd.read_csv(background_path)
+    for col in features:
+        if col not in background.columns:
+            background[col] = 0
+    _, contribs, _ = predict_with_contributions(model, background[features].astype(np.float32))
+
+    mean_abs = np.abs(contribs).mean(axis=0)
+    total = mean_abs.sum() or 1.0
+    importances = {
+        str(features[i]): round(float(mean_abs[i] / total), 4)
+        for i in np.argsort(-mean_abs)
+    }
+
+    with _importances_lock:
+        _importances.clear()
+        _importances[cache_key] = importances
+    return importances
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FEATURE_CACHE_PATH = Path(os.getenv('FEATURE_CACHE_PATH', PROJECT_ROOT / 'data' / 'cache' / 'features.sqlite'))
+# Bellekte tutulan en fazla satır (LRU); geri kalanı SQLite'tan okunur
+FEATURE_CACHE_MEMORY_MAX = int(os.getenv('FEATURE_CACHE_MEMORY_MAX', '8192'))
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+
+def make_key(*parts):
+    return '|'.join(str(p) for p in parts)
+
+
+class FeatureCache:
+    """GEE ve SoilGrids özellik satırları için bellek + SQLite önbelleği.
+
+    Değerler JSON'a çevrilebilen sözlüklerdir; `namespace` kaynak türünü
+    (ör. 'gee', 'soil') ayırır. Bellek katmanı en son kullanılan `memory_max` satırla sınırlıdır.
+    """
+
+    def __init__(self, path=FEATURE_CACHE_PATH, memory_max=FEATURE_CACHE_MEMORY_MAX):
+        self.path = Path(path)
+        self.memory_max = memory_max
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._refreshing = set()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def get_entry(self, namespace, key):
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                self._memory.move_to_end((namespace, key))
+                return entry
+            row = self._conn.execute(
+                "SELECT value, created_at FROM features WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (json.loads(row[0]), row[1])
+            self._remember((namespace, key), entry)
+            return entry
+
+    def get(self, namespace, key):
+        entry = self.get_entry(namespace, key)
+        return entry[0] if entry is not None else None
+
+    def put(self, namespace, key, value):
+        created_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO features (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), created_at)
+            )
+            self._conn.commit()
+            self._remember((namespace, key), (value, created_at))
+
+    def _remember(self, memory_key, entry):
+        self._memory[memory_key] = entry
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.memory_max:
+            self._memory.popitem(last=False)
+
+    def get_or_fetch(self, namespace, key, fetch, max_age=None):
+        # max_age dolmuş kayıtlar hemen döndürülür ve arka planda yenilenir (stale-while-revalidate)
+        entry = self.get_entry(namespace, key)
+        if entry is not None:
+            value, created_at = entry
+            if max_age is not None and time.time() - created_at > max_age:
+                self._revalidate(namespace, key, fetch)
+            return value
+        value = fetch()
+        if value is not None:
+            self.put(namespace, key, value)
+        return value
+
+    def _revalidate(self, namespace, key, fetch):
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return
+            self._refreshing.add((namespace, key))
+
+        def refresh():
+            try:
+                value = fetch()
+                if value is not None:
+                    self.put(namespace, key, value)
+            except Exception as e:
+                print(f"⚠️ Önbellek yenilenemedi ({namespace}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard((namespace, key))
+
+        _refresh_executor.submit(refresh)
+
+    def count(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM features WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeatureCache()
+    return _cache
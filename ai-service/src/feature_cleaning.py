@@ -0,0 +1,141 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+INTERPOLATED_PREFIXES = ('NDVI', 'temp_C')
+IMPUTED_PREFIXES = ('NDVI',)
+
+# İlçe alt örneklemesinin dağılım sütunları (ör. NDVI_May__std); tek noktada hesaplanamadığından model özelliği değildir
+STAT_SEPARATOR = '__'
+
+MONTHLY_COLUMN = re.compile(r'^(?P<prefix>.+)_(?P<month>' + '|'.join(MONTHS) + r')$')
+
+
+def monthly_columns(columns, prefix):
+    # Sütunları takvim sırasına göre döndürür (ör. NDVI_Mar, NDVI_Apr, ...)
+    found = []
+    for col in columns:
+        match = MONTHLY_COLUMN.match(col)
+        if match and match.group('prefix') == prefix:
+            found.append((MONTHS.index(match.group('month')), col))
+    return [col for _, col in sorted(found)]
+
+
+def sample_stat_columns(columns):
+    return [col for col in columns if STAT_SEPARATOR in col]
+
+
+def interpolate_months(matrix):
+    # (nokta x ay) matrisinde satır içi doğrusal interpolasyon; baştaki/sondaki
+    # boşluklar en yakın geçerli değerle doldurulur (pandas limit_direction='both').
+    values = np.asarray(matrix, dtype=np.float64)
+    n, m = values.shape
+    if m == 0:
+        return values
+
+    valid = ~np.isnan(values)
+    idx = np.broadcast_to(np.arange(m), (n, m))
+
+    prev_idx = np.maximum.accumulate(np.where(valid, idx, -1), axis=1)
+    next_idx = np.minimum.accumulate(np.where(valid, idx, m)[:, ::-1], axis=1)[:, ::-1]
+
+    rows = np.arange(n)[:, None]
+    has_prev = prev_idx >= 0
+    has_next = next_idx < m
+    prev_val = values[rows, np.clip(prev_idx, 0, m - 1)]
+    next_val = values[rows, np.clip(next_idx, 0, m - 1)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = (idx - prev_idx) / (next_idx - prev_idx)
+        between = prev_val + weight * (next_val - prev_val)
+
+    out = np.where(has_prev & has_next, between, np.where(has_prev, prev_val, next_val))
+    out[~has_prev & ~has_next] = np.nan
+    out[valid] = values[valid]
+    return out
+
+
+def impute_from_neighbor_districts(df, cols, group_col, year_col, lat_col, lon_col):
+    # Aynı yıl içinde, bu ay için değeri olan en yakın ilçenin değeri kullanılır
+    locations = df[[group_col, lat_col, lon_col]].drop_duplicates(group_col)
+    names = locations[group_col].to_numpy()
+    coords = np.radians(locations[[lat_col, lon_col]].to_numpy(dtype=np.float64))
+    lat, lon = coords[:, 0], coords[:, 1]
+    a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    order = np.argsort(a, axis=1)[:, 1:]
+
+    pos = pd.Index(names)
+    result = df[cols].to_numpy(dtype=np.float64, copy=True)
+    district_idx = pos.get_indexer(df[group_col])
+
+    for _, year_rows in df.groupby(year_col).indices.items():
+        table = np.full((len(names), len(cols)), np.nan)
+        table[district_idx[year_rows]] = result[year_rows]
+
+        filled = table.copy()
+        for k in range(order.shape[1]):
+            missing = np.isnan(filled)
+            if not missing.any():
+                break
+            candidate = table[order[:, k]]
+            filled = np.where(missing, candidate, filled)
+
+        result[year_rows] = filled[district_idx[year_rows]]
+    return result
+
+
+def impute_from_neighbor_years(df, cols, group_col, year_col):
+    # Aynı ilçenin en yakın yılındaki değer kullanılır (eşitlikte önceki yıl)
+    ordered = df[[group_col, year_col] + cols].sort_values([group_col, year_col])
+    years = ordered[year_col].astype(np.float64)
+
+    result = ordered[cols].to_numpy(dtype=np.float64, copy=True)
+    grouped = ordered.groupby(group_col, sort=False)
+    prev_vals = grouped[cols].ffill().to_numpy(dtype=np.float64)
+    next_vals = grouped[cols].bfill().to_numpy(dtype=np.float64)
+
+    year_matrix = pd.DataFrame(np.where(np.isnan(result), np.nan, years.to_numpy()[:, None]), index=ordered.index, columns=cols)
+    year_matrix[group_col] = ordered[group_col]
+    prev_years = year_matrix.groupby(group_col, sort=False)[cols].ffill().to_numpy()
+    next_years = year_matrix.groupby(group_col, sort=False)[cols].bfill().to_numpy()
+
+    y = years.to_numpy()[:, None]
+    use_next = np.isnan(prev_vals) | (~np.isnan(next_vals) & ((next_years - y) < (y - prev_years)))
+    imputed = np.where(use_next, next_vals, prev_vals)
+    result = np.where(np.isnan(result), imputed, result)
+
+    return pd.DataFrame(result, index=ordered.index, columns=cols).loc[df.index].to_numpy()
+
+
+def clean_features(df, fill_value=0, group_col='nnokta_id', year_col='yil', lat_col='enlem', lon_col='boylam'):
+    """Eğitim ve tahmin için ortak özellik temizleme adımı.
+
+    1. NDVI ve sıcaklık için aylar arası doğrusal interpolasyon (tüm tablo tek seferde)
+    2. Tablo ilçe/yıl içeriyorsa hâlâ boş kalan NDVI değerleri için önce aynı yılın
+       en yakın ilçesi, sonra aynı ilçenin en yakın yılı
+    3. Kalan boşluklar `fill_value` ile doldurulur (None ise bırakılır)
+    """
+    df = df.copy()
+
+    for prefix in INTERPOLATED_PREFIXES:
+        cols = monthly_columns(df.columns, prefix)
+        if cols:
+            df[cols] = interpolate_months(df[cols].to_numpy(dtype=np.float64))
+
+    can_impute = all(c in df.columns for c in (group_col, year_col, lat_col, lon_col)) and len(df) > 1
+    if can_impute:
+        for prefix in IMPUTED_PREFIXES:
+            cols = monthly_columns(df.columns, prefix)
+            if not cols or not df[cols].isna().any().any():
+                continue
+            df[cols] = impute_from_neighbor_districts(df, cols, group_col, year_col, lat_col, lon_col)
+            if df[cols].isna().any().any():
+                df[cols] = impute_from_neighbor_years(df, cols, group_col, year_col)
+
+    if fill_value is not None:
+        numeric = df.select_dtypes(include=[np.number]).columns
+        df[numeric] = df[numeric].fillna(fill_value)
+    return df
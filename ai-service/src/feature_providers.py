@@ -0,0 +1,318 @@
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    def tqdm(iterator, **kwargs): return iterator
+
+import profiling
+from feature_cache import get_feature_cache, make_key
+from feature_cleaning import clean_features
+from resilience import BREAKERS, SOIL_DEADLINE_S, NoDataError
+from gee import gee_backend
+from gee.collect_point_data import collect_seasonal_data, get_elevation, month_windows
+import solidgrids.get_soil_properties_for_point as soilgrids
+
+# Sağlayıcı çağrıları bu havuzda eşzamanlı yürür; her çağrı kendi devre kesicisinden geçer
+PROVIDER_MAX_WORKERS = int(os.getenv('PROVIDER_MAX_WORKERS', '16'))
+# Servisin kullandığı sağlayıcılar (sırası model şemasındaki sütun sırasıdır)
+FEATURE_PROVIDERS = [p.strip() for p in os.getenv('FEATURE_PROVIDERS', 'satellite,terrain,soil').split(',') if p.strip()]
+# Süren sezonun uydu verisi bu kadar saniyeden eski ise arka planda yenilenir
+FEATURE_MAX_AGE_S = float(os.getenv('FEATURE_MAX_AGE_S', str(24 * 3600)))
+# Sezon bittikten sonra veriler bu kadar gün daha yeniden işlenebilir (ör. Sentinel-2 düzeltmeleri)
+SEASON_SETTLE_DAYS = int(os.getenv('SEASON_SETTLE_DAYS', '30'))
+# SoilGrids çağrıları arasındaki en kısa süre; eğitim betiği hız sınırı için yükseltir
+SOIL_MIN_INTERVAL_S = float(os.getenv('SOIL_MIN_INTERVAL_S', '0'))
+# Önbellekteki uydu satırında veri kalitesi bilgisi (NDVI kaynağı) bu anahtarla tutulur
+QUALITY_KEY = '_quality'
+LOCATION_COLUMNS = ['yil', 'enlem', 'boylam', 'Latitude', 'Longitude']
+
+
+def season_dates(year):
+    return f"{year}-03-01", f"{year}-08-31"
+
+
+def season_closed(year):
+    _, date_end = season_dates(year)
+    return (datetime.now() - datetime.strptime(date_end, "%Y-%m-%d")).days > SEASON_SETTLE_DAYS
+
+
+def location_columns(lat, lon, year):
+    return {'yil': year, 'enlem': lat, 'boylam': lon, 'Latitude': lat, 'Longitude': lon}
+
+
+class FeatureProvider:
+    """Bir özellik kaynağı: ürettiği sütunlar, önbellek anahtarı ve yıla bağlılığı.
+
+    `seasonal` sağlayıcılar (konum, yıl) başına, diğerleri konum başına bir kez çağrılır.
+    `fetch` ham upstream çağrısıdır; JSON'a çevrilebilen bir sözlük ya da noktada veri yoksa
+    None döndürür, upstream hatalarında istisna yükseltir (devre kesici yalnızca bunları sayar);
+    önbellek, devre kesici ve hız sınırı FeatureExecutor'dadır. Yeni bir kaynak için bu
+    sınıftan türetip PROVIDER_CLASSES'a eklemek yeterlidir.
+    """
+
+    name = None
+    label = None
+    breaker = None
+    columns = []
+    seasonal = False
+    # Sonuç alınamazsa nokta atlanır (ör. uydu verisi olmadan tahmin yapılmaz)
+    required = False
+    min_interval_s = 0.0
+
+    def cache_key(self, lat, lon, year, radius):
+        raise NotImplementedError
+
+    def fetch(self, lat, lon, year, radius):
+        raise NotImplementedError
+
+    def max_age(self, year):
+        # Yıldan bağımsız özellikler ve kapanmış sezonlar hiç eskimez
+        return None
+
+
+class SatelliteProvider(FeatureProvider):
+    name = 'satellite'
+    label = 'Uydu (GEE)'
+    breaker = 'gee'
+    seasonal = True
+    required = True
+    columns = [f"{band}_{month}" for band in ('NDVI', 'Rain', 'temp_C')
+               for _, _, month in month_windows(*season_dates(2000))]
+
+    def cache_key(self, lat, lon, year, radius):
+        # 'v2': upstream hataları artık boş ay olarak yazılmaz; eski (boşluklu olabilen) kayıtlar kullanılmaz
+        return make_key('v2', round(lat, 5), round(lon, 5), *season_dates(year), radius)
+
+    def fetch(self, lat, lon, year, radius):
+        gee_backend.get_backend().init()
+        quality = {}
+        values = collect_seasonal_data(lon, lat, *season_dates(year), radius, quality=quality)
+        if all(v is None for v in values.values()):
+            return None
+        return {**values, QUALITY_KEY: quality}
+
+    def max_age(self, year):
+        return None if season_closed(year) else FEATURE_MAX_AGE_S
+
+
+class TerrainProvider(FeatureProvider):
+    name = 'terrain'
+    label = 'Yükseklik (GEE)'
+    breaker = 'gee'
+    columns = ['elevation']
+
+    def cache_key(self, lat, lon, year, radius):
+        return make_key(round(lat, 5), round(lon, 5), radius)
+
+    def fetch(self, lat, lon, year, radius):
+        gee_backend.get_backend().init()
+        elevation = get_elevation(lon, lat, radius)
+        return None if elevation is None else {'elevation': elevation}
+
+
+class SoilGridsProvider(FeatureProvider):
+    name = 'soil'
+    label = 'SoilGrids'
+    breaker = 'soilgrids'
+    columns = [f"soil_{prop}_{depth}" for prop in ('clay', 'sand', 'silt', 'phh2o', 'cec', 'soc')
+               for depth in ('0_5cm', '5_15cm', '15_30cm')]
+
+    def __init__(self, min_interval_s=SOIL_MIN_INTERVAL_S):
+        self.min_interval_s = min_interval_s
+
+    def cache_key(self, lat, lon, year, radius):
+        # SoilGrids nokta sorgusudur; yarıçap ve yıl anahtara girmez
+        return make_key(round(lat, 5), round(lon, 5))
+
+    def fetch(self, lat, lon, year, radius):
+        soil_df = soilgrids.get_soil_features_for_point(lon, lat, timeout=SOIL_DEADLINE_S)
+        if soil_df is None or soil_df.empty:
+            return None
+        return soil_df.iloc[0].to_dict()
+
+
+PROVIDER_CLASSES = {cls.name: cls for cls in (SatelliteProvider, TerrainProvider, SoilGridsProvider)}
+
+
+def strip_quality(values):
+    return {k: v for k, v in values.items() if k != QUALITY_KEY}
+
+
+class PointFeatures:
+    """Tek noktanın sağlayıcı çıktıları ve neyin eksik ya da yedekten geldiği."""
+
+    def __init__(self, lat, lon, year):
+        self.values = location_columns(lat, lon, year)
+        self.errors = {}
+        # Zorunlu sağlayıcıların hataları; bunlardan biri varsa nokta kullanılamaz
+        self.required_errors = {}
+        # Upstream sağlıklı ama noktada veri yok (su, maske); bunlar için yedek ilçe kullanılmaz
+        self.no_data = set()
+        self.degraded = {}
+        self.quality = {}
+
+    def add(self, values):
+        self.quality.update(values.get(QUALITY_KEY) or {})
+        self.values.update(strip_quality(values))
+
+
+class FeatureExecutor:
+    """Sağlayıcıları eşzamanlı çalıştırıp çıktıları tek satırda birleştirir.
+
+    Her çağrı önbellekten (ad alanı = sağlayıcı adı) okunur; yoksa `resilient` ise
+    sağlayıcının devre kesicisi ve süre sınırıyla, değilse doğrudan yapılır. `offline`
+    ise upstream'e hiç gidilmez, önbellekte olmayan kayıt eksik sayılır. /predict,
+    ısıtma, haritalar, eğitim verisi oluşturma ve geriye dönük test aynı yolu kullanır.
+    """
+
+    def __init__(self, providers, max_workers=PROVIDER_MAX_WORKERS, resilient=True, cache=None, offline=False):
+        self.providers = list(providers)
+        self.resilient = resilient
+        self.offline = offline
+        self._cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='features')
+        self._throttle = {p.name: [threading.Lock(), 0.0] for p in self.providers}
+
+    @property
+    def columns(self):
+        return LOCATION_COLUMNS + [col for provider in self.providers for col in provider.columns]
+
+    def provider(self, name):
+        return next(p for p in self.providers if p.name == name)
+
+    def _wait_turn(self, provider):
+        # Hız sınırı yalnızca gerçek upstream çağrılarına uygulanır (önbellek isabetleri beklemez)
+        if provider.min_interval_s <= 0:
+            return
+        throttle = self._throttle[provider.name]
+        with throttle[0]:
+            delay = throttle[1] + provider.min_interval_s - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            throttle[1] = time.monotonic()
+
+    def fetch(self, provider, lat, lon, year, radius):
+        # Önbellekli tek sağlayıcı çağrısı; upstream hatası çağırana yükselir
+        def call():
+            self._wait_turn(provider)
+            if self.resilient:
+                return BREAKERS[provider.breaker].call(provider.fetch, lat, lon, year, radius)
+            return provider.fetch(lat, lon, year, radius)
+
+        cache = self._cache or get_feature_cache()
+        key = provider.cache_key(lat, lon, year, radius)
+        if self.offline:
+            return cache.get(provider.name, key)
+        return cache.get_or_fetch(provider.name, key, call, max_age=provider.max_age(year))
+
+    def collect_point(self, lat, lon, year, radius, fallback=None):
+        """Tüm sağlayıcılar tek nokta için eşzamanlı çalışır.
+
+        Hata veren sağlayıcı için `fallback(provider, lat, lon, year, radius)` verilmişse
+        (etiket, değerler) ile yedek değer alınır ve `degraded`'a yazılır. Noktada veri
+        olmaması (NoDataError) upstream hatası değildir; yedeğe gidilmez.
+        """
+        result = PointFeatures(lat, lon, year)
+        futures = {
+            provider: self._pool.submit(profiling.propagate(self.fetch), provider, lat, lon, year, radius)
+            for provider in self.providers
+        }
+        for provider, future in futures.items():
+            try:
+                values = future.result()
+                if values is None:
+                    raise NoDataError(f"{provider.label} bu nokta için veri döndürmedi")
+            except Exception as e:
+                if isinstance(e, NoDataError):
+                    result.no_data.add(provider.name)
+                label, values = (None, None)
+                if fallback and provider.name not in result.no_data:
+                    label, values = fallback(provider, lat, lon, year, radius)
+                if values is None:
+                    result.errors[provider.name] = str(e)
+                    if provider.required:
+                        result.required_errors[provider.name] = str(e)
+                    continue
+                print(f"⚠️ {provider.label} kullanılamıyor ({e}), en yakın ilçe verisi kullanılıyor: {label}")
+                result.degraded[provider.name] = label
+            result.add(values)
+        return result
+
+    def collect(self, points, radius, providers=None, desc=None):
+        """Çok nokta için ham özellik satırları; zorunlu sağlayıcısı eksik noktalar None.
+
+        `points`: [(lat, lon, yıl)]. Yıldan bağımsız sağlayıcılar her konum için, mevsimlik
+        olanlar (konum, yıl) başına bir kez çağrılır; hepsi aynı havuzda eşzamanlı yürür.
+        Veri kalitesi (NDVI kaynağı) satırda QUALITY_KEY altında kalır; assemble onu atar.
+        """
+        providers = [self.provider(name) for name in providers] if providers else self.providers
+
+        def safe_fetch(provider, lat, lon, year):
+            try:
+                return self.fetch(provider, lat, lon, year, radius)
+            except Exception:
+                return None
+
+        tasks = {}
+        for lat, lon, year in points:
+            for provider in providers:
+                task = (provider.name, lat, lon, year if provider.seasonal else None)
+                if task not in tasks:
+                    tasks[task] = self._pool.submit(profiling.propagate(safe_fetch), provider, lat, lon, year)
+        if desc is not None:
+            for _ in tqdm(as_completed(tasks.values()), total=len(tasks), unit="çağrı", desc=desc):
+                pass
+
+        rows = []
+        for lat, lon, year in points:
+            row = location_columns(lat, lon, year)
+            for provider in providers:
+                values = tasks[(provider.name, lat, lon, year if provider.seasonal else None)].result()
+                if values is None and provider.required:
+                    row = None
+                    break
+                row.update(values or {})
+            rows.append(row)
+        return rows
+
+
+def assemble(rows, columns, fill_value=0):
+    """Sağlayıcı satırlarını verilen şemaya (ör. model.feature_names_in_) dizer ve temizler.
+
+    Aylar arası interpolasyon uygulanır; hâlâ boş kalan hücreler `fill_value` ile
+    doldurulur (None ise bırakılır). Dönüş: (tablo, doldurulan hücrelerin maskesi).
+    """
+    frame = pd.DataFrame(rows).reindex(columns=list(columns))
+    frame = frame.apply(pd.to_numeric, errors='coerce')
+    frame = clean_features(frame, fill_value=None)
+    filled = frame.isna()
+    if fill_value is not None:
+        frame = frame.fillna(fill_value)
+    return frame, filled
+
+
+def build_providers(names=FEATURE_PROVIDERS):
+    unknown = [name for name in names if name not in PROVIDER_CLASSES]
+    if unknown:
+        raise ValueError(f"Bilinmeyen özellik sağlayıcısı: {', '.join(unknown)} ({', '.join(PROVIDER_CLASSES)})")
+    return [PROVIDER_CLASSES[name]() for name in names]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_feature_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = FeatureExecutor(build_providers())
+    return _executor
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import random
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import gee_backend
+except ImportError:
+    from . import gee_backend
+
+try:
+    from collect_point_data import (
+        COLLECTIONS, build_feature_frame, get_elevation, get_monthly_means,
+        month_windows, ndvi_source_for_year, point_roi
+    )
+except ImportError:
+    from .collect_point_data import (
+        COLLECTIONS, build_feature_frame, get_elevation, get_monthly_means,
+        month_windows, ndvi_source_for_year, point_roi
+    )
+
+ee = gee_backend.lazy_import('ee')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+EXPORT_DIR = Path(os.getenv('GEE_EXPORT_DIR', PROJECT_ROOT / 'data' / 'processed' / 'gee_exports'))
+EXPORT_ASSET_ROOT = os.getenv('GEE_EXPORT_ASSET_ROOT', 'projects/agro-estimation-project/assets/exports')
+# 'earthengine': gerçek batch görevleri; 'local': test için aynı tabloları yerelde üreten sahte çalıştırıcı
+EXPORT_RUNNER = os.getenv('GEE_EXPORT_RUNNER', 'earthengine')
+EXPORT_POLL_INTERVAL_S = float(os.getenv('GEE_EXPORT_POLL_INTERVAL_S', '30'))
+EXPORT_TIMEOUT_S = float(os.getenv('GEE_EXPORT_TIMEOUT_S', str(6 * 3600)))
+
+TERMINAL_STATES = ('COMPLETED', 'FAILED', 'CANCELLED')
+# Çalıştırıcının tanımadığı görevler (ör. yerel çalıştırıcının önceki süreci) yeniden gönderilir
+UNKNOWN_STATE = 'UNKNOWN'
+
+# Her grup tek bir çok bantlı görüntüdür (ay başına bir bant) ve tüm ilçeler için
+# tek reduceRegions ile özetlenir. Reducer ve ölçekler etkileşimli yol ile aynıdır.
+SEASONAL_GROUPS = {
+    'ndvi': {'band': 'NDVI', 'prefix': 'NDVI', 'reducer': 'mean'},
+    'modis': {'source': 'MODIS_NDVI', 'band': 'NDVI', 'prefix': 'NDVI', 'reducer': 'mean', 'scale': 250},
+    'rain': {'source': 'CHIRPS_RAIN', 'band': 'precipitation', 'prefix': 'Rain', 'reducer': 'sum', 'scale': 5566},
+    'temp': {'source': 'ERA5_TEMP', 'band': 'temp_C', 'prefix': 'temp_C', 'reducer': 'mean', 'scale': 11132},
+}
+
+
+def season_window(year):
+    return f"{year}-03-01", f"{year}-08-31"
+
+
+def export_specs(districts, years, region_radius, prefix=''):
+    # Yıl x grup başına bir görev, yükseklik için tek bir statik görev; önek iller arası çakışmayı önler
+    points = [{'nnokta_id': name, 'lat': c['enlem'], 'lon': c['boylam']} for name, c in districts.items()]
+    specs = [{'name': f"{prefix}static_elevation", 'group': 'elevation', 'points': points, 'radius': region_radius}]
+    for year in years:
+        start, end = season_window(year)
+        for group, params in SEASONAL_GROUPS.items():
+            spec = {'name': f"{prefix}{year}_{group}", 'group': group, 'year': int(year),
+                    'start': start, 'end': end, 'points': points, 'radius': region_radius, **params}
+            if group == 'ndvi':
+                spec['source'], spec['scale'] = ndvi_source_for_year(int(year))
+            specs.append(spec)
+    return specs
+
+
+def spec_columns(spec):
+    if spec['group'] == 'elevation':
+        return ['elevation']
+    return [f"{spec['prefix']}_{abbr}" for _, _, abbr in month_windows(spec['start'], spec['end'])]
+
+
+def build_table(spec):
+    # Görev tanımından reduceRegions sonucunu (ee.FeatureCollection) kurar
+    districts = ee.FeatureCollection([
+        ee.Feature(point_roi(p['lon'], p['lat'], spec['radius']), {'nnokta_id': p['nnokta_id']})
+        for p in spec['points']
+    ])
+
+    if spec['group'] == 'elevation':
+        image = ee.Image("USGS/SRTMGL1_003").rename('elevation')
+        reducer, scale = 'mean', 100
+    else:
+        # Görüntüsü olmayan aylar maskeli sabit bantla null'a dönüşür (etkileşimli yoldaki None gibi)
+        empty = ee.Image.constant(0).toFloat().rename(spec['band']).updateMask(ee.Image.constant(0))
+        months = []
+        for (start, end, _), column in zip(month_windows(spec['start'], spec['end']), spec_columns(spec)):
+            collection = COLLECTIONS[spec['source']](districts.geometry()).filterDate(start, end)
+            monthly = collection.select([spec['band']]).map(lambda img: img.toFloat()).merge(ee.ImageCollection([empty]))
+            months.append(monthly.mean().rename(column))
+        image = ee.Image.cat(months)
+        reducer, scale = spec['reducer'], spec['scale']
+
+    table = image.reduceRegions(
+        collection=districts,
+        reducer=getattr(ee.Reducer, reducer)(),
+        scale=scale,
+        tileScale=4
+    )
+    return table.select(['nnokta_id'] + spec_columns(spec), None, False)
+
+
+class EarthEngineTaskRunner:
+    """Export.table.toAsset görevlerini başlatır, durumlarını sorgular ve sonuç tablolarını okur."""
+
+    name = 'earthengine'
+
+    def __init__(self, asset_root=EXPORT_ASSET_ROOT):
+        self.asset_root = asset_root.rstrip('/')
+
+    def asset_id(self, spec):
+        return f"{self.asset_root}/{spec['name']}"
+
+    def submit(self, spec):
+        gee_backend.get_backend().init()
+        task = ee.batch.Export.table.toAsset(
+            collection=build_table(spec),
+            description=f"agro_{spec['name']}",
+            assetId=self.asset_id(spec),
+            overwrite=True
+        )
+        task.start()
+        return task.id
+
+    def status(self, task_id):
+        # Devam eden bir hasatta hiç görev gönderilmeden yalnızca durum sorgulanabilir
+        gee_backend.get_backend().init()
+        status = ee.data.getTaskStatus(task_id)[0]
+        return status['state'], status.get('error_message')
+
+    def fetch(self, spec):
+        # Tablo ilçe sayısı kadar satırdır; tek getInfo çağrısı yeterlidir
+        gee_backend.get_backend().init()
+        features = ee.FeatureCollection(self.asset_id(spec)).getInfo()['features']
+        return [feature['properties'] for feature in features]
+
+
+class LocalTaskRunner:
+    """Batch görevlerini yerelde, etkin GEE backend'i (ör. replay) üzerinden taklit eder.
+
+    Görevler arka planda READY -> RUNNING -> COMPLETED/FAILED durumlarından geçer;
+    tablolar etkileşimli yolun aynı sorgularıyla üretilir.
+    """
+
+    name = 'local'
+
+    def __init__(self, delay_s=None, failure_rate=None, max_workers=4, seed=None):
+        self.delay_s = float(os.getenv('GEE_EXPORT_LOCAL_DELAY_S', '0.5')) if delay_s is None else delay_s
+        self.failure_rate = float(os.getenv('GEE_EXPORT_LOCAL_FAILURE_RATE', '0')) if failure_rate is None else failure_rate
+        self._rng = random.Random(seed)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='local-export')
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._tables = {}
+
+    def submit(self, spec):
+        with self._lock:
+            task_id = f"LOCAL_{len(self._tasks):05d}_{spec['name']}"
+            self._tasks[task_id] = ('READY', None)
+            fail = self._rng.random() < self.failure_rate
+        self._executor.submit(self._run, task_id, spec, fail)
+        return task_id
+
+    def _run(self, task_id, spec, fail):
+        with self._lock:
+            self._tasks[task_id] = ('RUNNING', None)
+        time.sleep(self.delay_s)
+        try:
+            if fail:
+                raise RuntimeError("simüle edilmiş görev hatası")
+            rows = [self._reduce_point(spec, p) for p in spec['points']]
+            with self._lock:
+                self._tables[spec['name']] = rows
+                self._tasks[task_id] = ('COMPLETED', None)
+        except Exception as e:
+            with self._lock:
+                self._tasks[task_id] = ('FAILED', str(e))
+
+    def _reduce_point(self, spec, point):
+        if spec['group'] == 'elevation':
+            return {'nnokta_id': point['nnokta_id'], 'elevation': get_elevation(point['lon'], point['lat'], spec['radius'])}
+        values = get_monthly_means(
+            spec['source'], point['lon'], point['lat'], spec['radius'], spec['start'], spec['end'],
+            spec['band'], reducer=spec['reducer'], scale=spec['scale']
+        )
+        return {'nnokta_id': point['nnokta_id'],
+                **{k.replace(spec['band'], spec['prefix'], 1): v for k, v in values.items()}}
+
+    def status(self, task_id):
+        # Önceki bir süreçte gönderilen görevler bu çalıştırıcıda bilinmez: 'UNKNOWN'
+        with self._lock:
+            return self._tasks.get(task_id, ('UNKNOWN', None))
+
+    def fetch(self, spec):
+        with self._lock:
+            return list(self._tables[spec['name']])
+
+
+def get_runner(name=EXPORT_RUNNER):
+    if name == 'local':
+        return LocalTaskRunner()
+    if name == 'earthengine':
+        return EarthEngineTaskRunner()
+    raise ValueError(f"Bilinmeyen GEE_EXPORT_RUNNER: {name}")
+
+
+class ExportStore:
+    """Görev listesi (manifest.json) ve okunan tablolar (CSV); yarıda kalan hasat kaldığı yerden sürer."""
+
+    def __init__(self, directory=EXPORT_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / 'manifest.json'
+        self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8')) if self.manifest_path.exists() else {}
+
+    def save(self):
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.manifest_path)
+
+    def table_path(self, name):
+        return self.directory / f"{name}.csv"
+
+    def has_table(self, name):
+        return self.table_path(name).exists()
+
+    def write_table(self, name, rows, columns):
+        pd.DataFrame(rows, columns=['nnokta_id'] + columns).to_csv(self.table_path(name), index=False, encoding='utf-8-sig')
+
+    def read_table(self, name):
+        return pd.read_csv(self.table_path(name), encoding='utf-8-sig')
+
+
+def submit_export(spec, runner, store):
+    task_id = runner.submit(spec)
+    store.manifest[spec['name']] = {'runner': runner.name, 'task_id': task_id, 'state': 'READY', 'submitted_at': time.time()}
+
+
+def run_exports(specs, runner, store, poll_interval_s=EXPORT_POLL_INTERVAL_S, timeout_s=EXPORT_TIMEOUT_S):
+    # Eksik tablolar için görev başlatılır, bitene kadar sorgulanır ve sonuçlar diske alınır
+    pending = {}
+    for spec in specs:
+        if store.has_table(spec['name']):
+            continue
+        entry = store.manifest.get(spec['name'])
+        resumable = (entry and entry.get('runner') == runner.name and entry.get('task_id')
+                     and entry['state'] not in ('FAILED', 'CANCELLED', UNKNOWN_STATE))
+        if not resumable:
+            submit_export(spec, runner, store)
+        pending[spec['name']] = spec
+    store.save()
+    print(f"📤 {len(pending)} dışa aktarma görevi bekleniyor ({len(specs) - len(pending)} tablo zaten hazır).")
+
+    deadline = time.time() + timeout_s
+    failed = []
+    while pending:
+        for name, spec in list(pending.items()):
+            entry = store.manifest[name]
+            state, error = runner.status(entry['task_id'])
+            entry['state'] = state
+            if state == UNKNOWN_STATE:
+                print(f"🔁 {name}: görev çalıştırıcıda bulunamadı, yeniden gönderiliyor.")
+                submit_export(spec, runner, store)
+            elif state == 'COMPLETED':
+                store.write_table(name, runner.fetch(spec), spec_columns(spec))
+                del pending[name]
+            elif state in TERMINAL_STATES:
+                entry['error'] = error
+                failed.append(name)
+                del pending[name]
+        store.save()
+        if not pending:
+            break
+        if time.time() > deadline:
+            print(f"⚠️ Zaman aşımı: {len(pending)} görev tamamlanmadı, sonraki çalıştırmada kaldığı yerden sürer.")
+            break
+        time.sleep(poll_interval_s)
+
+    if failed:
+        print(f"⚠️ Başarısız görevler (yeniden çalıştırınca tekrar gönderilir): {', '.join(sorted(failed))}")
+    return failed
+
+
+def assemble(specs, store, districts):
+    # Yıl tablolarını ilçe/yıl satırlarına birleştirir; NDVI tamamen boşsa MODIS kullanılır
+    by_year = {}
+    elevation = None
+    for spec in specs:
+        if spec['group'] == 'elevation':
+            elevation = spec['name']
+        elif store.has_table(spec['name']):
+            by_year.setdefault(spec['year'], {})[spec['group']] = store.read_table(spec['name']).set_index('nnokta_id')
+
+    rows = []
+    for year, tables in sorted(by_year.items()):
+        if not {'ndvi', 'rain', 'temp'} <= tables.keys():
+            print(f"⚠️ {year} için tablolar eksik, atlanıyor.")
+            continue
+        for name, coords in districts.items():
+            if name not in tables['ndvi'].index:
+                continue
+            ndvi = tables['ndvi'].loc[name]
+            if ndvi.isna().all() and 'modis' in tables and name in tables['modis'].index:
+                ndvi = tables['modis'].loc[name]
+            seasonal = {**ndvi.to_dict(), **tables['rain'].loc[name].to_dict(), **tables['temp'].loc[name].to_dict()}
+            if all(pd.isna(v) for v in seasonal.values()):
+                continue
+            rows.append({'nnokta_id': name, 'yil': year, 'enlem': coords['enlem'], 'boylam': coords['boylam'],
+                         'Latitude': coords['enlem'], 'Longitude': coords['boylam'], **seasonal})
+
+    if not rows:
+        return pd.DataFrame()
+
+    # Etkileşimli yol ile aynı temizlik: satır içi aylar arası interpolasyon, boşluklar korunur
+    ids = pd.DataFrame([{k: r[k] for k in ('nnokta_id', 'yil', 'enlem', 'boylam')} for r in rows])
+    features = build_feature_frame([{k: v for k, v in r.items() if k not in ids.columns} for r in rows], fill_value=None)
+    df = pd.concat([ids, features], axis=1)
+
+    if elevation is not None and store.has_table(elevation):
+        df = df.merge(store.read_table(elevation), on='nnokta_id', how='left')
+    return df
+
+
+def harvest(districts, years, region_radius, runner=None, store=None, poll_interval_s=EXPORT_POLL_INTERVAL_S, prefix=''):
+    """Tüm ilçe ve yıllar için batch dışa aktarma ile eğitim özelliklerini toplar."""
+    runner = runner or get_runner()
+    store = store or ExportStore()
+    specs = export_specs(districts, years, region_radius, prefix=prefix)
+    print(f"🛰️ Batch hasat: {len(districts)} ilçe x {len(years)} yıl, {len(specs)} görev ({runner.name})")
+    run_exports(specs, runner, store, poll_interval_s=poll_interval_s)
+    return assemble(specs, store, districts)
@@ -1,257 +1,223 @@
 import os
-import ee
+import sys
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from multiprocessing import Pool, cpu_count
-import time
 
 try:
-    from tqdm import tqdm
+    import gee_backend
 except ImportError:
-    def tqdm(iterator, **kwargs): return iterator
+    from . import gee_backend
+
+ee = gee_backend.lazy_import('ee')
 
 try:
-    import base_gee 
+    from feature_cleaning import clean_features
 except ImportError:
-    try:
-        from . import base_gee
-    except ImportError:
-        print("UYARI: base_gee bulunamadı. GEE init işlemi bu dosyada manuel yapılacak.")
-        class base_gee:
-            @staticmethod
-            def init():
-                try:
-                    ee.Initialize()
-                except:
-                    ee.Authenticate()
-                    ee.Initialize()
-
-def get_monthly_means(image_collection, roi, start_date, end_date, band_name, reducer=None, scale=30):
-    if reducer is None:
-        reducer = ee.Reducer.mean()
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from feature_cleaning import clean_features
+
+MONTH_ABBR = {
+    1:'Jan', 2:'Feb', 3:'Mar', 4:'Apr', 5:'May', 6:'Jun',
+    7:'Jul', 8:'Aug', 9:'Sep', 10:'Oct', 11:'Nov', 12:'Dec'
+}
+
+def preprocess_landsat(image):
+    qa = image.select('QA_PIXEL')
+    mask = (qa.bitwiseAnd(1 << 3).eq(0).And(qa.bitwiseAnd(1 << 4).eq(0)))
+    optical_bands = image.select('SR_B.').multiply(0.0000275).add(-0.2)
+    return image.addBands(optical_bands, overwrite=True).updateMask(mask)
+
+def _landsat_ndvi(collection_id, nir, red):
+    def build(roi):
+        return (
+            ee.ImageCollection(collection_id)
+            .filterBounds(roi)
+            .map(preprocess_landsat)
+            .map(lambda img: img.addBands(img.normalizedDifference([nir, red]).rename('NDVI')))
+            .select('NDVI')
+        )
+    return build
 
+def _sentinel2_ndvi(roi):
+    return (
+        ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
+        .filterBounds(roi)
+        .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 50))
+        .map(lambda img: img.addBands(img.normalizedDifference(['B8', 'B4']).rename('NDVI')))
+        .select('NDVI')
+    )
+
+def _modis_ndvi(roi):
+    return (
+        ee.ImageCollection('MODIS/061/MOD13Q1')
+        .filterBounds(roi)
+        .select('NDVI')
+        .map(lambda img: img.multiply(0.0001).copyProperties(img, ['system:time_start']))
+    )
+
+def _chirps_rain(roi):
+    return ee.ImageCollection('UCSB-CHG/CHIRPS/DAILY').filterBounds(roi).select('precipitation')
+
+def _era5_temp(roi):
+    return (
+        ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR')
+        .filterBounds(roi)
+        .map(lambda img: img.expression(
+            '((MIN + MAX) / 2) - 273.15',
+            {'MIN': img.select('temperature_2m_min'), 'MAX': img.select('temperature_2m_max')}
+        ).rename('temp_C').copyProperties(img, ['system:time_start']))
+        .select('temp_C')
+    )
+
+# Koleksiyonlar isimle tutulur; böylece her sorgu düz bir anahtarla tarif edilip
+# GEE backend'i (canlı / kayıt / tekrar oynatma) üzerinden çalıştırılabilir.
+COLLECTIONS = {
+    'S2_NDVI': _sentinel2_ndvi,
+    'L8_NDVI': _landsat_ndvi("LANDSAT/LC08/C02/T1_L2", 'SR_B5', 'SR_B4'),
+    'L7_NDVI': _landsat_ndvi("LANDSAT/LE07/C02/T1_L2", 'SR_B4', 'SR_B3'),
+    'L5_NDVI': _landsat_ndvi("LANDSAT/LT05/C02/T1_L2", 'SR_B4', 'SR_B3'),
+    'MODIS_NDVI': _modis_ndvi,
+    'CHIRPS_RAIN': _chirps_rain,
+    'ERA5_TEMP': _era5_temp,
+}
+
+def ndvi_source_for_year(year):
+    if year >= 2016:
+        return 'S2_NDVI', 20
+    elif year >= 2013:
+        return 'L8_NDVI', 30
+    elif year == 2012:
+        return 'L7_NDVI', 30
+    else:
+        return 'L5_NDVI', 30
+
+def point_roi(lon, lat, region_radius):
+    return ee.Geometry.Point([lon, lat]).buffer(region_radius)
+
+def month_windows(start_date, end_date):
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    monthly_data = {}
-    current = start
 
+    windows = []
+    current = start
     while current < end:
         next_month = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
         if next_month > end:
             next_month = end
+        windows.append((current.strftime("%Y-%m-%d"), next_month.strftime("%Y-%m-%d"), MONTH_ABBR[current.month]))
+        current = next_month
+    return windows
 
-        date_str_start = current.strftime("%Y-%m-%d")
-        date_str_end = next_month.strftime("%Y-%m-%d")
-        
-        month_map = {
-            1:'Jan', 2:'Feb', 3:'Mar', 4:'Apr', 5:'May', 6:'Jun',
-            7:'Jul', 8:'Aug', 9:'Sep', 10:'Oct', 11:'Nov', 12:'Dec'
+def get_monthly_means(source, lon, lat, region_radius, start_date, end_date, band_name, reducer='mean', scale=30):
+    backend = gee_backend.get_backend()
+    monthly_data = {}
+
+    for date_str_start, date_str_end, month_abbr in month_windows(start_date, end_date):
+        key = {
+            'op': 'reduce_region', 'source': source, 'band': band_name,
+            'lon': lon, 'lat': lat, 'radius': region_radius,
+            'start': date_str_start, 'end': date_str_end,
+            'reducer': reducer, 'scale': scale
         }
-        month_abbr = month_map[current.month]
 
-        monthly_col = image_collection.filterDate(date_str_start, date_str_end)
-        img_reduced = monthly_col.mean()
-        
-        try:
-            result_dict = img_reduced.reduceRegion(
-                reducer=reducer,
+        def request(date_str_start=date_str_start, date_str_end=date_str_end):
+            roi = point_roi(lon, lat, region_radius)
+            img_reduced = COLLECTIONS[source](roi).filterDate(date_str_start, date_str_end).mean()
+            return img_reduced.reduceRegion(
+                reducer=getattr(ee.Reducer, reducer)(),
                 geometry=roi,
                 scale=scale,
                 maxPixels=1e9,
                 bestEffort=True,
                 tileScale=4
             ).getInfo()
-            
-            if result_dict and band_name in result_dict:
-                val_local = result_dict[band_name]
-            else:
-                val_local = None
-        except Exception:
-            val_local = None
-
-        monthly_data[f"{band_name}_{month_abbr}"] = val_local
-        current = next_month
+
+        # Upstream hataları çağırana yükselir; None yalnızca gerçek "veri yok" (bulut, maske) demektir.
+        # Aksi halde geçici hatalar boş ay olarak önbelleğe yazılır ve bir daha istenmez.
+        result_dict = backend.fetch(key, request)
+        monthly_data[f"{band_name}_{month_abbr}"] = (result_dict or {}).get(band_name)
         
     return monthly_data
 
-def get_elevation(roi):
-    try:
+def get_elevation(lon, lat, region_radius):
+    key = {'op': 'elevation', 'lon': lon, 'lat': lat, 'radius': region_radius}
+
+    def request():
         srtm = ee.Image("USGS/SRTMGL1_003")
-        result = srtm.reduceRegion(
+        return srtm.reduceRegion(
             reducer=ee.Reducer.mean(),
-            geometry=roi,
+            geometry=point_roi(lon, lat, region_radius),
             scale=100,
             maxPixels=1e9,
             bestEffort=True
         ).getInfo()
-        return result.get('elevation')
-    except:
-        return None
-
-def preprocess_landsat(image):
-    qa = image.select('QA_PIXEL')
-    mask = (qa.bitwiseAnd(1 << 3).eq(0).And(qa.bitwiseAnd(1 << 4).eq(0)))
-    optical_bands = image.select('SR_B.').multiply(0.0000275).add(-0.2)
-    return image.addBands(optical_bands, overwrite=True).updateMask(mask)
 
-def collect_point_data(lon, lat, date_start='2020-03-01', date_end='2020-08-31', region_radius=3000):
-    try:
-        base_gee.init()
-    except Exception:
-        return None
+    result = gee_backend.get_backend().fetch(key, request)
+    return (result or {}).get('elevation')
 
-    point_geom = ee.Geometry.Point([lon, lat])
-    roi = point_geom.buffer(region_radius) 
+def build_feature_frame(rows, fill_value=0):
+    df = pd.DataFrame(rows)
     
-    start_year = datetime.strptime(date_start, "%Y-%m-%d").year
-
-    if start_year >= 2016:
-        ndvi_col = (
-            ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED')
-            .filterBounds(roi)
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 50))
-            .map(lambda img: img.addBands(img.normalizedDifference(['B8', 'B4']).rename('NDVI')))
-            .select('NDVI')
-        )
-        scale_ndvi = 20
-
-    elif start_year >= 2013:
-        ndvi_col = (
-            ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-            .filterBounds(roi)
-            .map(preprocess_landsat)
-            .map(lambda img: img.addBands(img.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')))
-            .select('NDVI')
-        )
-        scale_ndvi = 30
-
-    elif start_year == 2012:
-        ndvi_col = (
-            ee.ImageCollection("LANDSAT/LE07/C02/T1_L2")
-            .filterBounds(roi)
-            .map(preprocess_landsat)
-            .map(lambda img: img.addBands(img.normalizedDifference(['SR_B4', 'SR_B3']).rename('NDVI')))
-            .select('NDVI')
-        )
-        scale_ndvi = 30
-
-    else:
-        ndvi_col = (
-            ee.ImageCollection("LANDSAT/LT05/C02/T1_L2")
-            .filterBounds(roi)
-            .map(preprocess_landsat)
-            .map(lambda img: img.addBands(img.normalizedDifference(['SR_B4', 'SR_B3']).rename('NDVI')))
-            .select('NDVI')
-        )
-        scale_ndvi = 30
-
-    rain_col = ee.ImageCollection('UCSB-CHG/CHIRPS/DAILY').filterBounds(roi).select('precipitation')
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    return clean_features(df, fill_value=fill_value)
 
-    era5_col = (
-        ee.ImageCollection('ECMWF/ERA5_LAND/DAILY_AGGR')
-        .filterBounds(roi)
-        .map(lambda img: img.expression(
-            '((MIN + MAX) / 2) - 273.15',
-            {'MIN': img.select('temperature_2m_min'), 'MAX': img.select('temperature_2m_max')}
-        ).rename('temp_C').copyProperties(img, ['system:time_start']))
-        .select('temp_C')
-    )
+def collect_seasonal_data(lon, lat, date_start, date_end, region_radius, quality=None):
+    # Yıla bağlı özellikler: aylık NDVI, yağış ve sıcaklık; `quality` verilirse kullanılan NDVI kaynağı yazılır
+    start_year = datetime.strptime(date_start, "%Y-%m-%d").year
+    ndvi_source, scale_ndvi = ndvi_source_for_year(start_year)
 
-    try:
-        ndvi_monthly = get_monthly_means(ndvi_col, roi, date_start, date_end, 'NDVI', scale=scale_ndvi)
-
-        if all(v is None for v in ndvi_monthly.values()):
-            ndvi_modis = (
-                ee.ImageCollection('MODIS/061/MOD13Q1')
-                .filterBounds(roi)
-                .filterDate(date_start, date_end)
-                .select('NDVI')
-                .map(lambda img: img.multiply(0.0001).copyProperties(img, ['system:time_start']))
-            )
-            ndvi_monthly = get_monthly_means(ndvi_modis, roi, date_start, date_end, 'NDVI', scale=250)
-
-        rain_monthly = get_monthly_means(rain_col, roi, date_start, date_end, 'precipitation', reducer=ee.Reducer.sum(), scale=5566)
-        rain_monthly = {k.replace('precipitation', 'Rain'): v for k, v in rain_monthly.items()}
-
-        temp_monthly = get_monthly_means(era5_col, roi, date_start, date_end, 'temp_C', scale=11132)
-        elevation = get_elevation(roi)
-
-        final_data = {
-            'Latitude': lat,
-            'Longitude': lon,
-            'elevation': elevation,
-            **ndvi_monthly,
-            **rain_monthly,
-            **temp_monthly
-        }
-        
-        df_row = pd.DataFrame([final_data])
-        
-        for col in df_row.columns:
-            df_row[col] = pd.to_numeric(df_row[col], errors='coerce')
-            
-        cols_to_interpolate = [c for c in df_row.columns if 'NDVI' in c or 'temp' in c]
-        if cols_to_interpolate:
-             df_row[cols_to_interpolate] = df_row[cols_to_interpolate].interpolate(method='linear', axis=1, limit_direction='both')
-        
-        df_row = df_row.fillna(0)
-        
-        return df_row
-    
-    except Exception:
-        return None
+    ndvi_monthly = get_monthly_means(ndvi_source, lon, lat, region_radius, date_start, date_end, 'NDVI', scale=scale_ndvi)
 
-def worker_task(args):
-    lon, lat, start, end = args
-    return collect_point_data(lon, lat, date_start=start, date_end=end)
+    if all(v is None for v in ndvi_monthly.values()):
+        ndvi_source = 'MODIS_NDVI'
+        ndvi_monthly = get_monthly_means('MODIS_NDVI', lon, lat, region_radius, date_start, date_end, 'NDVI', scale=250)
 
-if __name__ == "__main__":
-    print("Veri seti hazırlık testi başlatılıyor...")
+    if quality is not None:
+        quality['ndvi_source'] = ndvi_source
 
-    list_of_points = [
-        (32.50, 38.00),
-        (33.10, 37.50),
-    ]
+    rain_monthly = get_monthly_means('CHIRPS_RAIN', lon, lat, region_radius, date_start, date_end, 'precipitation', reducer='sum', scale=5566)
+    rain_monthly = {k.replace('precipitation', 'Rain'): v for k, v in rain_monthly.items()}
 
-    input_tasks = []
-    for year in range(2006, 2025):
-        start = f"{year}-03-01"
-        end = f"{year}-08-31"
-        for lon, lat in list_of_points:
-            input_tasks.append((lon, lat, start, end))
+    temp_monthly = get_monthly_means('ERA5_TEMP', lon, lat, region_radius, date_start, date_end, 'temp_C', scale=11132)
 
-    print(f"Toplam görev sayısı: {len(input_tasks)}")
+    return {**ndvi_monthly, **rain_monthly, **temp_monthly}
 
-    num_workers = min(10, cpu_count())
-    print(f"{num_workers} worker kullanılıyor.")
+_point_executor = None
+_point_executor_lock = threading.Lock()
 
-    results = []
-    
-    with Pool(processes=num_workers) as pool:
-        for result in tqdm(pool.imap(worker_task, input_tasks), total=len(input_tasks)):
-            if result is not None:
-                results.append(result)
-
-    if results:
-        final_df = pd.concat(results, ignore_index=True)
-        final_df = final_df.dropna(axis=0, how='all')
-
-        cols = final_df.columns.tolist()
-        priority = ['Latitude', 'Longitude', 'elevation']
-        others = [c for c in cols if c not in priority]
-        final_cols = priority + others
-        
-        final_df = final_df[final_cols]
 
-        print("\n--- İŞLEM BAŞARILI ---")
-        print(f"Toplam Satır: {len(final_df)}")
-        print("İlk 5 Satır:")
-        print(final_df.head())
-        
-        filename = f"gee_results_fixed_{datetime.now().strftime('%Y%m%d')}.csv"
-        final_df.to_csv(filename, index=False)
-        print(f"Dosya kaydedildi: {filename}")
-    else:
-        print("HATA: Hiçbir veri çekilemedi.")
+def collect_point_data(lon, lat, date_start='2020-03-01', date_end='2020-08-31', region_radius=3000):
+    """Tek nokta için yükseklik + sezon özellik satırı; alınamazsa None.
+
+    Servisle aynı sağlayıcı yolundan (önbellek, devre kesici) geçer. Sağlayıcılar sezonu
+    yıldan türettiği için pencere `date_start` yılının sezonu (Mart-Ağustos) olmalıdır.
+    0 ile doldurulan sütunlar ve NDVI kaynağı `df.attrs['quality']`'de tutulur.
+    """
+    global _point_executor
+    # feature_providers bu modülü içe aktardığı için burada, geç içe aktarılır
+    from feature_providers import LOCATION_COLUMNS, FeatureExecutor, SatelliteProvider, TerrainProvider, season_dates
+
+    year = datetime.strptime(date_start, "%Y-%m-%d").year
+    if (date_start, date_end) != season_dates(year):
+        raise ValueError(f"Yalnızca sezon penceresi desteklenir: {season_dates(year)}")
+    if _point_executor is None:
+        with _point_executor_lock:
+            if _point_executor is None:
+                _point_executor = FeatureExecutor([TerrainProvider(), SatelliteProvider()])
+
+    features = _point_executor.collect_point(lat, lon, year, region_radius)
+    if features.required_errors:
+        return None
+    row = {'Latitude': lat, 'Longitude': lon,
+           **{k: v for k, v in features.values.items() if k not in LOCATION_COLUMNS}}
+
+    df = build_feature_frame([row], fill_value=None)
+    quality = dict(features.quality)
+    quality['filled'] = [col for col in df.columns if df[col].isna().any()]
+    df = df.fillna(0)
+    df.attrs['quality'] = quality
+    return df
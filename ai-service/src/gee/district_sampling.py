@@ -0,0 +1,241 @@
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import gee_backend
+except ImportError:
+    from . import gee_backend
+
+try:
+    from batch_export import build_table, export_specs, spec_columns
+    from collect_point_data import point_roi
+except ImportError:
+    from .batch_export import build_table, export_specs, spec_columns
+    from .collect_point_data import point_roi
+
+try:
+    from feature_cleaning import STAT_SEPARATOR, interpolate_months, monthly_columns, INTERPOLATED_PREFIXES
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from feature_cleaning import STAT_SEPARATOR, interpolate_months, monthly_columns, INTERPOLATED_PREFIXES
+
+ee = gee_backend.lazy_import('ee')
+
+# İlçe başına örnek nokta sayısı ve noktaların merkez çevresinde yayıldığı yarıçap
+SAMPLE_POINTS = int(os.getenv('DISTRICT_SAMPLE_POINTS', '16'))
+SAMPLE_SPREAD_M = float(os.getenv('DISTRICT_SAMPLE_SPREAD_M', '10000'))
+# Her noktanın özet tamponu; servisteki PREDICT_RADIUS ile aynı tutulur
+SAMPLE_BUFFER_M = float(os.getenv('DISTRICT_SAMPLE_BUFFER_M', '500'))
+# Tek reduceRegions çağrısındaki en fazla nokta (getInfo yanıt boyutu sınırı için)
+SAMPLE_BATCH_POINTS = int(os.getenv('DISTRICT_SAMPLE_BATCH_POINTS', '1000'))
+SAMPLE_MAX_WORKERS = int(os.getenv('DISTRICT_SAMPLE_MAX_WORKERS', '4'))
+# Noktalar tampondaki ekili alan oranıyla ağırlıklandırılır (ESA WorldCover, sınıf 40)
+CROPLAND_WEIGHTING = os.getenv('DISTRICT_SAMPLE_CROPLAND_WEIGHTING', '1') == '1'
+CROPLAND_IMAGE = 'ESA/WorldCover/v200'
+CROPLAND_CLASS = 40
+
+QUANTILES = (0.1, 0.5, 0.9)
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+M_PER_DEG_LAT = 111320.0
+SAMPLE_COUNT_COLUMN = f"sample{STAT_SEPARATOR}points"
+
+
+def sample_points(name, coords, n=SAMPLE_POINTS, spread_m=SAMPLE_SPREAD_M):
+    """İlçe merkezi çevresinde deterministik (Vogel sarmalı) n nokta.
+
+    Rastgelelik yoktur; aynı katalog her çalıştırmada aynı noktaları, dolayısıyla
+    aynı GEE anahtarlarını (önbellek / fixture) üretir. İlk nokta merkeze en yakındır.
+    """
+    i = np.arange(n)
+    radius = spread_m * np.sqrt((i + 0.5) / n) if n > 1 else np.zeros(1)
+    theta = i * GOLDEN_ANGLE
+    lat = coords['enlem'] + radius * np.cos(theta) / M_PER_DEG_LAT
+    lon = coords['boylam'] + radius * np.sin(theta) / (M_PER_DEG_LAT * np.cos(np.radians(coords['enlem'])))
+    return {f"{name}#{k:02d}": {'enlem': round(float(a), 6), 'boylam': round(float(o), 6)} for k, (a, o) in enumerate(zip(lat, lon))}
+
+
+def chunked(points, size=SAMPLE_BATCH_POINTS):
+    items = list(points.items())
+    for start in range(0, len(items), size):
+        yield dict(items[start:start + size])
+
+
+def fetch_table(spec):
+    # Bir görev tanımının reduceRegions sonucu; tek getInfo, nokta sayısından bağımsız
+    key = {'op': 'reduce_regions', **{k: v for k, v in spec.items() if k != 'name'}}
+
+    def request():
+        features = build_table(spec).getInfo()['features']
+        return [feature['properties'] for feature in features]
+
+    rows = gee_backend.get_backend().fetch(key, request)
+    return pd.DataFrame(rows, columns=['nnokta_id'] + spec_columns(spec)).set_index('nnokta_id')
+
+
+def fetch_cropland_fraction(points, radius):
+    # Tampon içindeki ekili alan oranı (0-1); tüm noktalar tek çağrıda
+    point_list = [{'nnokta_id': name, 'lat': c['enlem'], 'lon': c['boylam']} for name, c in points.items()]
+    key = {'op': 'cropland_fraction', 'image': CROPLAND_IMAGE, 'class': CROPLAND_CLASS,
+           'points': point_list, 'radius': radius}
+
+    def request():
+        collection = ee.FeatureCollection([
+            ee.Feature(point_roi(p['lon'], p['lat'], radius), {'nnokta_id': p['nnokta_id']}) for p in point_list
+        ])
+        image = ee.ImageCollection(CROPLAND_IMAGE).first().eq(CROPLAND_CLASS).rename('cropland')
+        table = image.reduceRegions(collection=collection, reducer=ee.Reducer.mean(), scale=10, tileScale=4)
+        return [f['properties'] for f in table.select(['nnokta_id', 'cropland'], None, False).getInfo()['features']]
+
+    rows = gee_backend.get_backend().fetch(key, request)
+    return pd.DataFrame(rows, columns=['nnokta_id', 'cropland']).set_index('nnokta_id')['cropland']
+
+
+def weighted_stats(values, weights, quantiles=QUANTILES):
+    """(ilçe x nokta x özellik) dizisinden NaN'a dayanıklı ağırlıklı ortalama, std ve quantile'lar.
+
+    Ağırlığı sıfır ya da değeri eksik noktalar o özelliğe katkı vermez; hiç geçerli
+    noktası olmayan hücreler NaN kalır. Quantile'lar ağırlıklı ECDF üzerinden alınır.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    w = np.where(valid, np.asarray(weights, dtype=np.float64)[:, :, None], 0.0)
+    total = w.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        filled = np.where(valid, values, 0.0)
+        mean = (w * filled).sum(axis=1) / total
+        var = (w * (filled - mean[:, None, :]) ** 2).sum(axis=1) / total
+    mean[total == 0] = np.nan
+    std = np.sqrt(var)
+    std[total == 0] = np.nan
+
+    # NaN'lar sıralamada sona gider ve ağırlıkları sıfır olduğundan ECDF'i etkilemez
+    order = np.argsort(np.where(valid, values, np.inf), axis=1)
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(w, order, axis=1), axis=1)
+    result = {'mean': mean, 'std': std}
+    for q in quantiles:
+        idx = np.argmax(cumulative >= q * total[:, None, :], axis=1)
+        picked = np.take_along_axis(sorted_values, idx[:, None, :], axis=1)[:, 0, :]
+        picked[total == 0] = np.nan
+        result[f"q{int(round(q * 100)):02d}"] = picked
+    return result
+
+
+def aggregate(point_df, districts, weights=None):
+    """Nokta satırlarını (`<ilçe>#<k>` indeksli) ilçe düzeyine indirger.
+
+    Ortalama özgün sütun adıyla (modelin beklediği özellik), std ve quantile'lar
+    `<sütun>__<istatistik>` adıyla döner.
+    """
+    columns = list(point_df.columns)
+    names = list(districts)
+    owner = point_df.index.str.rsplit('#', n=1).str[0]
+    slot = point_df.groupby(owner).cumcount().to_numpy()
+    n = int(slot.max()) + 1 if len(slot) else 0
+
+    row = pd.Index(names).get_indexer(owner)
+    keep = row >= 0
+    values = np.full((len(names), n, len(columns)), np.nan)
+    values[row[keep], slot[keep]] = point_df.to_numpy(dtype=np.float64)[keep]
+
+    w = np.zeros((len(names), n))
+    point_weights = np.ones(len(point_df)) if weights is None else \
+        weights.reindex(point_df.index).to_numpy(dtype=np.float64)
+    w[row[keep], slot[keep]] = np.nan_to_num(point_weights[keep], nan=0.0)
+    # Hiçbir değeri olmayan nokta ne ağırlık ne örnek sayısına katılır
+    has_data = ~np.isnan(values).all(axis=2)
+    w[~has_data] = 0.0
+    # Ekili alanı hiç olmayan ilçelerde veri olan tüm noktalar eşit sayılır
+    empty = w.sum(axis=1) == 0
+    w[empty] = has_data[empty]
+
+    stats = weighted_stats(values, w)
+    frame = {col: stats['mean'][:, j] for j, col in enumerate(columns)}
+    for stat in (s for s in stats if s != 'mean'):
+        frame.update({f"{col}{STAT_SEPARATOR}{stat}": stats[stat][:, j] for j, col in enumerate(columns)})
+    frame[SAMPLE_COUNT_COLUMN] = (w > 0).sum(axis=1)
+    return pd.DataFrame(frame, index=pd.Index(names, name='nnokta_id'))
+
+
+def interpolate_point_months(df):
+    # Bulut vb. nedeniyle boş kalan aylar nokta bazında doldurulur, sonra ilçe özetine girer
+    df = df.copy()
+    for prefix in INTERPOLATED_PREFIXES:
+        cols = monthly_columns(df.columns, prefix)
+        if cols:
+            df[cols] = interpolate_months(df[cols].to_numpy(dtype=np.float64))
+    return df
+
+
+def collect_district_features(districts, years, n=SAMPLE_POINTS, spread_m=SAMPLE_SPREAD_M,
+                              buffer_m=SAMPLE_BUFFER_M, cropland_weighting=CROPLAND_WEIGHTING,
+                              max_workers=SAMPLE_MAX_WORKERS):
+    """İlçe başına n örnek noktadan ilçe/yıl özellik tablosu.
+
+    Upstream çağrı sayısı (yıl x grup + statik) x nokta parçası kadardır; n büyüdükçe
+    yalnızca parça sayısı (SAMPLE_BATCH_POINTS'te bir) artar.
+    """
+    gee_backend.get_backend().init()
+    points = {}
+    for name, coords in districts.items():
+        points.update(sample_points(name, coords, n, spread_m))
+
+    specs = []
+    for chunk in chunked(points):
+        specs.extend(s for s in export_specs(chunk, years, buffer_m) if s['group'] != 'modis')
+    static_specs = [s for s in specs if s['group'] == 'elevation']
+    seasonal_specs = [s for s in specs if s['group'] != 'elevation']
+    print(f"🎯 Alt örnekleme: {len(districts)} ilçe x {n} nokta, {len(years)} yıl, "
+          f"{len(specs) + (len(static_specs) if cropland_weighting else 0)} toplu sorgu")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        weights_futures = [executor.submit(fetch_cropland_fraction, chunk, buffer_m)
+                           for chunk in chunked(points)] if cropland_weighting else []
+        static = pd.concat(executor.map(fetch_table, static_specs))
+        seasonal = list(zip(seasonal_specs, executor.map(fetch_table, seasonal_specs)))
+        weights = pd.concat([f.result() for f in weights_futures]) if weights_futures else None
+
+        # NDVI'si tamamen boş noktalar için MODIS; yalnızca o noktalarla, yıl başına tek ek sorgu
+        modis_specs = []
+        for year in years:
+            empty = [name for spec, table in seasonal if spec['year'] == year and spec['group'] == 'ndvi'
+                     for name in table.index[table.isna().all(axis=1)]]
+            for chunk in chunked({name: points[name] for name in empty}):
+                modis_specs.extend(s for s in export_specs(chunk, [year], buffer_m) if s['group'] == 'modis')
+        seasonal.extend(zip(modis_specs, executor.map(fetch_table, modis_specs)))
+
+    frames = []
+    for year in years:
+        by_group = {}
+        for spec, table in seasonal:
+            if spec['year'] == year:
+                by_group.setdefault(spec['group'], []).append(table)
+        if not {'ndvi', 'rain', 'temp'} <= by_group.keys():
+            print(f"⚠️ {year} için tablolar eksik, atlanıyor.")
+            continue
+        ndvi = pd.concat(by_group['ndvi'])
+        if 'modis' in by_group:
+            ndvi = ndvi.combine_first(pd.concat(by_group['modis']))
+        point_df = pd.concat([ndvi, pd.concat(by_group['rain']), pd.concat(by_group['temp'])], axis=1)
+        point_df = interpolate_point_months(point_df.join(static))
+
+        district_df = aggregate(point_df, districts, weights)
+        district_df = district_df[district_df[SAMPLE_COUNT_COLUMN] > 0]
+        district_df.insert(0, 'yil', int(year))
+        frames.append(district_df.reset_index())
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    coords = pd.DataFrame.from_dict(districts, orient='index')
+    df.insert(2, 'enlem', df['nnokta_id'].map(coords['enlem']))
+    df.insert(3, 'boylam', df['nnokta_id'].map(coords['boylam']))
+    df.insert(4, 'Latitude', df['enlem'])
+    df.insert(5, 'Longitude', df['boylam'])
+    return df
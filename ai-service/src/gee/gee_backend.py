@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import hashlib
+import threading
+import importlib.util
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_FIXTURE_DIR = PROJECT_ROOT / 'data' / 'fixtures' / 'gee'
+# Tek bir getInfo çağrısının en fazla süresi; takılan çağrılar iş parçacığını sonsuza dek tutmasın
+GEE_REQUEST_DEADLINE_MS = int(os.getenv('GEE_REQUEST_DEADLINE_MS', '20000'))
+
+
+class GeeReplayError(Exception):
+    pass
+
+
+def lazy_import(name):
+    # Modül ilk öznitelik erişiminde yüklenir; `ee` yalnızca canlı sorguda gerekir
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"{name} modülü bulunamadı")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def request_digest(key):
+    canonical = json.dumps(key, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class LiveBackend:
+    """GEE sorgularını doğrudan canlı `ee` API'sine gönderir."""
+
+    name = 'live'
+
+    def __init__(self):
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def init(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if not self._initialized:
+                try:
+                    import base_gee
+                except ImportError:
+                    from . import base_gee
+                try:
+                    base_gee.init()
+                except SystemExit:
+                    # base_gee betikler için süreci sonlandırır; serviste hata olarak yükseltilir
+                    raise RuntimeError("GEE başlatılamadı")
+                import ee
+                ee.data.setDeadline(GEE_REQUEST_DEADLINE_MS)
+                self._initialized = True
+
+    def fetch(self, key, request):
+        self.init()
+        return request()
+
+
+class RecordingBackend(LiveBackend):
+    """Canlı yanıtları sıkıştırılmış fixture dosyaları olarak diske yazar."""
+
+    name = 'record'
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR):
+        super().__init__()
+        self.fixture_dir = Path(fixture_dir)
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    def fetch(self, key, request):
+        value = super().fetch(key, request)
+        path = self.fixture_dir / f"{request_digest(key)}.json.gz"
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'key': key, 'value': value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return value
+
+
+class ReplayBackend:
+    """Kaydedilmiş fixture'ları ağ ve kimlik bilgisi olmadan geri oynatır.
+
+    `latency_ms` her yanıta eklenen yapay gecikmedir (ortalama, ± `jitter_ms`);
+    `failure_rate` ise sorguların rastgele başarısız olma oranıdır.
+    """
+
+    name = 'replay'
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0, seed=None):
+        self.fixture_dir = Path(fixture_dir)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._memory = {}
+
+    def init(self):
+        pass
+
+    def _load(self, digest):
+        if digest in self._memory:
+            return self._memory[digest]
+        path = self.fixture_dir / f"{digest}.json.gz"
+        if not path.exists():
+            raise GeeReplayError(f"Fixture bulunamadı: {path.name}")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            value = json.load(f)['value']
+        self._memory[digest] = value
+        return value
+
+    def _simulate(self):
+        with self._rng_lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms))
+            fail = self._rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise GeeReplayError("Yapay hata (failure_rate)")
+
+    def fetch(self, key, request):
+        value = self._load(request_digest(key))
+        self._simulate()
+        return value
+
+
+BACKENDS = {
+    'live': LiveBackend,
+    'record': RecordingBackend,
+    'replay': ReplayBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend_from_env():
+    kind = os.getenv('GEE_BACKEND', 'live').lower()
+    fixture_dir = os.getenv('GEE_FIXTURE_DIR', str(DEFAULT_FIXTURE_DIR))
+
+    if kind == 'live':
+        return LiveBackend()
+    if kind == 'record':
+        return RecordingBackend(fixture_dir)
+    if kind == 'replay':
+        seed = os.getenv('GEE_REPLAY_SEED')
+        return ReplayBackend(
+            fixture_dir,
+            latency_ms=float(os.getenv('GEE_REPLAY_LATENCY_MS', '0')),
+            jitter_ms=float(os.getenv('GEE_REPLAY_JITTER_MS', '0')),
+            failure_rate=float(os.getenv('GEE_REPLAY_FAILURE_RATE', '0')),
+            seed=int(seed) if seed is not None else None
+        )
+    raise ValueError(f"Bilinmeyen GEE_BACKEND: {kind} (geçerli: {', '.join(BACKENDS)})")
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_env()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -1,37 +1,93 @@
-import ee
-import base_gee
+try:
+    import gee_backend
+except ImportError:
+    from . import gee_backend
 
-def get_image_thumbnail_url(lon, lat, date_start='2024-05-01', date_end='2024-09-30'):
+ee = gee_backend.lazy_import('ee')
 
-    base_gee.init()
+S2_COLLECTION = 'COPERNICUS/S2_SR_HARMONIZED'
+DEFAULT_START = '2024-05-01'
+DEFAULT_END = '2024-09-30'
 
-    point_of_interest = ee.Geometry.Point(lon, lat)
-
-    image = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED') \
-        .filterBounds(point_of_interest) \
-        .filterDate(date_start, date_end) \
-        .sort('CLOUDY_PIXEL_PERCENTAGE') \
-        .first()
-
-
-    vis_params = {
+VIS_PARAMS = {
+    'rgb': {
         'bands': ['B4', 'B3', 'B2'],
         'min': 0,
         'max': 3000,
         'gamma': 1.4
+    },
+    'ndvi': {
+        'bands': ['NDVI'],
+        'min': 0,
+        'max': 0.9,
+        'palette': ['a50026', 'f46d43', 'fee08b', 'd9ef8b', '66bd63', '006837']
+    },
+}
+
+
+def parcel_image(kind, lon, lat, radius, date_start, date_end):
+    # Parsel için dönemin en az bulutlu Sentinel-2 görüntüsü; NDVI istenirse tek bant.
+    # Dönemde görüntü yoksa görüntü None döner (upstream hatası değil, veri yok)
+    parcel = ee.Geometry.Point(lon, lat)
+    collection = ee.ImageCollection(S2_COLLECTION) \
+        .filterBounds(parcel) \
+        .filterDate(date_start, date_end)
+    if collection.size().getInfo() == 0:
+        return None, parcel.buffer(radius)
+    image = collection.sort('CLOUDY_PIXEL_PERCENTAGE').first()
+    if kind == 'ndvi':
+        image = image.normalizedDifference(['B8', 'B4']).rename('NDVI')
+    return image, parcel.buffer(radius)
+
+
+def image_key(op, kind, lon, lat, radius, date_start, date_end):
+    return {
+        'op': op, 'source': S2_COLLECTION, 'kind': kind,
+        'lon': lon, 'lat': lat, 'radius': radius,
+        'start': date_start, 'end': date_end,
+        'vis': VIS_PARAMS[kind]
     }
 
-    thumbnail_url = image.getThumbURL({
-        **vis_params,
-        'region': point_of_interest.buffer(1500).bounds(),
-        'dimensions': '800x800'
-    })
+
+def get_thumbnail_url(kind, lon, lat, radius=1500, date_start=DEFAULT_START, date_end=DEFAULT_END, dimensions=800):
+    key = {**image_key('thumb_url', kind, lon, lat, radius, date_start, date_end), 'dimensions': dimensions}
+
+    def request():
+        image, region = parcel_image(kind, lon, lat, radius, date_start, date_end)
+        if image is None:
+            return None
+        return image.getThumbURL({
+            **VIS_PARAMS[kind],
+            'region': region.bounds(),
+            'dimensions': dimensions
+        })
+
+    return gee_backend.get_backend().fetch(key, request)
+
+
+def get_tile_url_format(kind, lon, lat, radius=1500, date_start=DEFAULT_START, date_end=DEFAULT_END):
+    # XYZ karo adresi şablonu ({z}/{x}/{y}); görüntü parsel çevresine kırpılır
+    key = image_key('tile_url_format', kind, lon, lat, radius, date_start, date_end)
+
+    def request():
+        image, region = parcel_image(kind, lon, lat, radius, date_start, date_end)
+        if image is None:
+            return None
+        return image.clip(region).getMapId(VIS_PARAMS[kind])['tile_fetcher'].url_format
+
+    return gee_backend.get_backend().fetch(key, request)
+
+
+def get_image_thumbnail_url(lon, lat, date_start=DEFAULT_START, date_end=DEFAULT_END):
+
+    thumbnail_url = get_thumbnail_url('rgb', lon, lat, 1500, date_start, date_end, dimensions='800x800')
 
     print("\nURL Başarıyla Oluşturuldu!\n")
     print(thumbnail_url)
+    return thumbnail_url
 
 if __name__ == "__main__":
     target_lon = 28.889618
     target_lat = 41.025764
-    
-    get_image_thumbnail_url(lon=target_lon, lat=target_lat)
\ No newline at end of file
+
+    get_image_thumbnail_url(lon=target_lon, lat=target_lat)
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+import requests
+
+from gee.get_satellite_image import VIS_PARAMS, get_thumbnail_url, get_tile_url_format
+from resilience import BREAKERS
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+IMAGERY_CACHE_DIR = Path(os.getenv('IMAGERY_CACHE_DIR', PROJECT_ROOT / 'data' / 'cache' / 'imagery'))
+IMAGERY_CACHE_MAX_MB = float(os.getenv('IMAGERY_CACHE_MAX_MB', '1024'))
+IMAGERY_DOWNLOAD_TIMEOUT_S = float(os.getenv('IMAGERY_DOWNLOAD_TIMEOUT_S', '30'))
+# GEE karo şablonları (map id) bir süre sonra geçersizleşir; bellekte bu kadar tutulur
+IMAGERY_TILE_URL_TTL_S = float(os.getenv('IMAGERY_TILE_URL_TTL_S', '3600'))
+IMAGERY_PRUNE_EVERY = 100
+
+KINDS = tuple(VIS_PARAMS)
+
+
+def request_key(spec):
+    # Geometri, tarih aralığı ve görselleştirme parametreleri birlikte anahtarı oluşturur
+    canonical = json.dumps({**spec, 'vis': VIS_PARAMS[spec['kind']]}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def download(url):
+    response = requests.get(url, timeout=IMAGERY_DOWNLOAD_TIMEOUT_S)
+    response.raise_for_status()
+    return response.content
+
+
+class ImageryCache:
+    """İçerik adresli disk önbelleği.
+
+    `refs/<istek anahtarı>` dosyası içeriğin SHA-256 özetini tutar, içerik
+    `blobs/<ilk iki hane>/<özet>.png` altında bir kez saklanır (boş karolar gibi
+    aynı içerikler paylaşılır). Özet aynı zamanda HTTP ETag'idir.
+    """
+
+    def __init__(self, directory=IMAGERY_CACHE_DIR, max_mb=IMAGERY_CACHE_MAX_MB):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        (self.directory / 'refs').mkdir(parents=True, exist_ok=True)
+        (self.directory / 'blobs').mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._writes = 0
+
+    def _ref_path(self, key):
+        return self.directory / 'refs' / key
+
+    def _blob_path(self, digest):
+        return self.directory / 'blobs' / digest[:2] / f"{digest}.png"
+
+    def lookup(self, key):
+        ref = self._ref_path(key)
+        try:
+            digest = ref.read_text().strip()
+        except FileNotFoundError:
+            return None
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            return None
+        os.utime(ref)
+        return digest, blob
+
+    def store(self, key, content):
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, blob)
+        ref = self._ref_path(key)
+        tmp_ref = ref.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_ref.write_text(digest)
+        os.replace(tmp_ref, ref)
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % IMAGERY_PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return digest, blob
+
+    def get_or_fetch(self, key, fetch):
+        # Aynı anahtar için eşzamanlı istekler tek bir upstream çağrısını bekler
+        hit = self.lookup(key)
+        if hit is not None:
+            return hit + (True,)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not leader:
+            return future.result() + (False,)
+
+        try:
+            result = self.store(key, fetch())
+            future.set_result(result)
+            return result + (False,)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def prune(self):
+        # Boyut sınırı aşılırsa en uzun süredir okunmayan kayıtlar silinir; sahipsiz içerikler temizlenir
+        refs = sorted(self._ref_path('').glob('*'), key=lambda p: p.stat().st_mtime)
+        blobs = {p.stem: p for p in (self.directory / 'blobs').glob('*/*.png')}
+        total = sum(p.stat().st_size for p in blobs.values())
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for ref in refs:
+            if total <= self.max_bytes * 0.9:
+                break
+            ref.unlink(missing_ok=True)
+            removed += 1
+
+        live = set()
+        for ref in self._ref_path('').glob('*'):
+            try:
+                live.add(ref.read_text().strip())
+            except FileNotFoundError:
+                pass
+        for digest, blob in blobs.items():
+            if digest not in live:
+                total -= blob.stat().st_size
+                blob.unlink(missing_ok=True)
+        return removed
+
+
+_tile_urls = {}
+_tile_urls_lock = threading.Lock()
+
+
+def tile_url_format(spec):
+    key = request_key(spec)
+    with _tile_urls_lock:
+        cached = _tile_urls.get(key)
+        if cached is not None and time.time() - cached[1] < IMAGERY_TILE_URL_TTL_S:
+            return cached[0]
+    url_format = BREAKERS['gee'].call(
+        get_tile_url_format, spec['kind'], spec['lon'], spec['lat'], spec['radius'], spec['start'], spec['end']
+    )
+    with _tile_urls_lock:
+        _tile_urls[key] = (url_format, time.time())
+    return url_format
+
+
+def thumbnail(kind, lon, lat, radius, date_start, date_end, size):
+    spec = {'type': 'thumbnail', 'kind': kind, 'lon': round(lon, 6), 'lat': round(lat, 6),
+            'radius': radius, 'start': date_start, 'end': date_end, 'size': size}
+
+    def fetch():
+        url = BREAKERS['gee'].call(get_thumbnail_url, kind, spec['lon'], spec['lat'], radius, date_start, date_end, size)
+        return download(url)
+
+    return get_imagery_cache().get_or_fetch(request_key(spec), fetch)
+
+
+def tile(kind, lon, lat, radius, date_start, date_end, z, x, y):
+    # Karo şablonu parsel başına bir kez alınır; karo görüntüleri ayrı ayrı önbelleğe yazılır
+    spec = {'type': 'tile_template', 'kind': kind, 'lon': round(lon, 6), 'lat': round(lat, 6),
+            'radius': radius, 'start': date_start, 'end': date_end}
+
+    def fetch():
+        url_format = tile_url_format(spec)
+        return download(url_format.format(z=z, x=x, y=y))
+
+    return get_imagery_cache().get_or_fetch(request_key({**spec, 'type': 'tile', 'z': z, 'x': x, 'y': y}), fetch)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_imagery_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageryCache()
+    return _cache
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import socket
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+JOB_DB_PATH = Path(os.getenv('JOB_DB_PATH', PROJECT_ROOT / 'data' / 'cache' / 'jobs.sqlite'))
+# Worker süreçleri ayrı bir dağıtımdır: `python src/job_queue.py` (API süreçleri iş çalıştırmaz)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Çalışan işin sahipliği bu kadar saniye geçerlidir; worker süre dolmadan yeniler (heartbeat).
+# Yenilenmeyen iş (ör. worker çöktü) başka bir worker tarafından yeniden sahiplenilir.
+JOB_LEASE_S = float(os.getenv('JOB_LEASE_S', '60'))
+JOB_HEARTBEAT_S = JOB_LEASE_S / 3
+JOB_RETENTION_S = float(os.getenv('JOB_RETENTION_S', str(7 * 24 * 3600)))
+JOB_POLL_INTERVAL_S = float(os.getenv('JOB_POLL_INTERVAL_S', '0.5'))
+JOB_PROGRESS_EVERY = 10
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " id TEXT PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " dedup_key TEXT NOT NULL,"
+    " status TEXT NOT NULL,"
+    " payload TEXT NOT NULL,"
+    " result TEXT,"
+    " error TEXT,"
+    " total INTEGER NOT NULL DEFAULT 0,"
+    " completed INTEGER NOT NULL DEFAULT 0,"
+    " worker TEXT,"
+    " created_at REAL NOT NULL,"
+    " started_at REAL,"
+    " heartbeat_at REAL,"
+    " finished_at REAL)",
+    "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key)",
+)
+
+
+def dedup_key(kind, payload):
+    canonical = json.dumps({'kind': kind, 'payload': payload}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """Süreçler arası paylaşılan, SQLite tabanlı kalıcı iş kuyruğu.
+
+    Her çağrı kendi bağlantısını açar; böylece API süreci ve worker süreçleri
+    aynı dosyayı güvenle kullanır. Sahiplenme `BEGIN IMMEDIATE` ile yapılır.
+    """
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            # Eski şemalı veritabanları için kira sütunu
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'heartbeat_at' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, kind, payload, total=0):
+        key = dedup_key(kind, payload)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status != 'failed' AND created_at >= ?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (key, now - JOB_RETENTION_S)
+            ).fetchone()
+            if existing is not None:
+                conn.execute("COMMIT")
+                return existing['id'], True
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, status, payload, total, created_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, key, json.dumps(payload), total, now)
+            )
+            conn.execute("COMMIT")
+            return job_id, False
+
+    def claim(self, worker, lease_s=JOB_LEASE_S):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Kirası dolmuş (worker'ı ölmüş) işler aynı işlem içinde kuyruğa geri alınır
+            requeued = self._requeue_stale(conn, now - lease_s)
+            if requeued:
+                print(f"İş kuyruğu: kirası dolan {requeued} iş yeniden kuyruğa alındı.")
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row['id'])
+            )
+            conn.execute("COMMIT")
+            return {'id': row['id'], 'kind': row['kind'], 'payload': json.loads(row['payload']), 'worker': worker}
+
+    # Aşağıdaki güncellemeler yalnızca işin hâlâ sahibi olan worker'dan kabul edilir; kirası
+    # dolup başka worker'a geçmiş bir işin eski sahibi sonucu ya da ilerlemeyi ezemez.
+
+    def heartbeat(self, job_id, worker):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker)
+            ).rowcount == 1
+
+    def progress(self, job_id, completed, worker):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET completed = ?, heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (completed, time.time(), job_id, worker)
+            )
+
+    def complete(self, job_id, result, worker):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, completed = total, finished_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker)
+            ).rowcount == 1
+
+    def fail(self, job_id, error, worker):
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, time.time(), job_id, worker)
+            ).rowcount == 1
+
+    def status(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, error, total, completed, created_at, started_at, finished_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def result(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None, None
+        return row['status'], json.loads(row['result']) if row['result'] is not None else None
+
+    @staticmethod
+    def _requeue_stale(conn, cutoff):
+        # Yalnızca kirası dolan işler; başka süreçlerin canlı worker'larının işlerine dokunulmaz
+        return conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL, heartbeat_at = NULL, completed = 0"
+            " WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ?",
+            (cutoff,)
+        ).rowcount
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - JOB_RETENTION_S,)
+            ).rowcount
+
+
+def run_predict_batch(queue, job):
+    from predict_yield import predict_yield
+
+    points = job['payload']['points']
+    results = []
+    for i, point in enumerate(points, start=1):
+        try:
+            results.append(predict_yield(point['lat'], point['lon'], point['hectare']))
+        except Exception as e:
+            results.append({"error": f"Tahmin hatası: {str(e)}"})
+        if i % JOB_PROGRESS_EVERY == 0:
+            queue.progress(job['id'], i, job['worker'])
+    return results
+
+
+JOB_HANDLERS = {
+    'predict_batch': run_predict_batch,
+}
+
+
+def worker_main(db_path, worker_name, stop_event):
+    # Model ve GEE oturumu süreç başına bir kez hazırlanır, tüm işlerde yeniden kullanılır
+    from predict_yield import load_model
+    from gee import gee_backend
+
+    queue = JobQueue(db_path)
+    try:
+        load_model()
+    except Exception as e:
+        print(f"⚠️ [{worker_name}] Model önceden yüklenemedi: {e}")
+    try:
+        gee_backend.get_backend().init()
+    except Exception as e:
+        print(f"⚠️ [{worker_name}] GEE oturumu açılamadı: {e}")
+
+    print(f"👷 [{worker_name}] hazır")
+    while not stop_event.is_set():
+        job = queue.claim(worker_name)
+        if job is None:
+            stop_event.wait(JOB_POLL_INTERVAL_S)
+            continue
+
+        # İş sürdükçe kira arka planda yenilenir (ilerleme seyrek yazılsa da)
+        stop_heartbeat = threading.Event()
+
+        def keep_lease(job_id=job['id']):
+            while not stop_heartbeat.wait(JOB_HEARTBEAT_S):
+                if not queue.heartbeat(job_id, worker_name):
+                    return
+
+        heartbeat = threading.Thread(target=keep_lease, daemon=True)
+        heartbeat.start()
+        try:
+            result = JOB_HANDLERS[job['kind']](queue, job)
+            owned = queue.complete(job['id'], result, worker_name)
+        except Exception as e:
+            owned = queue.fail(job['id'], str(e), worker_name)
+        finally:
+            stop_heartbeat.set()
+        if not owned:
+            print(f"⚠️ [{worker_name}] {job['id']} işinin kirası başka bir worker'a geçmiş, sonuç yazılmadı.")
+
+
+class WorkerPool:
+    def __init__(self, size=JOB_WORKERS, db_path=JOB_DB_PATH):
+        self.size = size
+        self.db_path = str(db_path)
+        self._ctx = multiprocessing.get_context('spawn')
+        self._stop = self._ctx.Event()
+        self._processes = []
+
+    def start(self):
+        purged = JobQueue(self.db_path).purge_expired()
+        if purged:
+            print(f"İş kuyruğu: {purged} eski iş silindi.")
+
+        # Worker adları süreçler ve makineler arasında benzersizdir (sahiplik kontrolü buna dayanır)
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(self.size):
+            process = self._ctx.Process(
+                target=worker_main,
+                args=(self.db_path, f"{prefix}:worker-{i}", self._stop),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else JOB_WORKERS
+    # Sinyal işleyicisinde kilit kullanılmaz (tekrarlanan SIGTERM kilitlenmeye yol açabilir)
+    stopping = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.append(sig))
+
+    pool = WorkerPool(size)
+    pool.start()
+    print(f"👷 {size} iş worker'ı çalışıyor ({JOB_DB_PATH}, kira {JOB_LEASE_S:.0f} sn)")
+    while not stopping:
+        time.sleep(1)
+    print("🛑 Worker'lar durduruluyor...")
+    pool.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
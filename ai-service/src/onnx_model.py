@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+
+import numpy as np
+
+# Booster, ONNX-ML TreeEnsembleRegressor grafiğine dönüştürülür; servis tarafı yalnızca
+# onnxruntime ister (xgboost gerekmez). Dönüştürme için `onnx` paketi eğitim ortamında gerekir.
+ONNX_SUFFIX = '.onnx'
+ONNX_INPUT = 'input'
+ONNX_OUTPUT = 'variable'
+ONNX_ML_OPSET = 3
+ONNX_OPSET = 17
+# Tahmin çağrısı başına iş parçacığı; servis istekleri zaten paralel olduğundan varsayılan 1
+ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', '1'))
+ONNX_INTER_OP_THREADS = int(os.getenv('ONNX_INTER_OP_THREADS', '1'))
+
+
+def onnx_model_path(path):
+    return os.path.splitext(path)[0] + ONNX_SUFFIX
+
+
+def parse_base_score(value):
+    # XGBoost 2+ base_score'u "[5E-1]" ya da çok hedefli "[a,b,c]" biçiminde yazar
+    value = value.strip()
+    if value.startswith('['):
+        return [float(v) for v in value.strip('[]').split(',')]
+    return [float(value)]
+
+
+def tree_ensemble_attributes(booster):
+    """Booster JSON dökümünden TreeEnsembleRegressor öznitelikleri.
+
+    XGBoost 'x < eşik ise sol' kuralını ve eksik değer yönünü (default_left) kullanır;
+    ONNX'te bunlar BRANCH_LT ve nodes_missing_value_tracks_true'ya karşılık gelir.
+    Eşikler zaten float32 olduğundan sonuçlar bit düzeyinde aynı yaprağa gider.
+    """
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in ('reg:squarederror', 'reg:quantileerror', 'reg:absoluteerror', 'reg:pseudohubererror'):
+        raise ValueError(f"Desteklenmeyen amaç fonksiyonu (kimlik bağlantısı gerekir): {objective}")
+
+    model = learner['gradient_booster']['model']
+    n_targets = max(int(learner['learner_model_param'].get('num_target', '1')), 1)
+    base_score = parse_base_score(learner['learner_model_param']['base_score'])
+    if len(base_score) == 1:
+        base_score = base_score * n_targets
+
+    nodes = {k: [] for k in ('treeids', 'nodeids', 'featureids', 'values', 'modes', 'truenodeids',
+                             'falsenodeids', 'missing_value_tracks_true')}
+    targets = {k: [] for k in ('treeids', 'nodeids', 'ids', 'weights')}
+    for tree_id, (tree, target) in enumerate(zip(model['trees'], model['tree_info'])):
+        if int(tree['tree_param'].get('size_leaf_vector', '1')) > 1:
+            raise ValueError("Vektör yapraklı (multi_strategy) ağaçlar desteklenmiyor")
+        left, right = tree['left_children'], tree['right_children']
+        for node in range(len(left)):
+            leaf = left[node] == -1
+            nodes['treeids'].append(tree_id)
+            nodes['nodeids'].append(node)
+            nodes['featureids'].append(0 if leaf else tree['split_indices'][node])
+            nodes['values'].append(0.0 if leaf else tree['split_conditions'][node])
+            nodes['modes'].append('LEAF' if leaf else 'BRANCH_LT')
+            nodes['truenodeids'].append(0 if leaf else left[node])
+            nodes['falsenodeids'].append(0 if leaf else right[node])
+            nodes['missing_value_tracks_true'].append(0 if leaf else int(tree['default_left'][node]))
+            if leaf:
+                targets['treeids'].append(tree_id)
+                targets['nodeids'].append(node)
+                targets['ids'].append(int(target))
+                targets['weights'].append(tree['split_conditions'][node])
+
+    attributes = {f"nodes_{k}": v for k, v in nodes.items()}
+    attributes.update({f"target_{k}": v for k, v in targets.items()})
+    attributes.update(n_targets=n_targets, base_values=base_score, aggregate_function='SUM', post_transform='NONE')
+    return attributes, objective
+
+
+def export_onnx(model, path):
+    """Eğitilmiş modeli (XGBRegressor ya da NativeModel) `<model>.onnx` olarak yazar.
+
+    Giriş sütun sırası ve quantile seviyeleri modelin meta verisinde saklanır.
+    """
+    import onnx
+    from onnx import TensorProto, helper
+
+    booster = model.get_booster()
+    feature_names = [str(name) for name in model.feature_names_in_]
+    attributes, objective = tree_ensemble_attributes(booster)
+    alpha = model.get_params().get('quantile_alpha')
+
+    node = helper.make_node('TreeEnsembleRegressor', [ONNX_INPUT], [ONNX_OUTPUT], domain='ai.onnx.ml', **attributes)
+    graph = helper.make_graph(
+        [node], 'xgboost_yield',
+        [helper.make_tensor_value_info(ONNX_INPUT, TensorProto.FLOAT, [None, len(feature_names)])],
+        [helper.make_tensor_value_info(ONNX_OUTPUT, TensorProto.FLOAT, [None, attributes['n_targets']])]
+    )
+    onnx_model = helper.make_model(graph, producer_name='ai-service', opset_imports=[
+        helper.make_opsetid('', ONNX_OPSET), helper.make_opsetid('ai.onnx.ml', ONNX_ML_OPSET)
+    ])
+    onnx_model.ir_version = 8
+    helper.set_model_props(onnx_model, {
+        'feature_names': json.dumps(feature_names, ensure_ascii=False),
+        'objective': objective,
+        'quantile_alpha': json.dumps(np.atleast_1d(alpha).tolist() if alpha is not None else None)
+    })
+    onnx.checker.check_model(onnx_model)
+
+    output_path = onnx_model_path(path)
+    onnx.save(onnx_model, output_path)
+    return output_path
+
+
+class OnnxModel:
+    """onnxruntime oturumu üzerinde NativeModel ile aynı küçük servis arayüzü."""
+
+    def __init__(self, session):
+        self._session = session
+        meta = session.get_modelmeta().custom_metadata_map
+        self.feature_names_in_ = np.asarray(json.loads(meta['feature_names']), dtype=object)
+        self._alpha = json.loads(meta.get('quantile_alpha', 'null'))
+
+    def get_params(self):
+        return {'quantile_alpha': self._alpha}
+
+    def predict_matrix(self, matrix):
+        out = self._session.run([ONNX_OUTPUT], {ONNX_INPUT: np.ascontiguousarray(matrix, dtype=np.float32)})[0]
+        # XGBoost ile aynı biçim: tek hedefte (n,), çok hedefte (n, hedef)
+        return out[:, 0] if out.shape[1] == 1 else out
+
+    def predict(self, X):
+        return self.predict_matrix(np.asarray(X, dtype=np.float32))
+
+
+def load_onnx(path, intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(onnx_model_path(path), sess_options=options, providers=['CPUExecutionProvider'])
+    return OnnxModel(session)
+
+
+_onnx_available = None
+
+
+def onnx_available():
+    # onnxruntime isteğe bağlıdır; yoksa bir kez uyarılır ve XGBoost ile devam edilir
+    global _onnx_available
+    if _onnx_available is None:
+        try:
+            import onnxruntime  # noqa: F401
+            _onnx_available = True
+        except ImportError:
+            print("⚠️ onnxruntime kurulu değil, XGBoost ile servis ediliyor.")
+            _onnx_available = False
+    return _onnx_available
+
+
+def verify_onnx(model, onnx_model, X, tolerance=1e-4):
+    # XGBoost ve ONNX çıktılarının en büyük mutlak farkı; tolerans aşılırsa hata
+    matrix = np.ascontiguousarray(X, dtype=np.float32)
+    expected = np.asarray(model.get_booster().inplace_predict(matrix))
+    actual = onnx_model.predict_matrix(matrix).reshape(expected.shape)
+    diff = float(np.max(np.abs(expected - actual))) if len(matrix) else 0.0
+    if diff > tolerance:
+        raise ValueError(f"ONNX çıktısı XGBoost'tan farklı: en büyük fark {diff:.2e} > {tolerance:.0e}")
+    return diff
+
+
+if __name__ == "__main__":
+    # Mevcut modelleri dönüştürmek için (eğitim ortamında):
+    # python src/onnx_model.py ai-service/data/processed/konya_bugday_modeli_xgb.joblib ...
+    from serving_model import load_model_file
+    for model_path in sys.argv[1:]:
+        print(f"💾 {export_onnx(load_model_file(model_path), model_path)}")
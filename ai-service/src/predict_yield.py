@@ -1,56 +1,183 @@
-import pandas as pd
 import numpy as np
-import joblib
 import os
-import xgboost as xgb
+import threading
 from datetime import datetime
-from gee.collect_point_data import collect_point_data
-from solidgrids.get_soil_properties_for_point import get_soil_properties_for_point
+from regions import get_region_catalog
+from feature_cache import get_feature_cache
+from feature_providers import assemble, get_feature_executor
+from explain import explain_row, global_importances, predict_with_contributions
+from result_cache import get_result_cache, model_checksum, result_key
+from serving_model import load_model_file, native_model_path
+from onnx_model import load_onnx, onnx_available, onnx_model_path
+from drift_monitor import get_drift_monitor
 
 MODEL_PATH = '/app/data/processed/konya_bugday_modeli_xgb.joblib'
-if not os.path.exists(MODEL_PATH):
+if not os.path.isdir(os.path.dirname(MODEL_PATH)):
     MODEL_PATH = 'ai-service/data/processed/konya_bugday_modeli_xgb.joblib'
 
-soilIncluded = True
+QUANTILE_MODEL_PATH = MODEL_PATH.replace('.joblib', '_quantile.joblib')
 
 REFERENCE_YEAR = 2025 
-
-def predict_yield(lat, lon, hectare):
-
-    print(f"\n🌍 ANALİZ BAŞLIYOR: {lat}, {lon} | {hectare} Hektar")
-    
-    print("📡 Uydu verileri taranıyor (Sentinel-2 & İklim)...")
-    date_start = f"{REFERENCE_YEAR}-03-01"
-    date_end = f"{REFERENCE_YEAR}-08-31"
-    
+PREDICT_RADIUS = 500
+DEGRADED_MAX_DISTANCE_KM = float(os.getenv('DEGRADED_MAX_DISTANCE_KM', '50'))
+# Bozulmuş modda önbellekte aranacak en yakın ilçe sayısı
+DEGRADED_MAX_CANDIDATES = int(os.getenv('DEGRADED_MAX_CANDIDATES', '8'))
+# 'xgboost': .ubj/.joblib; 'onnx': train_model'in yazdığı .onnx dosyası onnxruntime ile (yoksa xgboost'a düşülür)
+SERVING_BACKEND = os.getenv('SERVING_BACKEND', 'xgboost')
+
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+def use_onnx(path, backend=SERVING_BACKEND):
+    return backend == 'onnx' and os.path.exists(onnx_model_path(path)) and onnx_available()
+
+def artifact_path(path, backend=SERVING_BACKEND):
+    # ONNX istenmiş ve mevcutsa .onnx; değilse yerel XGBoost dosyası (.ubj), o da yoksa .joblib
+    if use_onnx(path, backend):
+        return onnx_model_path(path)
+    native = native_model_path(path)
+    return native if os.path.exists(native) else path
+
+def model_available():
+    return os.path.exists(artifact_path(MODEL_PATH))
+
+def _load_artifact(path, backend=SERVING_BACKEND):
+    # Modeller süreç boyunca bellekte tutulur; dosya değişirse yeniden yüklenir
+    mtime = os.path.getmtime(artifact_path(path, backend))
+    onnx = use_onnx(path, backend)
+    with _artifacts_lock:
+        cached = _artifacts.get((path, onnx))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, load_onnx(path) if onnx else load_model_file(path))
+            _artifacts[(path, onnx)] = cached
+        return cached[1]
+
+def load_model(backend=SERVING_BACKEND):
+    return _load_artifact(MODEL_PATH, backend)
+
+def load_quantile_model():
+    if not os.path.exists(artifact_path(QUANTILE_MODEL_PATH)):
+        return None
+    return _load_artifact(QUANTILE_MODEL_PATH)
+
+def feature_matrix(full_data, model_features):
+    # Nokta ve quantile modelleri aynı float32 matrisi üzerinde çalışır
+    return np.ascontiguousarray(full_data[list(model_features)].to_numpy(dtype=np.float32))
+
+def predict_matrix(model, matrix):
+    # ONNX modelleri kendi oturumunda, XGBoost modelleri booster üzerinde doğrudan tahmin eder
+    predict = getattr(model, 'predict_matrix', None)
+    if predict is not None:
+        return predict(matrix)
+    return model.get_booster().inplace_predict(matrix)
+
+def predict_quantiles(quantile_model, matrix):
+    # Tüm quantile'lar tek çağrıda: (satır x quantile) matrisi, kesişmeye karşı sıralanır
+    alphas = np.atleast_1d(quantile_model.get_params()['quantile_alpha'])
+    values = np.asarray(predict_matrix(quantile_model, matrix), dtype=np.float64).reshape(len(matrix), len(alphas))
+    values = np.maximum(np.sort(values, axis=1), 0.0)
+    labels = [f"p{int(round(a * 100))}" for a in alphas]
+    return labels, values
+
+def nearest_cached_district(provider, lat, lon, year=REFERENCE_YEAR, radius=PREDICT_RADIUS):
+    # Upstream kullanılamadığında sağlayıcının en yakın, önceden ısıtılmış ilçedeki kaydı kullanılır
+    cache = get_feature_cache()
+    catalog = get_region_catalog()
+    for il, ilce, _ in catalog.nearest(lat, lon, k=DEGRADED_MAX_CANDIDATES, max_km=DEGRADED_MAX_DISTANCE_KM):
+        coords = catalog.coordinates(il, ilce)
+        features = cache.get(provider.name, provider.cache_key(coords['enlem'], coords['boylam'], year, radius))
+        if features is not None:
+            return ilce, features
+    return None, None
+
+def collect_features(lat, lon, year=REFERENCE_YEAR, region_radius=PREDICT_RADIUS, degraded=True):
+    # Tüm sağlayıcılar (uydu, yükseklik, toprak) eşzamanlı; hata veren için en yakın ilçe yedeği
+    fallback = nearest_cached_district if degraded else None
+    return get_feature_executor().collect_point(lat, lon, year, region_radius, fallback=fallback)
+
+def record_drift(model_features, values, zero_filled, quality, soil_included, degraded_reasons):
+    # Servis edilen vektör ve sessiz düzeltmeler (0 doldurma, MODIS, eksik toprak) izlemeye yazılır
+    monitor = get_drift_monitor(os.path.dirname(artifact_path(MODEL_PATH)))
+    if monitor is None:
+        return
+    flags = [f"degraded:{reason.split(':')[0]}" for reason in degraded_reasons]
+    if quality.get('ndvi_source') == 'MODIS_NDVI':
+        flags.append('modis_fallback')
+    if not soil_included:
+        flags.append('soil_missing')
+    if zero_filled:
+        flags.append('zero_filled')
     try:
-        gee_df = collect_point_data(lon, lat, date_start, date_end, region_radius=500)
+        monitor.observe(dict(zip(model_features, values.tolist())), zero_filled, flags)
     except Exception as e:
-        return {"error": f"GEE Bağlantı Hatası: {str(e)}"}
+        print(f"⚠️ Dağılım izleme güncellenemedi: {e}")
 
-    if gee_df is None or gee_df.empty:
-        return {"error": "Bu konum için uydu verisi bulunamadı (Deniz veya veri yok)."}
+def scale_results(per_hectare, hectare):
+    # Önbellekte hektar başına değerler tutulur; toplamlar her istekte yeniden hesaplanır
+    interval = per_hectare["interval"]
+    return {
+        "yield_per_hektar": per_hectare["yield_per_hektar"],
+        "total_yield_ton": round(per_hectare["yield_per_hektar"] * hectare, 2),
+        "interval": None if interval is None else {
+            "yield_per_hektar": interval,
+            "total_yield_ton": {label: round(v * hectare, 2) for label, v in interval.items()}
+        }
+    }
 
-    print("🌱 Toprak analizi yapılıyor...")
-    soil_df = get_soil_properties_for_point(lon, lat)
-    
+def build_response(lat, lon, hectare, per_hectare, factors, degraded_reasons, cached=False):
+    return {
+        "status": "success",
+        "location": {"lat": lat, "lon": lon},
+        "inputs": {
+            "hectare": hectare,
+            "reference_year": REFERENCE_YEAR
+        },
+        "results": scale_results(per_hectare, hectare),
+        "factors": factors,
+        "degraded": bool(degraded_reasons),
+        "degraded_reasons": degraded_reasons,
+        "cached": cached
+    }
+
+def result_max_age(year=REFERENCE_YEAR):
+    # Sonuç, girdilerinden en kısa ömürlüsü kadar geçerlidir (süren sezonda uydu verisi yenilenir)
+    ages = [p.max_age(year) for p in get_feature_executor().providers]
+    ages = [age for age in ages if age is not None]
+    return min(ages) if ages else None
 
-    if soil_df is not None:
-        full_data = pd.concat([gee_df.reset_index(drop=True), soil_df.reset_index(drop=True)], axis=1)
-    else:
-        print("⚠️ Toprak verisi alınamadı, sadece uydu verisi kullanılıyor.")
-        soilIncluded = False
-        full_data = gee_df.copy()
-        
-    full_data['yil'] = REFERENCE_YEAR
-    full_data['enlem'] = lat
-    full_data['boylam'] = lon
-
-    if not os.path.exists(MODEL_PATH):
+def prediction_cache_key(lat, lon):
+    if not model_available():
+        return None, None
+    return model_checksum(artifact_path(MODEL_PATH), artifact_path(QUANTILE_MODEL_PATH)), result_key(lat, lon, REFERENCE_YEAR, PREDICT_RADIUS)
+
+def predict_yield(lat, lon, hectare, explain=False):
+
+    print(f"\n🌍 ANALİZ BAŞLIYOR: {lat}, {lon} | {hectare} Hektar")
+    degraded_reasons = []
+
+    checksum, cache_key = prediction_cache_key(lat, lon)
+    if cache_key is not None and not explain:
+        cached = get_result_cache().get(checksum, cache_key)
+        if cached is not None:
+            print("⚡ Önbellekten yanıtlandı.")
+            return build_response(lat, lon, hectare, cached["results"], cached["factors"], [], cached=True)
+    
+    print("📡 Uydu, yükseklik ve toprak verileri eşzamanlı alınıyor...")
+    features = collect_features(lat, lon)
+    if features.required_errors:
+        reason = "Veri Yok" if features.no_data >= features.required_errors.keys() else "GEE Bağlantı Hatası"
+        return {"error": f"{reason}: {'; '.join(features.required_errors.values())}"}
+    for name, error in features.errors.items():
+        print(f"⚠️ {name} verisi alınamadı ({error}), 0 ile doldurulacak.")
+    degraded_reasons.extend(f"{name}:{ilce}" for name, ilce in features.degraded.items())
+    soil_included = 'soil' not in features.errors
+    quality = features.quality
+
+    if not model_available():
         return {"error": f"Model dosyası bulunamadı: {MODEL_PATH}"}
     
     try:
-        model = joblib.load(MODEL_PATH)
+        model = load_model()
     except Exception as e:
         return {"error": f"Model yüklenemedi: {str(e)}"}
 
@@ -59,39 +186,63 @@ def predict_yield(lat, lon, hectare):
     except AttributeError:
         return {"error": "Model özellik isimleri okunamadı."}
 
-    for col in model_features:
-        if col not in full_data.columns:
-            full_data[col] = 0
-            
-    input_vector = full_data[model_features]
+    # Sağlayıcı çıktıları model şemasına dizilir; upstream'de olmayan ya da temizlikten
+    # sonra boş kalan özellikler 0 ile doldurulur ve izlemeye bildirilir
+    full_data, filled = assemble([features.values], model_features)
+    zero_filled = [col for col in model_features if filled[col].iloc[0]]
+
+    input_vector = full_data
+    matrix = feature_matrix(full_data, model_features)
+    record_drift(model_features, matrix[0], zero_filled, quality, soil_included, degraded_reasons)
 
+    explanation = None
     try:
-        prediction = model.predict(input_vector)[0]
+        if explain:
+            # Katkılar (pred_contribs) yalnızca XGBoost booster'ı ile hesaplanır
+            explain_model = load_model(backend='xgboost')
+            predictions, contributions, bias = predict_with_contributions(explain_model, input_vector)
+            explanation = explain_row(list(model_features), input_vector.iloc[0].to_numpy(), contributions[0], bias[0])
+            explanation["global_importance"] = global_importances(explain_model, artifact_path(MODEL_PATH, 'xgboost'))
+            prediction = predictions[0]
+        else:
+            prediction = predict_matrix(model, matrix)[0]
         prediction = max(0.0, float(prediction))
     except Exception as e:
         return {"error": f"Tahmin hatası: {str(e)}"}
 
-    total_ton = prediction * hectare
-
-    return {
-        "status": "success",
-        "location": {"lat": lat, "lon": lon},
-        "inputs": {
-            "hectare": hectare,
-            "reference_year": REFERENCE_YEAR
-        },
-        "results": {
-            "yield_per_hektar": round(prediction, 3),
-            "total_yield_ton": round(total_ton, 2)
-        },
-        "factors": {
-            "elevation": round(full_data.get('elevation', [0])[0], 1),
-            "rain_may": round(full_data.get('Rain_May', [0])[0], 1),
-            "max_ndvi": round(full_data.get('NDVI_May', [0])[0], 2),
-            "soil_included": soilIncluded
-        }
+    interval = None
+    try:
+        quantile_model = load_quantile_model()
+        if quantile_model is not None:
+            if list(quantile_model.feature_names_in_) != list(model_features):
+                matrix = feature_matrix(full_data.reindex(columns=quantile_model.feature_names_in_, fill_value=0), quantile_model.feature_names_in_)
+            labels, values = predict_quantiles(quantile_model, matrix)
+            interval = {label: round(float(v), 3) for label, v in zip(labels, values[0])}
+    except Exception as e:
+        print(f"⚠️ Tahmin aralığı hesaplanamadı: {e}")
+
+    per_hectare = {"yield_per_hektar": round(prediction, 3), "interval": interval}
+    factors = {
+        "elevation": round(float(full_data.get('elevation', [0])[0]), 1),
+        "rain_may": round(float(full_data.get('Rain_May', [0])[0]), 1),
+        "max_ndvi": round(float(full_data.get('NDVI_May', [0])[0]), 2),
+        "soil_included": soil_included
     }
 
+    # Yedek (degraded) ya da eksik sağlayıcısı 0 ile doldurulmuş tahminler önbelleğe yazılmaz;
+    # upstream düzelince gerçek veriyle hesaplanır
+    if cache_key is not None and not degraded_reasons and not features.errors:
+        try:
+            get_result_cache().put(checksum, cache_key, {"results": per_hectare, "factors": factors},
+                                   max_age=result_max_age())
+        except Exception as e:
+            print(f"⚠️ Tahmin önbelleğe yazılamadı: {e}")
+
+    response = build_response(lat, lon, hectare, per_hectare, factors, degraded_reasons)
+    if explain:
+        response["explanation"] = explanation
+    return response
+
 if __name__ == "__main__":
     test_lat = 38.65
     test_lon = 32.90
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', PROJECT_ROOT / 'data' / 'profiles'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
+PROFILE_HISTORY = int(os.getenv('PROFILE_HISTORY', '100'))
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# Örnekteki en içteki eşleşen fonksiyon aşamayı belirler
+STAGE_FUNCTIONS = {
+    'get_monthly_means': 'gee_monthly_means',
+    'get_elevation': 'gee_elevation',
+    'get_soil_features_for_point': 'soil_fetch',
+    'get_soil_properties_for_point': 'soil_fetch',
+    'predict_matrix': 'model_predict',
+    'predict_quantiles': 'model_predict',
+    'predict_with_contributions': 'model_predict',
+    '_load_artifact': 'model_load',
+}
+WAIT_FUNCTIONS = {'wait', 'result', '_wait_for_tstate_lock', 'acquire'}
+
+_active = contextvars.ContextVar('active_profiler', default=None)
+_history = deque(maxlen=PROFILE_HISTORY)
+_history_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """İstek iş parçacığını ve onun adına çalışan upstream iş parçacıklarını örnekler.
+
+    Her `interval_ms`'de bir kayıtlı iş parçacıklarının yığınları `sys._current_frames()`
+    ile okunur; sonuç speedscope 'sampled' biçiminde yazılabilir.
+    """
+
+    def __init__(self, name, interval_ms=PROFILE_INTERVAL_MS):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.name = name
+        self.interval_s = interval_ms / 1000
+        self._threads = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.started_at = None
+        self.duration_ms = 0.0
+
+    def add_thread(self, ident):
+        with self._lock:
+            self._threads[ident] += 1
+
+    def remove_thread(self, ident):
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def _frame_id(self, frame):
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = len(self.frames)
+            self._frame_index[key] = index
+            self.frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+        return index
+
+    def _sample(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            weight = (now - last) * 1000
+            last = now
+            with self._lock:
+                idents = list(self._threads)
+            current = sys._current_frames()
+            for ident in idents:
+                frame = current.get(ident)
+                if frame is None or ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.append((stack, weight))
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.add_thread(threading.get_ident())
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.duration_ms = (time.perf_counter() - self.started_at) * 1000
+
+    def stage_of(self, stack):
+        names = [self.frames[i]['name'] for i in stack]
+        for name in reversed(names):
+            if name in STAGE_FUNCTIONS:
+                return STAGE_FUNCTIONS[name]
+        if names and names[-1] in WAIT_FUNCTIONS:
+            return 'wait'
+        if any('/pandas/' in self.frames[i]['file'] for i in stack):
+            return 'pandas_assembly'
+        return 'other'
+
+    def stage_summary(self):
+        # İş parçacıkları paralel örneklendiğinden toplamlar duvar saatini aşabilir
+        stages = Counter()
+        for stack, weight in self.samples:
+            stages[self.stage_of(stack)] += weight
+        return {stage: round(ms, 1) for stage, ms in stages.most_common()}
+
+    def self_times(self):
+        functions = Counter()
+        for stack, weight in self.samples:
+            if stack:
+                leaf = self.frames[stack[-1]]
+                functions[f"{leaf['name']} ({os.path.basename(leaf['file'])}:{leaf['line']})"] += weight
+        return functions
+
+    def to_speedscope(self):
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': self.name,
+            'activeProfileIndex': 0,
+            'exporter': 'ai-service profiling',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(w for _, w in self.samples), 3),
+                'samples': [stack for stack, _ in self.samples],
+                'weights': [round(w, 3) for _, w in self.samples]
+            }]
+        }
+
+    def save(self, directory=PROFILE_DIR):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.id}.speedscope.json"
+        path.write_text(json.dumps(self.to_speedscope()), encoding='utf-8')
+        # En yeni PROFILE_KEEP dosya tutulur
+        for old in sorted(directory.glob('*.speedscope.json'))[:-PROFILE_KEEP]:
+            old.unlink(missing_ok=True)
+        return path
+
+
+def propagate(fn):
+    """Upstream havuzunda çalışacak fonksiyonu etkin profilleyiciye bağlar.
+
+    Profilleyici havuz iş parçacığında da etkin yapılır; böylece iç içe havuzlar
+    (sağlayıcı havuzu -> devre kesici havuzu) da örneklenir. Profil kapalıyken
+    fonksiyon olduğu gibi döner; ek yük tek bir ContextVar okumasıdır.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return fn
+
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        profiler.add_thread(ident)
+        token = _active.set(profiler)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+            profiler.remove_thread(ident)
+    return run
+
+
+@contextmanager
+def profile_request(name):
+    profiler = SamplingProfiler(name)
+    token = _active.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active.reset(token)
+        try:
+            profiler.save()
+        except Exception as e:
+            print(f"⚠️ Profil kaydedilemedi: {e}")
+        with _history_lock:
+            _history.append({
+                'id': profiler.id,
+                'name': name,
+                'duration_ms': round(profiler.duration_ms, 1),
+                'stages': profiler.stage_summary(),
+                'functions': profiler.self_times()
+            })
+
+
+def profile_path(profile_id, directory=PROFILE_DIR):
+    path = Path(directory) / f"{profile_id}.speedscope.json"
+    # Yol dışına çıkan kimlikler reddedilir
+    if path.parent.resolve() != Path(directory).resolve() or not path.exists():
+        return None
+    return path
+
+
+def hotspots(top=20):
+    # Son isteklerin aşama ve fonksiyon (self time) toplamları
+    with _history_lock:
+        history = list(_history)
+    stages = Counter()
+    functions = Counter()
+    for entry in history:
+        stages.update(entry['stages'])
+        functions.update(entry['functions'])
+    count = len(history) or 1
+    return {
+        'requests': len(history),
+        'mean_duration_ms': round(sum(e['duration_ms'] for e in history) / count, 1),
+        'stages_ms_per_request': {stage: round(ms / count, 1) for stage, ms in stages.most_common()},
+        'top_functions_ms_per_request': {fn: round(ms / count, 1) for fn, ms in functions.most_common(top)},
+        'recent': [{'id': e['id'], 'duration_ms': e['duration_ms']} for e in history[-10:]]
+    }
@@ -0,0 +1,317 @@
+import os
+import sys
+import json
+import math
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from gee import gee_backend
+from raster.window_reduce import IntegralImage
+from gee.collect_point_data import (
+    COLLECTIONS, build_feature_frame, month_windows, ndvi_source_for_year
+)
+
+ee = gee_backend.lazy_import('ee')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+RASTER_ROOT = Path(os.getenv('RASTER_ROOT', PROJECT_ROOT / 'data' / 'rasters' / 'konya'))
+
+# Konya ili sınırlarını kapsayan dikdörtgen (derece)
+KONYA_AOI = {'lon_min': 31.0, 'lon_max': 34.6, 'lat_min': 36.6, 'lat_max': 39.5}
+
+METERS_PER_DEGREE = 111320.0
+EXPORT_TILE_SIZE = 1024
+NODATA = -9999.0
+
+# resolution: ızgara çözünürlüğü (derece)
+# native_scale: collect_point_data'daki reduceRegion ölçeği; 'sum' indirgemesi
+# GEE'deki gibi piksel kapsama oranıyla ağırlıklandırılsın diye kullanılır.
+VARIABLES = {
+    'NDVI': {'resolution': 0.001, 'reducer': 'mean', 'native_scale': 20, 'monthly': True},
+    'Rain': {'resolution': 0.05, 'reducer': 'sum', 'native_scale': 5566, 'monthly': True},
+    'temp_C': {'resolution': 0.1, 'reducer': 'mean', 'native_scale': 11132, 'monthly': True},
+    'elevation': {'resolution': 0.001, 'reducer': 'mean', 'native_scale': 100, 'monthly': False},
+}
+
+
+class RasterGrid:
+    def __init__(self, lon_min, lat_max, resolution, width, height):
+        self.lon_min = lon_min
+        self.lat_max = lat_max
+        self.resolution = resolution
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def for_aoi(cls, aoi, resolution):
+        width = int(math.ceil((aoi['lon_max'] - aoi['lon_min']) / resolution))
+        height = int(math.ceil((aoi['lat_max'] - aoi['lat_min']) / resolution))
+        return cls(aoi['lon_min'], aoi['lat_max'], resolution, width, height)
+
+    def to_pixel(self, lons, lats):
+        cols = np.floor((np.asarray(lons, dtype=np.float64) - self.lon_min) / self.resolution).astype(np.int64)
+        rows = np.floor((self.lat_max - np.asarray(lats, dtype=np.float64)) / self.resolution).astype(np.int64)
+        return rows, cols
+
+    def pixel_centers(self, rows, cols):
+        lons = self.lon_min + (np.asarray(cols) + 0.5) * self.resolution
+        lats = self.lat_max - (np.asarray(rows) + 0.5) * self.resolution
+        return lons, lats
+
+    def pixel_radius(self, radius_m, lats):
+        # Metre cinsinden yarıçapın satır/sütun karşılığı (boylamda enleme göre daralır)
+        lats = np.asarray(lats, dtype=np.float64)
+        row_r = radius_m / (METERS_PER_DEGREE * self.resolution)
+        col_r = radius_m / (METERS_PER_DEGREE * np.cos(np.radians(lats)) * self.resolution)
+        return np.full_like(lats, row_r), col_r
+
+    def to_dict(self):
+        return {
+            'lon_min': self.lon_min, 'lat_max': self.lat_max, 'resolution': self.resolution,
+            'width': self.width, 'height': self.height
+        }
+
+
+def point_in_polygon(xs, ys, polygon):
+    # Vektörel ışın atma (even-odd kuralı); polygon: [(lon, lat), ...]
+    poly = np.asarray(polygon, dtype=np.float64)
+    x0, y0 = poly[:, 0], poly[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    xs = np.asarray(xs, dtype=np.float64)[..., None]
+    ys = np.asarray(ys, dtype=np.float64)[..., None]
+    crosses = (y0 > ys) != (y1 > ys)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_int = x0 + (ys - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (xs < x_int), axis=-1) % 2 == 1
+
+
+class RasterStore:
+    """AOI üzerindeki aylık NDVI / yağış / sıcaklık ve sabit yükseklik ızgaraları.
+
+    Her ızgara `<root>/<değişken>/<yıl>_<ay>.npy` (yükseklik için `static.npy`)
+    olarak float32 tutulur ve `np.load(mmap_mode='r')` ile açılır.
+    """
+
+    def __init__(self, root=RASTER_ROOT, aoi=KONYA_AOI):
+        self.root = Path(root)
+        self.aoi = aoi
+        self.grids = {name: RasterGrid.for_aoi(aoi, spec['resolution']) for name, spec in VARIABLES.items()}
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def path(self, variable, year=None, month=None):
+        if not VARIABLES[variable]['monthly']:
+            return self.root / variable / 'static.npy'
+        return self.root / variable / f"{year}_{month:02d}.npy"
+
+    def has(self, variable, year=None, month=None):
+        return self.path(variable, year, month).exists()
+
+    def open(self, variable, year=None, month=None):
+        path = self.path(variable, year, month)
+        with self._lock:
+            array = self._arrays.get(path)
+            if array is None:
+                array = np.load(path, mmap_mode='r')
+                self._arrays[path] = array
+        return array
+
+    def create(self, variable, year=None, month=None):
+        self._forget(self.path(variable, year, month))
+        grid = self.grids[variable]
+        path = self.path(variable, year, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.root / variable / 'grid.json', 'w') as f:
+            json.dump(grid.to_dict(), f)
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(grid.height, grid.width))
+        array[:] = np.nan
+        return array
+
+    def _forget(self, path):
+        with self._lock:
+            self._arrays.pop(path, None)
+            self._arrays.pop(('sat', path), None)
+
+    def integral(self, variable, year=None, month=None):
+        # Alan-toplam tabloları ızgaranın yanında saklanır ve bellek eşlemeli açılır
+        path = self.path(variable, year, month)
+        prefix = path.with_suffix('')
+        key = ('sat', path)
+        with self._lock:
+            sat = self._arrays.get(key)
+        if sat is not None:
+            return sat
+
+        sat_path = prefix.with_name(prefix.name + '.sat_sum.npy')
+        if not sat_path.exists() or sat_path.stat().st_mtime < path.stat().st_mtime:
+            IntegralImage.from_array(self.open(variable, year, month)).save(prefix)
+        sat = IntegralImage.load(prefix)
+        with self._lock:
+            self._arrays[key] = sat
+        return sat
+
+    def reduce_window(self, variable, lons, lats, radius_m, year=None, month=None):
+        grid = self.grids[variable]
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+
+        py = (grid.lat_max - lats) / grid.resolution
+        px = (lons - grid.lon_min) / grid.resolution
+        row_r, col_r = grid.pixel_radius(radius_m, lats)
+        means = self.integral(variable, year, month).disk_mean(py, px, row_r, col_r)
+        return self._apply_reducer(variable, means, np.pi * radius_m ** 2)
+
+    def reduce_polygon(self, variable, polygon, year=None, month=None):
+        grid = self.grids[variable]
+        array = self.open(variable, year, month)
+        poly = np.asarray(polygon, dtype=np.float64)
+
+        top, left = grid.to_pixel(poly[:, 0].min(), poly[:, 1].max())
+        bottom, right = grid.to_pixel(poly[:, 0].max(), poly[:, 1].min())
+        r0, r1 = max(int(top), 0), min(int(bottom) + 1, grid.height)
+        c0, c1 = max(int(left), 0), min(int(right) + 1, grid.width)
+        if r0 >= r1 or c0 >= c1:
+            return np.nan
+
+        rr, cc = np.mgrid[r0:r1, c0:c1]
+        px, py = grid.pixel_centers(rr, cc)
+        mask = point_in_polygon(px, py, poly)
+        values = np.asarray(array[r0:r1, c0:c1])[mask]
+        if values.size == 0 or np.all(np.isnan(values)):
+            return np.nan
+
+        lat_c = np.radians(poly[:, 1].mean())
+        area_m2 = 0.5 * abs(np.dot(poly[:, 0], np.roll(poly[:, 1], 1)) - np.dot(poly[:, 1], np.roll(poly[:, 0], 1)))
+        area_m2 *= METERS_PER_DEGREE ** 2 * np.cos(lat_c)
+        return float(self._apply_reducer(variable, np.array([np.nanmean(values)]), area_m2)[0])
+
+    def _apply_reducer(self, variable, means, area_m2):
+        spec = VARIABLES[variable]
+        if spec['reducer'] == 'sum':
+            return means * (area_m2 / spec['native_scale'] ** 2)
+        return means
+
+    def _seasonal_rows(self, reduce, date_start, date_end):
+        year = int(date_start[:4])
+        columns = {}
+        for start, _, month_abbr in month_windows(date_start, date_end):
+            month = int(start[5:7])
+            for variable in ('NDVI', 'Rain', 'temp_C'):
+                name = f"{variable}_{month_abbr}"
+                columns[name] = reduce(variable, year, month) if self.has(variable, year, month) else None
+        return columns
+
+    def collect_points_data(self, lons, lats, date_start='2020-03-01', date_end='2020-08-31', region_radius=3000):
+        # collect_point_data ile aynı sütunları üretir; GEE yerine yerel ızgaralar kullanılır
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        n = len(lons)
+
+        elevation = self.reduce_window('elevation', lons, lats, region_radius) if self.has('elevation') else [None] * n
+        seasonal = self._seasonal_rows(
+            lambda v, y, m: self.reduce_window(v, lons, lats, region_radius, y, m), date_start, date_end
+        )
+
+        rows = []
+        for i in range(n):
+            row = {'Latitude': lats[i], 'Longitude': lons[i], 'elevation': elevation[i]}
+            for name in _ordered_columns(seasonal):
+                values = seasonal[name]
+                row[name] = values[i] if values is not None else None
+            rows.append(row)
+        return build_feature_frame(rows)
+
+    def collect_point_data(self, lon, lat, date_start='2020-03-01', date_end='2020-08-31', region_radius=3000):
+        return self.collect_points_data([lon], [lat], date_start, date_end, region_radius)
+
+    def collect_polygon_data(self, polygon, date_start='2020-03-01', date_end='2020-08-31'):
+        poly = np.asarray(polygon, dtype=np.float64)
+        row = {
+            'Latitude': float(poly[:, 1].mean()),
+            'Longitude': float(poly[:, 0].mean()),
+            'elevation': self.reduce_polygon('elevation', poly) if self.has('elevation') else None,
+        }
+        seasonal = self._seasonal_rows(lambda v, y, m: self.reduce_polygon(v, poly, y, m), date_start, date_end)
+        for name in _ordered_columns(seasonal):
+            row[name] = seasonal[name]
+        return build_feature_frame([row])
+
+
+def _ordered_columns(seasonal):
+    # collect_point_data sırası: önce tüm NDVI ayları, sonra Rain, sonra temp_C
+    return [name for variable in ('NDVI', 'Rain', 'temp_C') for name in seasonal if name.startswith(f"{variable}_")]
+
+
+def _export_image(variable, year, month, geometry):
+    if variable == 'elevation':
+        return ee.Image("USGS/SRTMGL1_003").select('elevation'), 'elevation'
+
+    start = f"{year}-{month:02d}-01"
+    end = f"{year + (month == 12)}-{month % 12 + 1:02d}-01"
+
+    if variable == 'NDVI':
+        source, _ = ndvi_source_for_year(year)
+        collection = COLLECTIONS[source](geometry).filterDate(start, end)
+        if collection.size().getInfo() == 0:
+            collection = COLLECTIONS['MODIS_NDVI'](geometry).filterDate(start, end)
+        return collection.mean(), 'NDVI'
+    if variable == 'Rain':
+        return COLLECTIONS['CHIRPS_RAIN'](geometry).filterDate(start, end).mean(), 'precipitation'
+    return COLLECTIONS['ERA5_TEMP'](geometry).filterDate(start, end).mean(), 'temp_C'
+
+
+def export_from_gee(store, variable, year=None, month=None):
+    gee_backend.get_backend().init()
+
+    aoi = store.aoi
+    grid = store.grids[variable]
+    geometry = ee.Geometry.Rectangle([aoi['lon_min'], aoi['lat_min'], aoi['lon_max'], aoi['lat_max']])
+    image, band = _export_image(variable, year, month, geometry)
+    image = image.select(band).unmask(NODATA).toFloat()
+
+    array = store.create(variable, year, month)
+    for r0 in range(0, grid.height, EXPORT_TILE_SIZE):
+        for c0 in range(0, grid.width, EXPORT_TILE_SIZE):
+            h = min(EXPORT_TILE_SIZE, grid.height - r0)
+            w = min(EXPORT_TILE_SIZE, grid.width - c0)
+            tile = ee.data.computePixels({
+                'expression': image,
+                'fileFormat': 'NUMPY_NDARRAY',
+                'grid': {
+                    'dimensions': {'width': w, 'height': h},
+                    'affineTransform': {
+                        'scaleX': grid.resolution, 'shearX': 0, 'translateX': grid.lon_min + c0 * grid.resolution,
+                        'shearY': 0, 'scaleY': -grid.resolution, 'translateY': grid.lat_max - r0 * grid.resolution,
+                    },
+                    'crsCode': 'EPSG:4326',
+                },
+            })
+            values = np.asarray(tile[band], dtype=np.float32)
+            values[values == NODATA] = np.nan
+            array[r0:r0 + h, c0:c0 + w] = values
+    array.flush()
+    del array
+    print(f"💾 {variable} {year or ''}-{month or ''} ızgarası yazıldı: {store.path(variable, year, month)}")
+
+
+def export_season(year, store=None, date_start=None, date_end=None):
+    store = store or RasterStore()
+    date_start = date_start or f"{year}-03-01"
+    date_end = date_end or f"{year}-08-31"
+
+    if not store.has('elevation'):
+        export_from_gee(store, 'elevation')
+    for start, _, _ in month_windows(date_start, date_end):
+        month = int(start[5:7])
+        for variable in ('NDVI', 'Rain', 'temp_C'):
+            if not store.has(variable, year, month):
+                export_from_gee(store, variable, year, month)
+
+
+if __name__ == "__main__":
+    years = [int(y) for y in sys.argv[1:]] or [2025]
+    for year in years:
+        print(f"📦 {year} sezonu için ızgaralar dışa aktarılıyor...")
+        export_season(year)
@@ -0,0 +1,165 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Yaklaşık daire sorgusunda kullanılan yatay şerit sayısı. Çap bu sayıdan az
+# piksel satırı kaplıyorsa her satır kendi şeridi olur ve sonuç kesindir.
+DISK_STRIPS = 16
+
+
+class IntegralImage:
+    """NaN'ları yok sayan toplam ve geçerli piksel sayısı için alan-toplam tablosu.
+
+    `sums[i, j]` ve `counts[i, j]`, [0, i) x [0, j) dikdörtgeninin değerlerini tutar;
+    böylece her dikdörtgen sorgusu dört okuma ile O(1) cevaplanır.
+    """
+
+    def __init__(self, sums, counts):
+        self.sums = sums
+        self.counts = counts
+        self.height = sums.shape[0] - 1
+        self.width = sums.shape[1] - 1
+
+    @classmethod
+    def from_array(cls, array):
+        array = np.asarray(array, dtype=np.float64)
+        valid = ~np.isnan(array)
+        height, width = array.shape
+
+        sums = np.zeros((height + 1, width + 1), dtype=np.float64)
+        counts = np.zeros((height + 1, width + 1), dtype=np.int64)
+        np.cumsum(np.cumsum(np.where(valid, array, 0.0), axis=0), axis=1, out=sums[1:, 1:])
+        np.cumsum(np.cumsum(valid, axis=0, dtype=np.int64), axis=1, out=counts[1:, 1:])
+        return cls(sums, counts)
+
+    @classmethod
+    def load(cls, prefix):
+        prefix = Path(prefix)
+        sums = np.load(prefix.with_name(prefix.name + '.sat_sum.npy'), mmap_mode='r')
+        counts = np.load(prefix.with_name(prefix.name + '.sat_count.npy'), mmap_mode='r')
+        return cls(sums, counts)
+
+    def save(self, prefix):
+        prefix = Path(prefix)
+        np.save(prefix.with_name(prefix.name + '.sat_sum.npy'), self.sums)
+        np.save(prefix.with_name(prefix.name + '.sat_count.npy'), self.counts)
+
+    def rect_sums(self, r0, r1, c0, c1):
+        # Yarı açık [r0, r1) x [c0, c1) dikdörtgenleri; ızgara dışına taşan kısım kırpılır
+        r0 = np.clip(r0, 0, self.height)
+        r1 = np.clip(r1, 0, self.height)
+        c0 = np.clip(c0, 0, self.width)
+        c1 = np.clip(c1, 0, self.width)
+        r1 = np.maximum(r1, r0)
+        c1 = np.maximum(c1, c0)
+
+        s = self.sums[r1, c1] - self.sums[r0, c1] - self.sums[r1, c0] + self.sums[r0, c0]
+        n = self.counts[r1, c1] - self.counts[r0, c1] - self.counts[r1, c0] + self.counts[r0, c0]
+        return s, n
+
+    def rect_mean(self, r0, r1, c0, c1):
+        s, n = self.rect_sums(r0, r1, c0, c1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, s / np.maximum(n, 1), np.nan)
+
+    def disk_sums(self, py, px, ry, rx, n_strips=DISK_STRIPS):
+        # (py, px): sürekli piksel koordinatı (pikselin merkezi i + 0.5'tedir)
+        # (ry, rx): satır / sütun cinsinden elips yarı eksenleri
+        py = np.atleast_1d(np.asarray(py, dtype=np.float64))[:, None]
+        px = np.atleast_1d(np.asarray(px, dtype=np.float64))[:, None]
+        ry = np.broadcast_to(np.asarray(ry, dtype=np.float64), py.shape[:1])[:, None]
+        rx = np.broadcast_to(np.asarray(rx, dtype=np.float64), py.shape[:1])[:, None]
+
+        row_lo = np.ceil(py - ry - 0.5)
+        row_hi = np.floor(py + ry - 0.5) + 1
+        k = np.arange(n_strips + 1)[None, :]
+        edges = np.round(row_lo + k * (row_hi - row_lo) / n_strips).astype(np.int64)
+        r0, r1 = edges[:, :-1], edges[:, 1:]
+
+        dy = (r0 + r1) / 2.0 - py
+        with np.errstate(invalid='ignore'):
+            half_width = rx * np.sqrt(np.clip(1.0 - (dy / ry) ** 2, 0.0, None))
+        c0 = np.ceil(px - half_width - 0.5).astype(np.int64)
+        c1 = (np.floor(px + half_width - 0.5) + 1).astype(np.int64)
+
+        s, n = self.rect_sums(r0, r1, c0, c1)
+        s, n = s.sum(axis=1), n.sum(axis=1)
+        area = (np.maximum(r1 - r0, 0) * np.maximum(c1 - c0, 0)).sum(axis=1)
+
+        # Yarıçap piksel merkezine ulaşmıyorsa noktanın düştüğü piksel kullanılır
+        empty = area == 0
+        if np.any(empty):
+            pr = np.floor(py[empty, 0]).astype(np.int64)
+            pc = np.floor(px[empty, 0]).astype(np.int64)
+            s[empty], n[empty] = self.rect_sums(pr, pr + 1, pc, pc + 1)
+        return s, n
+
+    def disk_mean(self, py, px, ry, rx, n_strips=DISK_STRIPS):
+        s, n = self.disk_sums(py, px, ry, rx, n_strips)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, s / np.maximum(n, 1), np.nan)
+
+
+def brute_force_disk_mean(array, py, px, ry, rx):
+    # Referans: her nokta için elips maskesi kurulup piksel piksel ortalama alınır
+    array = np.asarray(array, dtype=np.float64)
+    height, width = array.shape
+    ry = np.broadcast_to(np.asarray(ry, dtype=np.float64), np.shape(py))
+    rx = np.broadcast_to(np.asarray(rx, dtype=np.float64), np.shape(py))
+    out = np.full(len(py), np.nan)
+
+    for i in range(len(py)):
+        r_lo, r_hi = max(int(np.floor(py[i] - ry[i])) - 1, 0), min(int(np.ceil(py[i] + ry[i])) + 1, height)
+        c_lo, c_hi = max(int(np.floor(px[i] - rx[i])) - 1, 0), min(int(np.ceil(px[i] + rx[i])) + 1, width)
+        rr, cc = np.mgrid[r_lo:r_hi, c_lo:c_hi]
+        mask = ((rr + 0.5 - py[i]) / ry[i]) ** 2 + ((cc + 0.5 - px[i]) / rx[i]) ** 2 <= 1.0
+        values = array[rr[mask], cc[mask]]
+        if values.size == 0:
+            pr, pc = int(np.floor(py[i])), int(np.floor(px[i]))
+            if 0 <= pr < height and 0 <= pc < width:
+                values = array[pr:pr + 1, pc:pc + 1].ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            out[i] = values.mean()
+    return out
+
+
+def self_check(n_points=2000, shape=(2900, 3600), seed=0):
+    rng = np.random.default_rng(seed)
+    # Yumuşak alan + gürültü + eksik pikseller (bulut maskesi benzeri)
+    yy, xx = np.mgrid[0:shape[0], 0:shape[1]]
+    array = (np.sin(yy / 150.0) + np.cos(xx / 210.0) + 0.1 * rng.standard_normal(shape)).astype(np.float32)
+    array[rng.random(shape) < 0.05] = np.nan
+
+    py = rng.uniform(0, shape[0], n_points)
+    px = rng.uniform(0, shape[1], n_points)
+
+    t = time.perf_counter()
+    sat = IntegralImage.from_array(array)
+    build_s = time.perf_counter() - t
+
+    results = {}
+    for label, radius_px in (('500 m', 4.5), ('5000 m', 45.0)):
+        t = time.perf_counter()
+        fast = sat.disk_mean(py, px, radius_px, radius_px * 1.27)
+        fast_s = time.perf_counter() - t
+
+        sample = slice(0, min(n_points, 300))
+        t = time.perf_counter()
+        ref = brute_force_disk_mean(array, py[sample], px[sample], radius_px, radius_px * 1.27)
+        ref_s = (time.perf_counter() - t) * n_points / len(ref)
+
+        err = np.nanmax(np.abs(fast[sample] - ref))
+        results[label] = err
+        print(f"{label:>7}: maks. hata={err:.4f} | SAT {fast_s * 1000:.1f} ms / {n_points} nokta | "
+              f"kaba kuvvet ~{ref_s * 1000:.0f} ms")
+
+    print(f"Integral görüntü oluşturma: {build_s * 1000:.0f} ms ({shape[0]}x{shape[1]})")
+    return results
+
+
+if __name__ == "__main__":
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    self_check(points)
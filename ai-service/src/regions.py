@@ -0,0 +1,142 @@
+import os
+import math
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+REGION_CATALOG_PATH = Path(os.getenv('REGION_CATALOG_PATH', PROJECT_ROOT / 'data' / 'raw' / 'ilce_koordinatlari.csv'))
+DEFAULT_PROVINCE = os.getenv('DEFAULT_PROVINCE', 'Konya')
+# Ters aramada kullanılan ızgara hücresi (derece)
+INDEX_CELL_DEG = 0.5
+EARTH_RADIUS_KM = 6371.0
+
+TURKISH_ASCII = str.maketrans('çğıİöşüÇĞÖŞÜ', 'cgiIosuCGOSU')
+
+
+def slugify(name):
+    # 'Konya' -> 'konya', 'Şanlıurfa' -> 'sanliurfa' (dosya ve görev adları için)
+    return name.translate(TURKISH_ASCII).lower().replace(' ', '_')
+
+
+def district_id(province, district):
+    return f"{province}/{district}"
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class RegionCatalog:
+    """İl/ilçe merkez koordinatları ve koordinattan ilçeye ters arama.
+
+    Katalog bir CSV dosyasından (il, ilce, enlem, boylam) okunur; yeni iller
+    satır eklenerek tanımlanır. Ters arama için ilçeler INDEX_CELL_DEG'lik bir
+    ızgarada kovalanır, yalnızca yakın hücrelerdeki adaylarla mesafe hesaplanır.
+    """
+
+    def __init__(self, path=REGION_CATALOG_PATH):
+        self.path = Path(path)
+        table = pd.read_csv(self.path, encoding='utf-8')
+        self.table = table.drop_duplicates(['il', 'ilce']).reset_index(drop=True)
+        self.lats = self.table['enlem'].to_numpy(dtype=np.float64)
+        self.lons = self.table['boylam'].to_numpy(dtype=np.float64)
+        self._provinces = self.table['il'].tolist()
+        self._names = self.table['ilce'].tolist()
+        self._coords = {
+            (il, ilce): {'enlem': float(lat), 'boylam': float(lon)}
+            for il, ilce, lat, lon in zip(self._provinces, self._names, self.lats, self.lons)
+        }
+
+        self._cells = {}
+        for i, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            self._cells.setdefault(self._cell(lat, lon), []).append(i)
+        self._max_ring = int(360 / INDEX_CELL_DEG)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return math.floor(lat / INDEX_CELL_DEG), math.floor(lon / INDEX_CELL_DEG)
+
+    def provinces(self):
+        return list(dict.fromkeys(self.table['il']))
+
+    def districts(self, province=None):
+        # ILCE_KOORDINATLARI ile aynı biçim: {ilçe: {'enlem', 'boylam'}}
+        rows = self.table if province is None else self.table[self.table['il'] == province]
+        key = (lambda r: r.ilce) if province is not None else (lambda r: district_id(r.il, r.ilce))
+        return {key(r): {'enlem': float(r.enlem), 'boylam': float(r.boylam)} for r in rows.itertuples()}
+
+    def coordinates(self, province, district):
+        return self._coords.get((province, district))
+
+    def _ring(self, center, ring):
+        # Merkez hücreye Chebyshev uzaklığı tam olarak `ring` olan hücrelerin çevresi
+        ci, cj = center
+        if ring == 0:
+            yield center
+            return
+        for d in range(-ring, ring + 1):
+            yield ci - ring, cj + d
+            yield ci + ring, cj + d
+        for d in range(-ring + 1, ring):
+            yield ci + d, cj - ring
+            yield ci + d, cj + ring
+
+    def nearest(self, lat, lon, k=1, max_km=None):
+        """En yakın k ilçeyi [(il, ilçe, km), ...] olarak döndürür.
+
+        Halkalar hücre hücre genişletilir; k. aday taranan halkanın garanti
+        ettiği mesafeden yakınsa (ya da max_km aşılırsa) arama durur.
+        """
+        if not len(self.table):
+            return []
+        k = min(k, len(self.table))
+        center = self._cell(lat, lon)
+        candidates = []
+        for ring in range(self._max_ring + 1):
+            for cell in self._ring(center, ring):
+                candidates.extend(self._cells.get(cell, ()))
+            if len(candidates) == len(self.table):
+                break
+            # Halka dışındaki bir ilçe en az bu kadar uzaktır (boylam derecesi kutba doğru kısalır)
+            edge_lat = min(abs(lat) + ring * INDEX_CELL_DEG, 89.0)
+            covered_km = ring * INDEX_CELL_DEG * 111.0 * math.cos(math.radians(edge_lat))
+            if max_km is not None and covered_km >= max_km:
+                break
+            if len(candidates) >= k:
+                distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+                if np.partition(distances, k - 1)[k - 1] <= covered_km:
+                    break
+
+        if not candidates:
+            return []
+        idx = np.asarray(candidates)
+        distances = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        result = []
+        for j in np.argsort(distances)[:k]:
+            if max_km is not None and distances[j] > max_km:
+                break
+            result.append((self._provinces[idx[j]], self._names[idx[j]], float(distances[j])))
+        return result
+
+    def locate(self, lat, lon, max_km=None):
+        # Koordinata en yakın ilçe merkezi (il, ilçe); sınır poligonu olmadığından yaklaşık eşleme
+        found = self.nearest(lat, lon, k=1, max_km=max_km)
+        return (found[0][0], found[0][1]) if found else None
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_region_catalog():
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = RegionCatalog()
+    return _catalog
@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import profiling
+
+UPSTREAM_MAX_WORKERS = int(os.getenv('UPSTREAM_MAX_WORKERS', '16'))
+GEE_DEADLINE_S = float(os.getenv('GEE_DEADLINE_S', '25'))
+SOIL_DEADLINE_S = float(os.getenv('SOIL_DEADLINE_S', '10'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_RESET_S = float(os.getenv('BREAKER_RESET_S', '30'))
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class UpstreamTimeout(UpstreamError):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class NoDataError(LookupError):
+    """Upstream sağlıklı yanıt verdi ama bu nokta için veri yok (su, maske, kapsama dışı).
+
+    Devre kesicide hata sayılmaz; yalnızca istisnalar ve zaman aşımları sayılır.
+    """
+
+
+# Takılan çağrılar bu havuzda kalır; istek sahibi yalnızca `deadline` kadar bekler.
+_executor = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix='upstream')
+
+
+class CircuitBreaker:
+    """Bir upstream (GEE, SoilGrids) için süre sınırlı devre kesici.
+
+    Ardışık `failure_threshold` hatadan sonra devre açılır ve `reset_timeout`
+    saniye boyunca çağrılar hemen reddedilir; ardından tek bir deneme çağrısına
+    izin verilir (half-open), başarılı olursa devre kapanır.
+    """
+
+    def __init__(self, name, deadline, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_S):
+        self.name = name
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(f"{self.name} devresi açık")
+
+    def _on_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def _on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        # None sonucu NoDataError olarak döner; upstream çalıştığı için devre sağlıklı sayılır
+        self._before_call()
+        future = _executor.submit(profiling.propagate(fn), *args, **kwargs)
+        try:
+            result = future.result(timeout=self.deadline)
+        except FutureTimeout:
+            self._on_failure()
+            raise UpstreamTimeout(f"{self.name} {self.deadline:.0f} sn içinde yanıt vermedi")
+        except NoDataError:
+            self._on_success()
+            raise
+        except Exception as e:
+            self._on_failure()
+            raise UpstreamError(f"{self.name} hatası: {e}") from e
+
+        self._on_success()
+        if result is None:
+            raise NoDataError(f"{self.name} bu nokta için veri döndürmedi")
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'deadline_s': self.deadline}
+
+
+BREAKERS = {
+    'gee': CircuitBreaker('gee', deadline=GEE_DEADLINE_S),
+    'soilgrids': CircuitBreaker('soilgrids', deadline=SOIL_DEADLINE_S),
+}
+
+
+def breaker_states():
+    return {name: breaker.to_dict() for name, breaker in BREAKERS.items()}
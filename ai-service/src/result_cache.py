@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from feature_cache import make_key
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RESULT_CACHE_PATH = Path(os.getenv('RESULT_CACHE_PATH', PROJECT_ROOT / 'data' / 'cache' / 'results.sqlite'))
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '4096'))
+# Koordinatlar bu adıma yuvarlanır (~50 m); tahmin yarıçapı 500 m olduğundan
+# aynı hücredeki istekler aynı özellikleri görür
+RESULT_GRID_DEG = float(os.getenv('RESULT_GRID_DEG', '0.0005'))
+# Başka bir model sürümüne ait kayıtlar bu yaştan sonra silinir. Hemen silinmez: kademeli
+# güncellemede eski ve yeni sürüm süreçleri bir süre aynı dosyayı birlikte kullanır.
+RESULT_OTHER_MODEL_MAX_AGE_S = float(os.getenv('RESULT_OTHER_MODEL_MAX_AGE_S', str(24 * 3600)))
+RESULT_PURGE_INTERVAL_S = float(os.getenv('RESULT_PURGE_INTERVAL_S', '600'))
+
+_checksums = {}
+_checksums_lock = threading.Lock()
+
+
+def file_checksum(path):
+    # SHA-256, dosya (mtime, boyut) değişmedikçe yeniden hesaplanmaz
+    stat = os.stat(path)
+    with _checksums_lock:
+        cached = _checksums.get(path)
+        if cached is not None and cached[0] == (stat.st_mtime, stat.st_size):
+            return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    checksum = digest.hexdigest()[:16]
+
+    with _checksums_lock:
+        _checksums[path] = ((stat.st_mtime, stat.st_size), checksum)
+    return checksum
+
+
+def model_checksum(*paths):
+    # Nokta ve quantile modeli birlikte sürümü belirler; olmayan dosyalar atlanır
+    return '-'.join(file_checksum(p) for p in paths if os.path.exists(p))
+
+
+def quantize(value, step=RESULT_GRID_DEG):
+    return round(round(value / step) * step, 6)
+
+
+def result_key(lat, lon, reference_year, radius):
+    return make_key(reference_year, quantize(lat), quantize(lon), radius)
+
+
+class ResultCache:
+    """/predict yanıtları için bellek içi LRU + SQLite önbelleği.
+
+    Değerler hektar başına sonuçlardır; toplam verim okuma sırasında hesaplanır.
+    Kayıtlar model sağlama toplamına bağlıdır; `max_age` verilen kayıtlar (ör. süren sezon)
+    o kadar saniye sonra geçersizdir. Süresi dolan ve başka model sürümlerine ait eski
+    kayıtlar ara ara, yaşa göre silinir.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, size=RESULT_CACHE_SIZE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._checksum = None
+        self._purged_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " model_checksum TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (model_checksum, key))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            if 'expires_at' not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN expires_at REAL")
+            self._conn.commit()
+
+    def _purge(self, checksum, now):
+        # Çağıran kilidi tutar. Diğer sürümlerin kayıtları yalnızca yaşlanınca silinir
+        self._checksum = checksum
+        if now - self._purged_at < RESULT_PURGE_INTERVAL_S:
+            return
+        self._purged_at = now
+        removed = self._conn.execute(
+            "DELETE FROM results WHERE (model_checksum != ? AND created_at < ?) OR expires_at < ?",
+            (checksum, now - RESULT_OTHER_MODEL_MAX_AGE_S, now)
+        ).rowcount
+        self._conn.commit()
+        if removed:
+            print(f"♻️ {removed} eski ya da süresi dolmuş önbellekli tahmin silindi.")
+
+    def get(self, checksum, key):
+        now = time.time()
+        with self._lock:
+            self._purge(checksum, now)
+            entry = self._memory.get((checksum, key))
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM results WHERE model_checksum = ? AND key = ?", (checksum, key)
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember((checksum, key), entry)
+            if entry is None or (entry[1] is not None and entry[1] < now):
+                self.misses += 1
+                return None
+            self._memory.move_to_end((checksum, key))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, checksum, key, value, max_age=None):
+        now = time.time()
+        expires_at = None if max_age is None else now + max_age
+        with self._lock:
+            self._purge(checksum, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (model_checksum, key, value, created_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (checksum, key, json.dumps(value), now, expires_at)
+            )
+            self._conn.commit()
+            self._remember((checksum, key), (value, expires_at))
+
+    def _remember(self, memory_key, entry):
+        self._memory[memory_key] = entry
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"memory": len(self._memory), "hits": self.hits, "misses": self.misses, "model": self._checksum}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
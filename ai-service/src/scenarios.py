@@ -0,0 +1,153 @@
+import os
+import fnmatch
+
+import numpy as np
+
+from predict_yield import (
+    collect_features, feature_matrix, load_model, load_quantile_model, predict_matrix,
+    predict_quantiles, scale_results
+)
+from feature_providers import LOCATION_COLUMNS, assemble
+
+# İstek başına en fazla senaryo; hepsi tek matris olarak tek tahmin çağrısında skorlanır
+SCENARIO_MAX = int(os.getenv('SCENARIO_MAX', '500'))
+# Değiştirilen özellikler fiziksel sınırlara kırpılır (ör. yağış eksiye düşmez)
+FEATURE_BOUNDS = {
+    'Rain_': (0.0, None),
+    'NDVI_': (-1.0, 1.0),
+    'soil_': (0.0, None),
+}
+
+
+def parse_change(pattern, value):
+    """'-30%' göreli (x 0.7), sayı ya da '+2' mutlak değişimdir: (göreli mi, miktar)."""
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            if text.endswith('%'):
+                return True, float(text[:-1]) / 100
+            return False, float(text)
+        except ValueError:
+            raise ValueError(f"Geçersiz değişim: {pattern}={value!r} (ör. '-30%' veya 2)")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+        raise ValueError(f"Geçersiz değişim: {pattern}={value!r} (ör. '-30%' veya 2)")
+    return False, float(value)
+
+
+def resolve_scenarios(scenarios, model_features):
+    """Senaryoları (ad, [(sütun indeksleri, göreli mi, miktar)]) listesine çevirir.
+
+    Anahtarlar model özellik adı ya da joker kalıbıdır ('Rain_*', 'temp_C_May').
+    Konum sütunları değiştirilemez; hiçbir özelliğe uymayan kalıp hatadır.
+    """
+    if not scenarios:
+        raise ValueError("En az bir senaryo gerekli")
+    if len(scenarios) > SCENARIO_MAX:
+        raise ValueError(f"En fazla {SCENARIO_MAX} senaryo gönderilebilir")
+
+    editable = [(i, name) for i, name in enumerate(model_features) if name not in LOCATION_COLUMNS]
+    resolved = []
+    for n, scenario in enumerate(scenarios):
+        changes = []
+        for pattern, value in scenario['changes'].items():
+            columns = [i for i, name in editable if fnmatch.fnmatchcase(name, pattern)]
+            if not columns:
+                raise ValueError(f"'{pattern}' hiçbir değiştirilebilir model özelliğiyle eşleşmedi")
+            changes.append((np.array(columns), *parse_change(pattern, value)))
+        resolved.append((scenario.get('name') or f"senaryo_{n + 1}", changes))
+    return resolved
+
+
+def feature_bounds(model_features):
+    lower = np.full(len(model_features), -np.inf, dtype=np.float32)
+    upper = np.full(len(model_features), np.inf, dtype=np.float32)
+    for i, name in enumerate(model_features):
+        for prefix, (lo, hi) in FEATURE_BOUNDS.items():
+            if name.startswith(prefix):
+                lower[i] = -np.inf if lo is None else lo
+                upper[i] = np.inf if hi is None else hi
+    return lower, upper
+
+
+def scenario_matrix(base_row, resolved, model_features):
+    """İlk satır temel vektör, sonraki her satır bir senaryo olan float32 matris."""
+    matrix = np.repeat(base_row[np.newaxis, :], len(resolved) + 1, axis=0)
+    for row, (_, changes) in enumerate(resolved, start=1):
+        for columns, relative, amount in changes:
+            if relative:
+                matrix[row, columns] *= np.float32(1 + amount)
+            else:
+                matrix[row, columns] += np.float32(amount)
+    lower, upper = feature_bounds(model_features)
+    np.clip(matrix[1:], lower, upper, out=matrix[1:])
+    return matrix
+
+
+def score_matrix(model, quantile_model, matrix, model_features):
+    # Tüm senaryolar tek nokta tahmini + tek quantile çağrısıyla skorlanır
+    predictions = np.maximum(np.asarray(predict_matrix(model, matrix), dtype=np.float64), 0.0)
+    if quantile_model is None:
+        return predictions, None, None
+    quantile_features = list(quantile_model.feature_names_in_)
+    if quantile_features != list(model_features):
+        index = {name: i for i, name in enumerate(model_features)}
+        matrix = np.ascontiguousarray(np.stack(
+            [matrix[:, index[name]] if name in index else np.zeros(len(matrix), dtype=np.float32)
+             for name in quantile_features], axis=1))
+    labels, values = predict_quantiles(quantile_model, matrix)
+    return predictions, labels, values
+
+
+def run_scenarios(lat, lon, hectare, scenarios):
+    """Bir konum için temel tahmin ve her senaryonun tahmini.
+
+    Temel özellikler /predict ile aynı yoldan (önbellek, yedek ilçe, 0 doldurma) bir kez
+    alınır; senaryolar yalnızca bellekteki vektörü değiştirir, upstream'e gidilmez.
+    Varsayımsal girdiler dağılım izlemeye ve tahmin önbelleğine yazılmaz.
+    """
+    model = load_model()
+    model_features = list(model.feature_names_in_)
+    resolved = resolve_scenarios(scenarios, model_features)
+
+    features = collect_features(lat, lon)
+    if features.required_errors:
+        raise LookupError(f"GEE Bağlantı Hatası: {'; '.join(features.required_errors.values())}")
+    base, filled = assemble([features.values], model_features)
+    zero_filled = [col for col in model_features if filled[col].iloc[0]]
+
+    matrix = scenario_matrix(feature_matrix(base, model_features)[0], resolved, model_features)
+    try:
+        quantile_model = load_quantile_model()
+    except Exception as e:
+        print(f"⚠️ Quantile modeli yüklenemedi: {e}")
+        quantile_model = None
+    predictions, labels, intervals = score_matrix(model, quantile_model, matrix, model_features)
+
+    def result(row):
+        interval = None if labels is None else {label: round(float(v), 3) for label, v in zip(labels, intervals[row])}
+        return scale_results({"yield_per_hektar": round(float(predictions[row]), 3), "interval": interval}, hectare)
+
+    baseline = predictions[0]
+    results = []
+    for row, (name, changes) in enumerate(resolved, start=1):
+        touched = sorted({model_features[i] for columns, _, _ in changes for i in columns})
+        results.append({
+            "name": name,
+            "features": touched,
+            # 0 ile doldurulmuş özelliklerin değiştirilmesi anlamlı değildir; istemciye bildirilir
+            "zero_filled_features": [col for col in touched if col in zero_filled],
+            **result(row),
+            "delta_per_hektar": round(float(predictions[row] - baseline), 3),
+            "delta_pct": None if baseline <= 0 else round(float((predictions[row] - baseline) / baseline * 100), 2)
+        })
+
+    return {
+        "location": {"lat": lat, "lon": lon},
+        "hectare": hectare,
+        "baseline": result(0),
+        "scenarios": results,
+        "degraded": bool(features.degraded),
+        "degraded_reasons": [f"{name}:{ilce}" for name, ilce in features.degraded.items()],
+        "missing_providers": sorted(features.errors),
+        "zero_filled": zero_filled
+    }
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+
+import numpy as np
+
+# Servis, modeli XGBoost'un kendi biçiminden (.ubj) okur; joblib/scikit-learn
+# yalnızca eğitim ortamında ve eski .joblib dosyaları için gerekir.
+NATIVE_SUFFIX = '.ubj'
+
+
+def native_model_path(path):
+    return os.path.splitext(path)[0] + NATIVE_SUFFIX
+
+
+class NativeModel:
+    """xgb.Booster üzerinde, servisin kullandığı XGBRegressor arayüzünün küçük bir alt kümesi."""
+
+    def __init__(self, booster):
+        self._booster = booster
+        self.feature_names_in_ = np.asarray(booster.feature_names, dtype=object)
+
+    def get_booster(self):
+        return self._booster
+
+    def get_params(self):
+        alpha = self._booster.attr('quantile_alpha')
+        return {'quantile_alpha': json.loads(alpha) if alpha is not None else None}
+
+    def predict(self, X):
+        return self._booster.inplace_predict(X)
+
+
+def save_native(model, path):
+    # Eğitilmiş XGBRegressor'ı servisin okuyacağı yerel biçimde kaydeder
+    booster = model.get_booster()
+    alpha = model.get_params().get('quantile_alpha')
+    if alpha is not None:
+        booster.set_attr(quantile_alpha=json.dumps(np.atleast_1d(alpha).tolist()))
+    native_path = native_model_path(path)
+    booster.save_model(native_path)
+    return native_path
+
+
+def load_native(path):
+    import xgboost as xgb
+    return NativeModel(xgb.Booster(model_file=native_model_path(path)))
+
+
+def load_model_file(path):
+    if os.path.exists(native_model_path(path)):
+        return load_native(path)
+    import joblib
+    return joblib.load(path)
+
+
+if __name__ == "__main__":
+    # Eski .joblib modellerini dönüştürmek için (eğitim ortamında çalıştırılır):
+    # python src/serving_model.py ai-service/data/processed/konya_bugday_modeli_xgb.joblib ...
+    import joblib
+    for model_path in sys.argv[1:]:
+        print(f"💾 {save_native(joblib.load(model_path), model_path)}")
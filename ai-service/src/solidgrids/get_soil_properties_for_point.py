@@ -1,44 +1,18 @@
+import os
+import sys
 import time
 import requests
 import pandas as pd
 
+try:
+    from regions import DEFAULT_PROVINCE, get_region_catalog
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from regions import DEFAULT_PROVINCE, get_region_catalog
+
 checkForSinglePoint = False
 
-ILCE_KOORDINATLARI = {
-    'Ahırlı': {'enlem': 37.4688, 'boylam': 32.1755},
-    'Akören': {'enlem': 37.6650, 'boylam': 32.5180},
-    'Akşehir': {'enlem': 38.396900, 'boylam': 31.395134},
-    'Altınekin': {'enlem': 38.4010, 'boylam': 33.0400},
-    'Beyşehir': {'enlem': 37.648755, 'boylam': 31.739495},
-    'Bozkır': {'enlem': 37.1950, 'boylam': 32.2280},
-    'Çeltik': {'enlem': 39.0080, 'boylam': 31.7950},
-    'Cihanbeyli': {'enlem': 38.6800, 'boylam': 32.8600},
-    'Çumra': {'enlem': 37.578325, 'boylam': 32.824190},
-    'Derbent': {'enlem': 38.0790, 'boylam': 32.0500},
-    'Derebucak': {'enlem': 37.4250, 'boylam': 31.6700},
-    'Doğanhisar': {'enlem': 38.1410, 'boylam': 31.6900},
-    'Emirgazi': {'enlem': 38.0410, 'boylam': 33.8250},
-    'Ereğli': {'enlem': 37.4800, 'boylam': 34.0500},
-    'Güneysınır': {'enlem': 37.2850, 'boylam': 32.7000},
-    'Hadim': {'enlem': 36.9890, 'boylam': 32.4350},
-    'Halkapınar': {'enlem': 37.3820, 'boylam': 34.1950},
-    'Hüyük': {'enlem': 37.9420, 'boylam': 31.6200},
-    'Ilgın': {'enlem': 38.300719, 'boylam': 31.872345},
-    'Kadınhanı': {'enlem': 38.3000, 'boylam': 32.2800},
-    'Karapınar': {'enlem': 37.7300, 'boylam': 33.5200},
-    'Karatay': {'enlem': 37.9500, 'boylam': 32.6500},
-    'Kulu': {'enlem': 39.1000, 'boylam': 33.0400},
-    'Meram': {'enlem': 37.8200, 'boylam': 32.3800},
-    'Sarayönü': {'enlem': 38.2800, 'boylam': 32.4100},
-    'Selçuklu': {'enlem': 38.0000, 'boylam': 32.5000},
-    'Seydişehir': {'enlem': 37.4350, 'boylam': 31.8700},
-    'Taşkent': {'enlem': 36.9400, 'boylam': 32.4850},
-    'Tuzlukçu': {'enlem': 38.4750, 'boylam': 31.6700},
-    'Yalıhüyük': {'enlem': 37.3100, 'boylam': 32.0900},
-    'Yunak': {'enlem': 38.8000, 'boylam': 31.7600},
-}
-
-def get_soil_properties_for_point(lon, lat):
+def get_soil_properties_for_point(lon, lat, timeout=None):
 
     print(f"Analiz noktası: Enlem={lat}, Boylam={lon}")
     print("SoilGrids RESTful API'sine istek gönderiliyor...")
@@ -52,17 +26,18 @@ def get_soil_properties_for_point(lon, lat):
         'value': ["mean"]
     }
 
+    # Bağlantı/HTTP hataları çağırana yükselir (devre kesici sayar); None yalnızca "bu noktada veri yok" demektir
     try:
-        response = requests.get(BASE_URL, params=params)
+        response = requests.get(BASE_URL, params=params, timeout=timeout)
         response.raise_for_status()
         data = response.json()
         print("Veriler başarıyla çekildi. Yanıt işleniyor...")
     except requests.exceptions.HTTPError as http_err:
         print(f"HTTP Hatası Oluştu: {http_err}\n   - Sunucu Cevabı: {response.text}")
-        return None
+        raise
     except Exception as e:
         print(f"Hata oluştu: {e}")
-        return None
+        raise
 
     processed_data = []
     
@@ -105,6 +80,21 @@ def get_soil_properties_for_point(lon, lat):
     df = pd.DataFrame(processed_data)
     return df
 
+def get_soil_features_for_point(lon, lat, timeout=30):
+    # Eğitim verisiyle aynı biçim: tek satırlık geniş tablo (soil_<özellik>_<derinlik>)
+    soil_df = get_soil_properties_for_point(lon, lat, timeout=timeout)
+    if soil_df is None or soil_df.empty:
+        return None
+
+    soil_df = soil_df.copy()
+    soil_df.loc[soil_df['property'] == 'soc', 'value'] = (soil_df.loc[soil_df['property'] == 'soc', 'value'] / 10).round(2)
+    soil_df['feature_name'] = 'soil_' + soil_df['property'] + '_' + soil_df['depth'].str.replace('-', '_')
+
+    wide_df = soil_df.set_index('feature_name')[['value']].transpose()
+    wide_df.columns.name = None
+    wide_df.reset_index(drop=True, inplace=True)
+    return wide_df
+
 if __name__ == "__main__":
     target_lat = 37.578325
     target_lon = 32.824190
@@ -118,8 +108,13 @@ if __name__ == "__main__":
         elif soil_df is not None:
             print("Uyarı: Veri başarıyla çekildi ancak işlenecek bir layer bulunamadı. Tablo boş.")
     else:
-        for ilce in ILCE_KOORDINATLARI:
-            soil_df = get_soil_properties_for_point(lon=ILCE_KOORDINATLARI[ilce]["boylam"], lat=ILCE_KOORDINATLARI[ilce]["enlem"])
+        province = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PROVINCE
+        districts = get_region_catalog().districts(province)
+        for ilce, coords in districts.items():
+            try:
+                soil_df = get_soil_properties_for_point(lon=coords["boylam"], lat=coords["enlem"])
+            except Exception:
+                soil_df = None
             if soil_df is not None and not soil_df.empty:
                 print(f"{ilce} için veri çekme işlemi tamamlandı!")
                 print("İşte sonuç tablosu:")
@@ -3,15 +3,14 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import numpy as np
-
-FILE_PATH = 'data/processed/final_training_data_with_soil.csv'
-
-df = pd.read_csv(FILE_PATH)
-print("✅ Veri başarıyla DataFrame olarak okundu.\n")
-
-df = df.dropna(subset=['verim_ton_hektar'])
-X = df.drop(columns=['nnokta_id', 'verim_ton_hektar'])
-y = df['verim_ton_hektar']
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from training_data import TRAINING_DATA_PATH, load_training_data
+
+# Eğitimle aynı önbelleklenmiş float32 matris (ağaç modelleri zaten float32 ile çalışır)
+X, y, _ = load_training_data(TRAINING_DATA_PATH)
+print("✅ Veri başarıyla yüklendi.\n")
 
 X_train, X_test, y_train, y_test = train_test_split(
     X, y, test_size=0.2, random_state=42
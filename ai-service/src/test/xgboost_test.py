@@ -6,35 +6,17 @@ from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error
 import xgboost as xgb # XGBoost kütüphanesini ekledik
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from training_data import TRAINING_DATA_PATH, load_training_data
 
-# 1. Veriyi Yükle
-# Dosya yolunun doğru olduğundan emin ol (ai-service klasör yapısına göre)
-FILE_PATH = 'ai-service/data/processed/final_training_data_with_soil(1).csv'
-# Eğer direkt ana dizindeysen: 'data/processed/final_training_data_with_soil(1).csv'
+# 1-4. Veri: 2018-2024 (Sentinel-2 dönemi), hedefi boş satırlar atılmış, eğitimle aynı temizlik
+# train_model.py ile aynı önbelleklenmiş float32 matris; CSV değişmedikçe yeniden okunmaz/temizlenmez
+# %72 Başarının sırrı 2018 filtresi!
+X, y, _ = load_training_data(TRAINING_DATA_PATH)
+print(f"Filtrelenmiş (2018-2024) Veri Sayısı: {len(X)}")
 
-try:
-    df = pd.read_csv(FILE_PATH)
-except FileNotFoundError:
-    # Alternatif yol (Test ederken kolaylık olsun)
-    df = pd.read_csv('data/processed/final_training_data_with_soil.csv')
-
-# 2. FİLTRELEME: Sadece verilerin tam olduğu Sentinel-2 dönemini (2018+) alıyoruz
-# %72 Başarının sırrı burası!
-df_clean_period = df[df['yil'] >= 2018].copy()
-
-print(f"Orijinal Veri Sayısı: {len(df)}")
-print(f"Filtrelenmiş (2018-2024) Veri Sayısı: {len(df_clean_period)}")
-
-# 3. Hedef Değişken Kontrolü
-df_clean_period = df_clean_period.dropna(subset=['verim_ton_hektar'])
-
-# 4. X ve y Ayrımı
-features_to_drop = ['verim_ton_hektar', 'nnokta_id']
-X = df_clean_period.drop(columns=features_to_drop, errors='ignore')
-y = df_clean_period['verim_ton_hektar']
-
-# Eksik veri kalmışsa (ki 2018 sonrasında çok az olmalı) doldur
-X = X.fillna(X.mean())
 
 # 5. Train/Test Split
 # Veri azaldığı için test boyutunu biraz küçültüyorum (%15) ki eğitim için veri kalsın
@@ -63,6 +45,7 @@ xgb_model = xgb.XGBRegressor(
     max_depth=5,
     subsample=0.8,
     colsample_bytree=0.8,
+    tree_method='hist',     # Histogram tabanlı bölme (float32 matrisle hızlı)
     random_state=42,
     n_jobs=-1
 )
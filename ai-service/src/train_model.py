@@ -1,10 +1,30 @@
-import pandas as pd
+import numpy as np
 import xgboost as xgb
 import joblib
 import os
+from training_data import TRAINING_DATA_PATH, TRAINING_YEARS, load_training_data
+from explain import save_background
+from drift_monitor import save_reference
+from serving_model import save_native
+from onnx_model import export_onnx, load_onnx, verify_onnx
 
-INPUT_FILE = 'ai-service/data/processed/final_training_data_with_soil(1).csv'
+INPUT_FILE = TRAINING_DATA_PATH
 OUTPUT_MODEL = 'ai-service/data/processed/konya_bugday_modeli_xgb.joblib'
+OUTPUT_QUANTILE_MODEL = 'ai-service/data/processed/konya_bugday_modeli_xgb_quantile.joblib'
+QUANTILES = [0.1, 0.5, 0.9]
+
+def save_onnx(model, path, X):
+    # ONNX dışa aktarımı isteğe bağlıdır (onnx / onnxruntime eğitim ortamında kuruluysa)
+    try:
+        onnx_path = export_onnx(model, path)
+    except ImportError:
+        print("⚠️ 'onnx' kurulu değil, ONNX dışa aktarımı atlandı (pip install -r requirements-train.txt).")
+        return
+    try:
+        diff = verify_onnx(model, load_onnx(path), X[list(model.feature_names_in_)])
+        print(f"💾 ONNX modeli kaydedildi: {onnx_path} (XGBoost ile en büyük fark {diff:.1e})")
+    except ImportError:
+        print(f"💾 ONNX modeli kaydedildi: {onnx_path} (onnxruntime yok, eşlik kontrolü atlandı)")
 
 def train_and_save():
     print(f"📂 Veri yükleniyor: {INPUT_FILE}...")
@@ -13,19 +33,10 @@ def train_and_save():
         print("❌ HATA: Veri dosyası bulunamadı! Lütfen önce create_training_data.py'yi çalıştırın.")
         return
 
-    df = pd.read_csv(INPUT_FILE)
-
-    print(f"   - Toplam veri: {len(df)} satır")
-    df = df[(df['yil'] >= 2018) & (df['yil'] <= 2024)]
-    print(f"   - Filtrelenmiş (2018-2024) veri: {len(df)} satır")
-
-    # 3. TEMİZLİK
-    df = df.dropna(subset=['verim_ton_hektar']) # Hedef boşsa sil
-    df = df.fillna(0) # Diğer boşlukları 0 yap
-
-    # X (Özellikler) ve y (Hedef) ayrımı
-    X = df.drop(columns=['verim_ton_hektar', 'nnokta_id']) # İlçe isimleri (string) atılır
-    y = df['verim_ton_hektar']
+    # Yıl filtresi, temizlik (interpolasyon, komşu ilçe/yıl ile NDVI, kalanlar 0) ve sütun seçimi
+    # training_data'da; sonuç CSV'nin yanında float32 ikili matris olarak önbelleklenir
+    X, y, _ = load_training_data(INPUT_FILE)
+    print(f"   - Filtrelenmiş ({TRAINING_YEARS[0]}-{TRAINING_YEARS[1]}) veri: {len(X)} satır, {X.shape[1]} özellik")
 
     # 4. MODEL EĞİTİMİ (Final Parametreler)
     print("🚀 Model eğitiliyor (XGBoost)...")
@@ -35,6 +46,7 @@ def train_and_save():
         max_depth=5,
         subsample=0.8,
         colsample_bytree=0.8,
+        tree_method='hist',
         random_state=42,
         n_jobs=-1
     )
@@ -45,6 +57,32 @@ def train_and_save():
     # 5. MODELİ KAYDETME
     joblib.dump(model, OUTPUT_MODEL)
     print(f"💾 Model başarıyla kaydedildi: {OUTPUT_MODEL}")
+    print(f"💾 Servis modeli (scikit-learn gerektirmez) kaydedildi: {save_native(model, OUTPUT_MODEL)}")
+    save_onnx(model, OUTPUT_MODEL, X)
+
+    background_path = save_background(X, os.path.dirname(OUTPUT_MODEL))
+    print(f"💾 Açıklama arka plan örneklemi kaydedildi: {background_path}")
+    print(f"💾 Dağılım izleme referansı kaydedildi: {save_reference(X, os.path.dirname(OUTPUT_MODEL))}")
+
+    # 6. BELİRSİZLİK: P10/P50/P90 tek bir çok çıktılı quantile modelinde
+    print("🚀 Quantile modeli eğitiliyor (P10/P50/P90)...")
+    quantile_model = xgb.XGBRegressor(
+        objective='reg:quantileerror',
+        quantile_alpha=np.array(QUANTILES),
+        tree_method='hist',
+        n_estimators=300,
+        learning_rate=0.03,
+        max_depth=5,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=-1
+    )
+    quantile_model.fit(X, y)
+    joblib.dump(quantile_model, OUTPUT_QUANTILE_MODEL)
+    print(f"💾 Quantile modeli kaydedildi: {OUTPUT_QUANTILE_MODEL}")
+    print(f"💾 Servis quantile modeli kaydedildi: {save_native(quantile_model, OUTPUT_QUANTILE_MODEL)}")
+    save_onnx(quantile_model, OUTPUT_QUANTILE_MODEL, X)
     
     # Test amaçlı bir tahmin yapalım
     print("\n--- Test Tahmini (İlk Satır) ---")
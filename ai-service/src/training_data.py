@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from feature_cleaning import clean_features, sample_stat_columns
+
+TRAINING_DATA_PATH = os.getenv('TRAINING_DATA_PATH', 'ai-service/data/processed/final_training_data_with_soil(1).csv')
+TARGET_COLUMN = 'verim_ton_hektar'
+GROUP_COLUMN = 'nnokta_id'
+# Sentinel-2 dönemi; öncesinde NDVI büyük ölçüde eksik
+TRAINING_YEARS = (2018, 2024)
+MATRIX_SUFFIX = '.egitim_matrisi.npz'
+# feature_cleaning ya da sütun seçimi değişince artırılır; eski önbellekler geçersiz sayılır
+MATRIX_VERSION = 1
+TRAINING_MATRIX_CACHE = os.getenv('TRAINING_MATRIX_CACHE', '1') == '1'
+
+
+def matrix_cache_path(path):
+    return os.path.splitext(path)[0] + MATRIX_SUFFIX
+
+
+def fingerprint(path, years):
+    # CSV içeriği + yıl aralığı + sürüm; dosya yeniden üretilince önbellek kendiliğinden yenilenir
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digest.update(json.dumps([list(years), MATRIX_VERSION]).encode())
+    return digest.hexdigest()
+
+
+def build_training_matrix(path, years=TRAINING_YEARS):
+    """CSV'den temizlenmiş float32 özellik matrisi, hedef ve ilçe kimlikleri.
+
+    Hedefi boş satırlar atılır, clean_features uygulanır; ilçe adı ve alt
+    örnekleme dağılım sütunları (serviste tek nokta vardır) özelliklerden çıkarılır.
+    """
+    df = pd.read_csv(path)
+    df = df[(df['yil'] >= years[0]) & (df['yil'] <= years[1])]
+    df = df.dropna(subset=[TARGET_COLUMN])
+    df = clean_features(df)
+
+    X = df.drop(columns=[TARGET_COLUMN, GROUP_COLUMN] + sample_stat_columns(df.columns), errors='ignore')
+    groups = df[GROUP_COLUMN].astype(str).to_numpy() if GROUP_COLUMN in df.columns else np.array([], dtype=str)
+    return {
+        'features': np.ascontiguousarray(X.to_numpy(dtype=np.float32)),
+        'target': df[TARGET_COLUMN].to_numpy(dtype=np.float32),
+        'columns': np.asarray(X.columns, dtype=str),
+        'groups': groups.astype(str)
+    }
+
+
+def load_training_data(path=TRAINING_DATA_PATH, years=TRAINING_YEARS, refresh=False):
+    """(X, y, groups): X float32 DataFrame, y float32 Series, groups ilçe kimlikleri.
+
+    Temizlenmiş matris CSV'nin yanında `<ad>.egitim_matrisi.npz` olarak saklanır;
+    CSV değişmedikçe sonraki çalıştırmalar okuma + temizleme yerine yalnızca bu
+    ikili dosyayı yükler. Eğitim ve karşılaştırma betikleri aynı matrisi paylaşır.
+    """
+    cache_path = matrix_cache_path(path)
+    key = fingerprint(path, years)
+    data = None
+    if TRAINING_MATRIX_CACHE and not refresh and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                if str(cached['fingerprint']) == key:
+                    data = {name: cached[name] for name in ('features', 'target', 'columns', 'groups')}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Eğitim matrisi önbelleği okunamadı, yeniden oluşturuluyor: {e}")
+
+    if data is None:
+        data = build_training_matrix(path, years)
+        if TRAINING_MATRIX_CACHE:
+            # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya
+            tmp_path = cache_path + '.tmp.npz'
+            np.savez(tmp_path, fingerprint=np.asarray(key), **data)
+            os.replace(tmp_path, cache_path)
+            print(f"💾 Eğitim matrisi önbelleğe yazıldı: {cache_path}")
+    else:
+        print(f"⚡ Eğitim matrisi önbellekten yüklendi: {cache_path}")
+
+    X = pd.DataFrame(data['features'], columns=list(data['columns']), copy=False)
+    y = pd.Series(data['target'], index=X.index, name=TARGET_COLUMN)
+    return X, y, data['groups']
+
+
+def quantile_dmatrix(X, y=None, ref=None, max_bin=256):
+    # hist ağaçları için önceden kovalanmış matris; doğrulama kümesi eğitimin kovalarını (ref) kullanır
+    import xgboost as xgb
+    return xgb.QuantileDMatrix(X, label=y, ref=ref, max_bin=max_bin, feature_names=[str(c) for c in X.columns])
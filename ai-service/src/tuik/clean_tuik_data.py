@@ -1,16 +1,32 @@
 import pandas as pd
+import os
 import re
 import sys
 from pathlib import Path
 
-def clean_tuik_data():
+try:
+    from regions import DEFAULT_PROVINCE, slugify
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from regions import DEFAULT_PROVINCE, slugify
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def raw_path(province):
+    # Her il için TÜİK'ten ayrı indirilen tablo: data/raw/<il>_tarim_raw.xls
+    return PROJECT_ROOT / 'data' / 'raw' / f"{slugify(province)}_tarim_raw.xls"
+
+
+def verim_path(province):
+    return PROJECT_ROOT / 'data' / 'processed' / f"{slugify(province)}_bugday_verim.csv"
+
+
+def clean_tuik_data(province=DEFAULT_PROVINCE):
     try:
-        SCRIPT_DIR = Path(__file__).resolve().parent
-        PROJECT_ROOT = SCRIPT_DIR.parent.parent
-        
         # Orijinal dosya adı (Excel) ve yolu
-        input_path = PROJECT_ROOT / 'data' / 'raw' / 'konya_tarim_raw.xls'
-        output_path = PROJECT_ROOT / 'data' / 'processed' / 'konya_bugday_verim.csv'
+        input_path = raw_path(province)
+        output_path = verim_path(province)
         
         print(f"Input path: {input_path}")
         print(f"Output path: {output_path}")
@@ -45,10 +61,14 @@ def clean_tuik_data():
             uretim_col: 'Uretim_Ton'
         })
 
+        # Sütun başlıkları 'İl(İlçe)' biçimindedir
+        pattern = re.compile(rf'{re.escape(province)}\((.*?)\)')
+
         def extract_ilce(raw_name):
-            match = re.search(r'Konya\((.*?)\)', str(raw_name))
+            match = pattern.search(str(raw_name))
             return match.group(1) if match else raw_name
 
+        df_processed['Il'] = province
         df_processed['Ilce'] = df_processed['Ilce_Raw'].apply(extract_ilce)
         df_processed['Ekilen_Alan_Dekar'] = pd.to_numeric(df_processed['Ekilen_Alan_Dekar'], errors='coerce')
         df_processed['Uretim_Ton'] = pd.to_numeric(df_processed['Uretim_Ton'], errors='coerce')
@@ -56,6 +76,7 @@ def clean_tuik_data():
 
         final_df = df_processed[[
             'Yil',
+            'Il',
             'Ilce',
             'Ekilen_Alan_Dekar',
             'Uretim_Ton',
@@ -65,6 +86,7 @@ def clean_tuik_data():
         final_df.to_csv(output_path, index=False, float_format='%.10f')
 
         print(f"Clean complete. {output_path.relative_to(PROJECT_ROOT)}")
+        return output_path
 
     except FileNotFoundError:
         print(f"HATA: Dosya bulunamadı: {input_path}")
@@ -81,4 +103,4 @@ def clean_tuik_data():
         sys.exit(1)
 
 if __name__ == "__main__":
-    clean_tuik_data()
+    clean_tuik_data(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PROVINCE)
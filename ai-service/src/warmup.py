@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from predict_yield import REFERENCE_YEAR, collect_features
+from regions import get_region_catalog
+
+WARMUP_MAX_WORKERS = int(os.getenv('WARMUP_MAX_WORKERS', '4'))
+# Virgülle ayrılmış il listesi; boşsa katalogdaki tüm iller ısıtılır
+WARMUP_PROVINCES = [p.strip() for p in os.getenv('WARMUP_PROVINCES', '').split(',') if p.strip()]
+
+
+class WarmupState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = 'idle'
+        self.total = 0
+        self.completed = 0
+        self.failed = []
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self, total):
+        with self._lock:
+            self.status = 'running'
+            self.total = total
+            self.completed = 0
+            self.failed = []
+            self.started_at = time.time()
+            self.finished_at = None
+
+    def record(self, ilce, ok):
+        with self._lock:
+            self.completed += 1
+            if not ok:
+                self.failed.append(ilce)
+
+    def finish(self, status='done'):
+        with self._lock:
+            self.status = status
+            self.finished_at = time.time()
+
+    @property
+    def ready(self):
+        return self.status in ('done', 'disabled')
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'status': self.status,
+                'total': self.total,
+                'completed': self.completed,
+                'failed': list(self.failed),
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+state = WarmupState()
+
+
+def warmup_districts(provinces=WARMUP_PROVINCES):
+    # {'İl/İlçe': koordinat}; iller arasında aynı adlı ilçeler karışmaz
+    catalog = get_region_catalog()
+    if not provinces:
+        return catalog.districts()
+    districts = {}
+    for province in provinces:
+        districts.update({f"{province}/{ilce}": coords for ilce, coords in catalog.districts(province).items()})
+    return districts
+
+
+def warm_district(coords, year=REFERENCE_YEAR):
+    # Tüm sağlayıcılar ısıtılır; yedek kullanılmaz, ilçenin kendi kaydı yazılmalıdır
+    features = collect_features(coords['enlem'], coords['boylam'], year=year, degraded=False)
+    return not features.errors
+
+
+def warm_up(year=REFERENCE_YEAR, max_workers=WARMUP_MAX_WORKERS, districts=None):
+    districts = districts or warmup_districts()
+    state.start(len(districts))
+    print(f"🔥 Önbellek ısıtma başladı: {len(districts)} ilçe, {year} sezonu, {max_workers} worker")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(warm_district, coords, year): ilce for ilce, coords in districts.items()}
+            for future in as_completed(futures):
+                ilce = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    print(f"⚠️ {ilce} ısıtılamadı: {e}")
+                    ok = False
+                state.record(ilce, ok)
+    finally:
+        state.finish()
+
+    summary = state.to_dict()
+    print(f"✅ Önbellek ısıtma bitti: {summary['completed'] - len(summary['failed'])}/{summary['total']} ilçe hazır")
+    return summary
+
+
+def start_background_warmup(year=REFERENCE_YEAR, max_workers=WARMUP_MAX_WORKERS):
+    thread = threading.Thread(
+        target=warm_up,
+        kwargs={'year': year, 'max_workers': max_workers},
+        name='feature-warmup',
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WARMUP_MAX_WORKERS
+    warm_up(max_workers=workers)
@@ -0,0 +1,303 @@
+import os
+import zlib
+import struct
+import threading
+
+import numpy as np
+
+from predict_yield import PREDICT_RADIUS, REFERENCE_YEAR, feature_matrix, load_model, predict_matrix
+from feature_providers import FeatureExecutor, assemble, build_providers, season_dates
+
+# Başlangıç ızgarası MAP_BASE_CELLS x MAP_BASE_CELLS hücredir ((n+1)^2 nokta); her hücre en fazla
+# MAP_MAX_DEPTH kez dörde bölünür. Köşe tahminleri arasındaki fark eşiği aşmayan hücre bölünmez.
+MAP_BASE_CELLS = int(os.getenv('MAP_BASE_CELLS', '6'))
+MAP_MAX_DEPTH = int(os.getenv('MAP_MAX_DEPTH', '3'))
+MAP_REFINE_THRESHOLD = float(os.getenv('MAP_REFINE_THRESHOLD', '0.15'))  # ton/ha
+# İstek başına değerlendirilecek en fazla nokta (model + özellik çağrısı)
+MAP_MAX_POINTS = int(os.getenv('MAP_MAX_POINTS', '300'))
+# Harita noktaları /predict'in sağlayıcı havuzunu doldurmasın diye ayrı, daha küçük bir havuzda toplanır
+MAP_MAX_WORKERS = int(os.getenv('MAP_MAX_WORKERS', '8'))
+MAP_MAX_PIXELS = int(os.getenv('MAP_MAX_PIXELS', '1024'))
+MAP_MAX_SPAN_DEG = float(os.getenv('MAP_MAX_SPAN_DEG', '1.0'))
+MAP_IDW_POWER = float(os.getenv('MAP_IDW_POWER', '2'))
+MAP_IDW_NEIGHBORS = int(os.getenv('MAP_IDW_NEIGHBORS', '8'))
+MAP_IDW_CHUNK = 8192
+# Referans sezonun yerel ızgaraları (raster_store) varsa GEE yerine onlar okunur
+MAP_USE_RASTERS = os.getenv('MAP_USE_RASTERS', '1') == '1'
+
+ENCODINGS = ('color', 'value')
+# 'value' kodlamasında 16 bit gri piksel = kg/ha (ton/ha x 1000); 0 = veri yok
+VALUE_SCALE = 1000
+KM_PER_DEGREE = 111.32
+# Düşük verim kırmızı, orta sarı, yüksek yeşil
+COLOR_STOPS = np.array([
+    [0.0, 165, 0, 38],
+    [0.25, 244, 109, 67],
+    [0.5, 254, 224, 139],
+    [0.75, 166, 217, 106],
+    [1.0, 26, 152, 80],
+])
+
+
+_raster_store = None
+_raster_lock = threading.Lock()
+_map_executor = None
+_map_executor_lock = threading.Lock()
+
+
+def get_map_executor():
+    # Aynı sağlayıcılar, önbellek ve devre kesiciler; yalnızca iş parçacığı havuzu ayrıdır
+    global _map_executor
+    if _map_executor is None:
+        with _map_executor_lock:
+            if _map_executor is None:
+                _map_executor = FeatureExecutor(build_providers(), max_workers=MAP_MAX_WORKERS)
+    return _map_executor
+
+
+def get_map_raster_store():
+    global _raster_store
+    if not MAP_USE_RASTERS:
+        return None
+    if _raster_store is None:
+        with _raster_lock:
+            if _raster_store is None:
+                from raster.raster_store import RasterStore
+                _raster_store = RasterStore()
+    return _raster_store if _raster_store.has('NDVI', REFERENCE_YEAR, 5) else None
+
+
+def point_rows(lats, lons):
+    """Noktaların ham özellik satırları (/predict ile aynı sağlayıcılar); alınamayanlar None.
+
+    Tüm noktaların sağlayıcı çağrıları haritaya ayrılmış havuzda eşzamanlı yürür. Referans sezonun
+    yerel ızgaraları varsa uydu ve yükseklik özellikleri onlardan tek vektörel okumayla
+    gelir, sağlayıcılardan yalnızca toprak istenir.
+    """
+    executor = get_map_executor()
+    points = [(float(lat), float(lon), REFERENCE_YEAR) for lat, lon in zip(lats, lons)]
+    store = get_map_raster_store()
+    if store is None:
+        return executor.collect(points, PREDICT_RADIUS)
+
+    local = store.collect_points_data(lons, lats, *season_dates(REFERENCE_YEAR), region_radius=PREDICT_RADIUS)
+    others = [p.name for p in executor.providers if p.name not in ('satellite', 'terrain')]
+    rows = executor.collect(points, PREDICT_RADIUS, providers=others) if others else [{} for _ in points]
+    return [{**raster_row, **row} for raster_row, row in zip(local.to_dict('records'), rows)]
+
+
+def predict_points(model, lats, lons):
+    # Bir seviyedeki tüm yeni noktalar tek matris ve tek tahmin çağrısıyla; eksik sütunlar 0
+    rows = point_rows(lats, lons)
+    values = np.full(len(rows), np.nan)
+    ok = [i for i, row in enumerate(rows) if row is not None]
+    if ok:
+        frame, _ = assemble([rows[i] for i in ok], model.feature_names_in_)
+        values[ok] = np.maximum(predict_matrix(model, feature_matrix(frame, model.feature_names_in_)), 0.0)
+    return values
+
+
+class AdaptiveGrid:
+    """Sınır kutusu üzerinde uyarlamalı dörtlü ağaç örneklemesi.
+
+    Düğümler en ince seviyenin tamsayı kafesinde (satır güneyden, sütun batıdan)
+    tutulur; komşu hücrelerin paylaştığı köşeler bir kez değerlendirilir. Her turda
+    köşe farkı en büyük hücreler, nokta bütçesi dolana kadar bölünür.
+    """
+
+    def __init__(self, bounds, base_cells=MAP_BASE_CELLS, max_depth=MAP_MAX_DEPTH):
+        self.lat_min, self.lon_min, self.lat_max, self.lon_max = bounds
+        self.base_cells = base_cells
+        self.step = 2 ** max_depth
+        self.size = base_cells * self.step
+        self.values = {}
+        self.truncated = False
+
+    def to_latlon(self, nodes):
+        nodes = np.asarray(nodes, dtype=np.float64).reshape(-1, 2)
+        lats = self.lat_min + nodes[:, 0] / self.size * (self.lat_max - self.lat_min)
+        lons = self.lon_min + nodes[:, 1] / self.size * (self.lon_max - self.lon_min)
+        return lats, lons
+
+    @staticmethod
+    def corners(cell):
+        i, j, s = cell
+        return [(i, j), (i + s, j), (i, j + s), (i + s, j + s)]
+
+    @staticmethod
+    def children(cell):
+        i, j, s = cell
+        h = s // 2
+        return [(i, j, h), (i + h, j, h), (i, j + h, h), (i + h, j + h, h)]
+
+    def _evaluate(self, evaluate, nodes):
+        nodes = sorted(nodes)
+        if nodes:
+            lats, lons = self.to_latlon(nodes)
+            self.values.update(zip(nodes, evaluate(lats, lons).tolist()))
+
+    def sample(self, evaluate, threshold=MAP_REFINE_THRESHOLD, max_points=MAP_MAX_POINTS):
+        # evaluate(lats, lons) -> tahmin dizisi (alınamayan noktalar NaN)
+        cells = [(i * self.step, j * self.step, self.step)
+                 for i in range(self.base_cells) for j in range(self.base_cells)]
+        self._evaluate(evaluate, {node for cell in cells for node in self.corners(cell)})
+
+        while cells:
+            candidates = []
+            for cell in cells:
+                if cell[2] < 2:
+                    continue
+                corner_values = np.array([self.values[node] for node in self.corners(cell)])
+                if np.isnan(corner_values).any():
+                    continue
+                spread = corner_values.max() - corner_values.min()
+                if spread > threshold:
+                    candidates.append((spread, cell))
+            candidates.sort(reverse=True)
+
+            budget = max_points - len(self.values)
+            new_nodes, split = set(), []
+            for _, cell in candidates:
+                nodes = {node for child in self.children(cell) for node in self.corners(child)}
+                nodes = nodes.difference(self.values, new_nodes)
+                if len(new_nodes) + len(nodes) > budget:
+                    self.truncated = True
+                    break
+                new_nodes.update(nodes)
+                split.append(cell)
+            if not split:
+                break
+            self._evaluate(evaluate, new_nodes)
+            cells = [child for cell in split for child in self.children(cell)]
+
+    def samples(self):
+        nodes = list(self.values)
+        lats, lons = self.to_latlon(nodes)
+        return lats, lons, np.array([self.values[node] for node in nodes], dtype=np.float64)
+
+
+def to_km(lats, lons, ref_lat):
+    # Küçük kutularda eşdikdörtgen izdüşüm yeterlidir (boylam enleme göre daralır)
+    return np.column_stack([
+        np.asarray(lats, dtype=np.float64) * KM_PER_DEGREE,
+        np.asarray(lons, dtype=np.float64) * KM_PER_DEGREE * np.cos(np.radians(ref_lat))
+    ])
+
+
+def idw(sample_xy, sample_values, query_xy, power=MAP_IDW_POWER, neighbors=MAP_IDW_NEIGHBORS, chunk=MAP_IDW_CHUNK):
+    """Ters mesafe ağırlıklı enterpolasyon; her piksel için en yakın `neighbors` örnek.
+
+    Pikseller parçalar halinde işlenir, böylece bellek (parça x örnek) ile sınırlı kalır.
+    """
+    valid = ~np.isnan(sample_values)
+    points, values = sample_xy[valid], sample_values[valid]
+    out = np.full(len(query_xy), np.nan)
+    if len(points) == 0:
+        return out
+    k = min(neighbors, len(points))
+
+    for start in range(0, len(query_xy), chunk):
+        q = query_xy[start:start + chunk]
+        d2 = ((q[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+        if k < len(points):
+            idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            d2 = np.take_along_axis(d2, idx, axis=1)
+            v = values[idx]
+        else:
+            v = np.broadcast_to(values, d2.shape)
+        # Örneğin tam üstündeki piksel o örneğin değerini alır
+        w = 1.0 / np.maximum(d2, 1e-12) ** (power / 2)
+        out[start:start + chunk] = (w * v).sum(axis=1) / w.sum(axis=1)
+    return out
+
+
+def png_chunk(tag, body):
+    return struct.pack('>I', len(body)) + tag + body + struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff)
+
+
+def encode_png(pixels):
+    # (h, w) uint16 -> 16 bit gri; (h, w, 4) uint8 -> RGBA. Satır filtresi yok (0), zlib ile sıkıştırılır.
+    height, width = pixels.shape[:2]
+    if pixels.ndim == 2:
+        bit_depth, color_type, data = 16, 0, np.ascontiguousarray(pixels, dtype='>u2')
+    else:
+        bit_depth, color_type, data = 8, 6, np.ascontiguousarray(pixels, dtype=np.uint8)
+    rows = data.reshape(height, -1).view(np.uint8)
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rows], axis=1)
+    header = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', header)
+            + png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + png_chunk(b'IEND', b''))
+
+
+def colorize(grid, vmin, vmax):
+    t = np.clip((grid - vmin) / (vmax - vmin) if vmax > vmin else np.full_like(grid, 0.5), 0.0, 1.0)
+    rgba = np.zeros(grid.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.round(np.interp(t, COLOR_STOPS[:, 0], COLOR_STOPS[:, channel + 1]))
+    rgba[..., 3] = np.where(np.isnan(grid), 0, 255)
+    return rgba
+
+
+def output_size(bounds, width, height):
+    # Yükseklik verilmezse kutunun km cinsinden en-boy oranı korunur
+    lat_min, lon_min, lat_max, lon_max = bounds
+    if height is None:
+        ratio = (lat_max - lat_min) / ((lon_max - lon_min) * np.cos(np.radians((lat_min + lat_max) / 2)))
+        height = int(np.clip(round(width * ratio), 1, MAP_MAX_PIXELS))
+    return width, height
+
+
+def validate_bounds(bounds):
+    lat_min, lon_min, lat_max, lon_max = bounds
+    if not (-90 <= lat_min < lat_max <= 90 and -180 <= lon_min < lon_max <= 180):
+        raise ValueError("Geçersiz sınır kutusu (lat_min < lat_max, lon_min < lon_max olmalı)")
+    if lat_max - lat_min > MAP_MAX_SPAN_DEG or lon_max - lon_min > MAP_MAX_SPAN_DEG:
+        raise ValueError(f"Sınır kutusu en fazla {MAP_MAX_SPAN_DEG}° genişliğinde olabilir")
+
+
+def yield_map(bounds, width=256, height=None, encoding='color', vmin=None, vmax=None):
+    """Sınır kutusu için verim haritası: (PNG baytları, özet sözlüğü).
+
+    Model yalnızca uyarlamalı ızgaranın noktalarında çalışır; iş piksel sayısıyla değil
+    haritanın değişkenliğiyle büyür. Pikseller örneklerden IDW ile doldurulur.
+    """
+    validate_bounds(bounds)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Geçersiz kodlama: {encoding} ({', '.join(ENCODINGS)})")
+    width, height = output_size(bounds, width, height)
+    if not (1 <= width <= MAP_MAX_PIXELS and 1 <= height <= MAP_MAX_PIXELS):
+        raise ValueError(f"Harita boyutu 1-{MAP_MAX_PIXELS} piksel aralığında olmalı")
+
+    model = load_model()
+    grid = AdaptiveGrid(bounds)
+    grid.sample(lambda lats, lons: predict_points(model, lats, lons))
+    lats, lons, values = grid.samples()
+    if np.isnan(values).all():
+        raise LookupError("Bu alan için hiçbir noktada özellik alınamadı")
+
+    lat_min, lon_min, lat_max, lon_max = bounds
+    ref_lat = (lat_min + lat_max) / 2
+    # Piksel merkezleri; ilk satır kuzey kenarıdır
+    pixel_lats = lat_max - (np.arange(height) + 0.5) / height * (lat_max - lat_min)
+    pixel_lons = lon_min + (np.arange(width) + 0.5) / width * (lon_max - lon_min)
+    query_lats, query_lons = np.meshgrid(pixel_lats, pixel_lons, indexing='ij')
+    surface = idw(to_km(lats, lons, ref_lat), values, to_km(query_lats.ravel(), query_lons.ravel(), ref_lat))
+    surface = surface.reshape(height, width)
+
+    vmin = float(np.nanmin(values)) if vmin is None else vmin
+    vmax = float(np.nanmax(values)) if vmax is None else vmax
+    if encoding == 'value':
+        pixels = np.where(np.isnan(surface), 0, np.clip(np.round(surface * VALUE_SCALE), 1, 65535)).astype(np.uint16)
+    else:
+        pixels = colorize(surface, vmin, vmax)
+
+    summary = {
+        'width': width,
+        'height': height,
+        'points': int(len(values)),
+        'failed_points': int(np.isnan(values).sum()),
+        'truncated': grid.truncated,
+        'range': [round(vmin, 3), round(vmax, 3)],
+        'mean': round(float(np.nanmean(surface)), 3)
+    }
+    return encode_png(pixels), summary